@@ -3,9 +3,13 @@ Models for contentstore
 """
 # pylint: disable=no-member
 
+from django.conf import settings
 from django.db.models.fields import TextField
+from django.dispatch import receiver
 
 from config_models.models import ConfigurationModel
+from contentstore.tasks import update_search_index
+from xmodule.modulestore.django import SignalHandler
 
 
 class VideoUploadConfig(ConfigurationModel):
@@ -19,3 +23,12 @@ class VideoUploadConfig(ConfigurationModel):
     def get_profile_whitelist(cls):
         """Get the list of profiles to include in the encoding download"""
         return [profile for profile in cls.current().profile_whitelist.split(",") if profile]
+
+
+@receiver(SignalHandler.course_published)
+def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Update the courseware search index of a course, in the background, when it's published.
+    """
+    if settings.FEATURES.get('ENABLE_COURSEWARE_INDEX', False):
+        update_search_index.delay(unicode(course_key))
@@ -6,7 +6,9 @@ from celery.task import task
 from django.contrib.auth.models import User
 import json
 import logging
+from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
 from xmodule.course_module import CourseFields
 
 from xmodule.modulestore.exceptions import DuplicateCourseError, ItemNotFoundError
@@ -61,6 +63,23 @@ def rerun_course(source_course_key_string, destination_course_key_string, user_i
         return "exception: " + unicode(exc)
 
 
+@task()
+def update_search_index(course_id):
+    """
+    Reindexes the published content of a course which changed since it was last indexed, in a new celery task.
+    """
+    course_key = CourseKey.from_string(course_id)
+    CoursewareSearchIndexer.do_incremental_course_reindex(modulestore(), course_key)
+
+
+@task()
+def generate_course_thumbnails(course_id):
+    """
+    Generates the thumbnails of a course's images which don't have one, in a new celery task.
+    """
+    contentstore().generate_thumbnails_for_course(CourseKey.from_string(course_id))
+
+
 def deserialize_fields(json_fields):
     fields = json.loads(json_fields)
     for field_name, value in fields.iteritems():
@@ -19,6 +19,7 @@ from django.http import HttpResponse, HttpResponseNotFound
 from django.utils.translation import ugettext as _
 from django.views.decorators.http import require_http_methods, require_GET
 
+from cache_toolbox.core import del_course_assets_version
 from django_future.csrf import ensure_csrf_cookie
 from edxmako.shortcuts import render_to_response
 from xmodule.contentstore.django import contentstore
@@ -34,6 +35,7 @@ from extract_tar import safetar_extractall
 from util.json_request import JsonResponse
 from util.views import ensure_valid_course_key
 
+from contentstore.tasks import generate_course_thumbnails
 from contentstore.utils import reverse_course_url, reverse_usage_url
 
 
@@ -242,7 +244,11 @@ def import_handler(request, course_key_string):
                     load_error_modules=False,
                     static_content_store=contentstore(),
                     target_course_id=course_key,
+                    generate_thumbnails=False,
                 )
+                # the import may have replaced assets, whose urls carry their digests
+                del_course_assets_version(course_key)
+                generate_course_thumbnails.delay(unicode(course_key))
 
                 new_location = course_items[0].location
                 logging.debug('new course at {0}'.format(new_location))
@@ -15,7 +15,7 @@ from contentstore.views.item import create_xblock_info, VisibilityState
 from course_action_state.models import CourseRerunState
 from util.date_utils import get_default_time_display
 from xmodule.modulestore import ModuleStoreEnum
-from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer, indexed_version_cache_key
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, LibraryFactory
@@ -24,6 +24,7 @@ from opaque_keys.edx.locator import CourseLocator
 from student.tests.factories import UserFactory
 from course_action_state.managers import CourseRerunUIStateManager
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from search.api import perform_search
 import pytz
@@ -637,5 +638,55 @@ class TestCourseReIndex(CourseTestCase):
         with self.assertRaises(SearchIndexingError):
             CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
 
+    @mock.patch('search.tests.mock_search_engine.MockSearchEngine.index')
+    def test_incremental_indexing(self, mock_index):
+        """
+        Test only the content edited since it was last indexed is reindexed
+        """
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        mock_index.reset_mock()
+
+        CoursewareSearchIndexer.do_incremental_course_reindex(modulestore(), self.course.id)
+        self.assertFalse(mock_index.called)
+
+        self.html.display_name = "My expanded HTML"
+        modulestore().update_item(self.html, ModuleStoreEnum.UserID.test)
+        modulestore().publish(self.html.location, ModuleStoreEnum.UserID.test)
+        CoursewareSearchIndexer.do_incremental_course_reindex(modulestore(), self.course.id)
+        self.assertEqual(
+            [call_args[0][1]['id'] for call_args in mock_index.call_args_list],
+            [unicode(self.html.location)]
+        )
+
+    def test_indexed_versions_per_block(self):
+        """
+        Test the indexed version of each block is cached under its own key, and forgotten when it's removed
+        """
+        version_key = indexed_version_cache_key(unicode(self.html.location))
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        self.assertIsNotNone(cache.get(version_key))
+
+        CoursewareSearchIndexer.add_to_search_index(modulestore(), self.vertical.location, delete=True)
+        self.assertIsNone(cache.get(version_key))
+
+    def test_publish_indexes_course(self):
+        """
+        Test publishing content adds it to the index
+        """
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        html = ItemFactory.create(
+            parent_location=self.vertical.location, category="html", display_name="My Other HTML",
+            data="<div>This is my distinctive HTML content</div>",
+        )
+        modulestore().publish(html.location, ModuleStoreEnum.UserID.test)
+
+        response = perform_search(
+            "distinctive",
+            user=self.user,
+            size=10,
+            from_=0,
+            course_id=unicode(self.course.id))
+        self.assertEqual(response['total'], 1)
+
     def tearDown(self):
         os.remove(self.TEST_INDEX_FILENAME)
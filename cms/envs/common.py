@@ -323,6 +323,9 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Sizes of the in-process caches of (immutable) course structures and definitions
+                        'structure_cache_max_bytes': 64 * 1024 * 1024,
+                        'definition_cache_max_bytes': 16 * 1024 * 1024,
                     }
                 },
                 {
@@ -333,6 +336,8 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Keep each course's parent locations alongside its metadata inheritance tree
+                        'cache_parent_locations': True,
                     }
                 }
             ]
@@ -340,6 +345,13 @@ MODULESTORE = {
     }
 }
 
+# Local disk cache for course assets too large for memcached.  Each server
+# keeps its own copies; no ROOT_PATH disables it.
+STATIC_CONTENT_DISK_CACHE = {
+    'ROOT_PATH': None,
+    'MAX_BYTES': 2 * 1024 * 1024 * 1024,
+}
+
 ############################ DJANGO_BUILTINS ################################
 # Change DEBUG/TEMPLATE_DEBUG in your environment settings files, not here
 DEBUG = False
@@ -379,6 +391,9 @@ if not EDX_PLATFORM_REVISION:
 STATIC_URL = '/static/' + EDX_PLATFORM_REVISION + "/"
 STATIC_ROOT = ENV_ROOT / "staticfiles" / EDX_PLATFORM_REVISION
 
+# Number of rewritten /static/ urls of course content that static_replace remembers
+STATIC_URL_CACHE_MAX_ENTRIES = 10000
+
 STATICFILES_DIRS = [
     COMMON_ROOT / "static",
     PROJECT_ROOT / "static",
@@ -717,6 +732,9 @@ INSTALLED_APPS = (
     # Course action state
     'course_action_state',
 
+    # Denormalized course summaries for course listings
+    'openedx.core.djangoapps.course_overviews',
+
     # Additional problem types
     'edx_jsme',    # Molecular Structure
 )
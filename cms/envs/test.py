@@ -51,6 +51,10 @@ TEST_ROOT = path('test_root')
 # Want static files in the same dir for running on jenkins.
 STATIC_ROOT = TEST_ROOT / "staticfiles"
 
+# Tests mock out staticfiles and the modulestore, so don't remember rewritten static urls.
+# static_replace's own tests turn this on to cover the memo.
+STATIC_URL_CACHE_MAX_ENTRIES = 0
+
 GITHUB_REPO_ROOT = TEST_ROOT / "data"
 COMMON_TEST_DATA_ROOT = COMMON_ROOT / "test" / "data"
 
@@ -88,6 +92,11 @@ update_module_store_settings(
     module_store_options={
         'default_class': 'xmodule.raw_module.RawDescriptor',
         'fs_root': TEST_ROOT / "data",
+        # Don't let cached structures or parent locations hide the mongo queries that tests count.
+        # The caches are covered with these on by test_split_document_cache and test_mongo_parent_index.
+        'structure_cache_max_bytes': 0,
+        'definition_cache_max_bytes': 0,
+        'cache_parent_locations': False,
     },
     doc_store_settings={
         'db': 'test_xmodule',
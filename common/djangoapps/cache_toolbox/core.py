@@ -8,6 +8,8 @@ Core methods
 
 """
 
+from uuid import uuid4
+
 from django.core.cache import cache
 from django.db import DEFAULT_DB_ALIAS
 from opaque_keys import InvalidKeyError
@@ -134,4 +136,34 @@ def del_cached_content(location):
         # although deprecated keys allowed run=None, new keys don't if there is no version.
         pass
 
+    locations.append(course_assets_version_key(location.course_key))
     cache.delete_many(locations)
+
+
+def course_assets_version_key(course_key):
+    """
+    Returns the cache key of the assets version of `course_key`.
+    """
+    return u'course_assets_version.{}'.format(course_key).encode("utf-8")
+
+
+def get_course_assets_version(course_key):
+    """
+    Returns a token which changes whenever content of `course_key` is deleted
+    from the cache (as it is when an asset is saved, locked or deleted), so that
+    values worked out from the course's assets can be remembered until then.
+    """
+    key = course_assets_version_key(course_key)
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        cache.add(key, version)
+    return version
+
+
+def del_course_assets_version(course_key):
+    """
+    Changes the assets version of `course_key`, for when its assets are saved
+    without deleting them from the cache one by one (e.g. by a course import).
+    """
+    cache.delete(course_assets_version_key(course_key))
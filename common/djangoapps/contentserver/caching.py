@@ -0,0 +1,224 @@
+"""
+Local disk cache for course assets that are too large to keep in memcached.
+
+Assets are stored under a name derived from their location, upload date and
+length, so re-uploading an asset simply stops its old copy from being used;
+stale copies are removed by the size-bounded pruning like any other file.
+
+An asset's copy is written as its data is first streamed to a client, so the
+request that fills the cache doesn't wait for the whole file to be copied.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+
+from xmodule.contentstore.content import StaticContentStream
+
+log = logging.getLogger(__name__)
+
+# Assets at least this large are not put in memcached, whose values are
+# limited to 1MB.
+MAX_MEMCACHED_CONTENT_SIZE = 1048576
+
+# Copies being written are named with this prefix until they are complete.
+PARTIAL_FILE_PREFIX = '.partial-'
+
+# Partial copies older than this (in seconds) were left by a process that died
+# while writing them, and are removed when the cache is pruned.
+STALE_PARTIAL_FILE_AGE = 60 * 60
+
+
+class StaticContentDiskCache(object):
+    """
+    Keeps copies of large assets on local disk, bounded to `max_bytes` in
+    total, so that they can be streamed and seeked into without reading
+    GridFS chunks on every request.
+    """
+    def __init__(self, root_path, max_bytes):
+        self.root_path = root_path
+        self.max_bytes = max_bytes
+        if not os.path.exists(root_path):
+            os.makedirs(root_path)
+
+    @classmethod
+    def from_config(cls):
+        """
+        Return a cache configured by the STATIC_CONTENT_DISK_CACHE setting, or
+        None if it has no ROOT_PATH.  Example::
+
+            ROOT_PATH : /tmp/edx/asset-cache/
+            MAX_BYTES : 2 * 1024 * 1024 * 1024
+        """
+        config = getattr(settings, 'STATIC_CONTENT_DISK_CACHE', None) or {}
+        if not config.get('ROOT_PATH'):
+            return None
+        return cls(config['ROOT_PATH'], config.get('MAX_BYTES', 0))
+
+    def path_for(self, content):
+        """
+        Return the path of the cached copy of `content`.
+        """
+        version = u"{}|{}|{}".format(content.location, content.last_modified_at, content.length)
+        return os.path.join(self.root_path, hashlib.sha1(version.encode('utf-8')).hexdigest())
+
+    def get_or_spill(self, content):
+        """
+        Given a `StaticContentStream` read from the contentstore, return a
+        `StaticContentStream` over its copy on disk if there is one.  If there
+        isn't, return one that writes the copy as its data is streamed from
+        the contentstore.  Returns `content` itself if it is larger than the
+        whole cache.
+        """
+        if content.length is None or content.length > self.max_bytes:
+            return content
+
+        path = self.path_for(content)
+        try:
+            stream = open(path, 'rb')
+        except IOError:
+            # not copied yet, or pruned in the meantime
+            contentstore_stream = content._stream  # pylint: disable=protected-access
+            stream = SpillingStream(self, content.location, contentstore_stream, content.length, path)
+            content_class = SpillingContentStream
+        else:
+            # Refresh the modification time, which is what pruning goes by.
+            try:
+                os.utime(path, None)
+            except OSError:
+                # pruned by another process since it was opened
+                pass
+            content.close()
+            content_class = StaticContentStream
+
+        return content_class(
+            content.location, content.name, content.content_type, stream,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=content.locked,
+            content_digest=content.content_digest
+        )
+
+    def _prune(self, keep):
+        """
+        Remove the least recently used copies until the cache fits in
+        `max_bytes`, never removing `keep`.
+        """
+        entries = []
+        total_bytes = 0
+        for filename in os.listdir(self.root_path):
+            path = os.path.join(self.root_path, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if filename.startswith(PARTIAL_FILE_PREFIX):
+                if stat.st_mtime < time.time() - STALE_PARTIAL_FILE_AGE:
+                    _remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+
+        for __, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            _remove(path)
+            total_bytes -= size
+
+
+class SpillingStream(object):
+    """
+    File-like wrapper of an asset's contentstore stream that writes the data
+    read from it to a copy in `disk_cache`, for as long as it is read in order
+    from the start.  The copy is added to the cache once it is complete, and
+    dropped if the stream is closed before then.
+    """
+    def __init__(self, disk_cache, location, stream, length, path):
+        self.disk_cache = disk_cache
+        self.location = location
+        self.stream = stream
+        self.length = length
+        self.path = path
+        self.position = 0
+        # the number of bytes copied so far, or None once the copy is finished or dropped
+        self.copied = 0
+        self.temp_file = None
+        self.temp_path = None
+
+    def seek(self, position):
+        self.stream.seek(position)
+        self.position = position
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        if self.copied is not None and self.position == self.copied:
+            try:
+                self._copy(data)
+            except (IOError, OSError):
+                log.exception(u"Could not write %s to the asset disk cache", self.location)
+                self.close()
+        self.position += len(data)
+        return data
+
+    def _copy(self, data):
+        """
+        Append `data` to the copy, and add the copy to the cache if it is complete.
+        """
+        if self.temp_file is None:
+            # The copy is written to a temporary file first so that readers never see it partially written.
+            handle, self.temp_path = tempfile.mkstemp(prefix=PARTIAL_FILE_PREFIX, dir=self.disk_cache.root_path)
+            self.temp_file = os.fdopen(handle, 'wb')
+        self.temp_file.write(data)
+        self.copied += len(data)
+
+        if self.copied >= self.length:
+            self.temp_file.close()
+            self.temp_file = None
+            self.copied = None
+            os.rename(self.temp_path, self.path)
+            self.disk_cache._prune(keep=self.path)  # pylint: disable=protected-access
+
+    def close(self):
+        """
+        Drop the copy if it isn't complete.
+        """
+        self.copied = None
+        if self.temp_file is not None:
+            self.temp_file.close()
+            self.temp_file = None
+            _remove(self.temp_path)
+
+
+class SpillingContentStream(StaticContentStream):
+    """
+    A `StaticContentStream` over a `SpillingStream`, which drops the stream's
+    incomplete copy once its data stops being streamed, be it because the
+    client disconnected or because only part of the asset was asked for.
+    """
+    def stream_data(self):
+        try:
+            for chunk in super(SpillingContentStream, self).stream_data():
+                yield chunk
+        finally:
+            self.close()
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        try:
+            for chunk in super(SpillingContentStream, self).stream_data_in_range(first_byte, last_byte):
+                yield chunk
+        finally:
+            self.close()
+
+
+def _remove(path):
+    """
+    Remove the file at `path`, unless another process already has.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
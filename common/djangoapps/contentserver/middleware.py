@@ -3,6 +3,7 @@ Middleware to serve assets.
 """
 
 import logging
+from uuid import uuid4
 
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
@@ -10,11 +11,12 @@ from django.http import (
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG, XASSET_VERSION_PARAM
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from cache_toolbox.core import get_cached_content, set_cached_content
+from contentserver.caching import MAX_MEMCACHED_CONTENT_SIZE, StaticContentDiskCache
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -23,8 +25,20 @@ from xmodule.exceptions import NotFoundError
 
 log = logging.getLogger(__name__)
 
+# How long, in seconds, responses for versioned asset URLs may be cached: one year,
+# the longest period http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.21 allows
+VERSIONED_CONTENT_MAX_AGE = 365 * 24 * 60 * 60
+
+# The most ranges a single Range header may ask for before it is ignored and the
+# whole file is served instead, so that a request can't fan out into many seeks
+MAX_RANGES = 16
+
 
 class StaticContentServer(object):
+    def __init__(self):
+        # built once per process: from_config() creates the cache directory
+        self.disk_cache = StaticContentDiskCache.from_config()
+
     def process_request(self, request):
         # look to see if the request is prefixed with an asset prefix tag
         if (
@@ -50,13 +64,17 @@ class StaticContentServer(object):
                     response.status_code = 404
                     return response
 
-                # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < MAX_MEMCACHED_CONTENT_SIZE:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
+                    else:
+                        # too large for memcached: serve it from a local copy if the disk cache is
+                        # configured, so that range requests don't read from GridFS on every seek;
+                        # the copy is written as the asset is first streamed in full
+                        if self.disk_cache is not None:
+                            content = self.disk_cache.get_or_spill(content)
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -79,12 +97,35 @@ class StaticContentServer(object):
             # timestamp, so we can simply compare the strings
             last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
 
+            # the contentstore's digest of the data makes a strong validator; pickled
+            # instances from before it was recorded won't have it
+            content_digest = getattr(content, 'content_digest', None)
+            etag = u'"{}"'.format(content_digest) if content_digest else None
+
+            # A URL carrying the digest of the content it points to never changes
+            # meaning, so it can be cached (by the CDN too, unless the asset is
+            # locked) for as long as browsers allow.
+            cache_control = None
+            if etag is not None and request.GET.get(XASSET_VERSION_PARAM) == content_digest:
+                cache_control = '{}, max-age={}'.format(
+                    'private' if getattr(content, 'locked', False) else 'public',
+                    VERSIONED_CONTENT_MAX_AGE
+                )
+
             # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            # entity tags, or failing that the timestamps, and if they are the
+            # same then just return a 304 (Not Modified)
+            not_modified = False
+            if etag is not None and 'HTTP_IF_NONE_MATCH' in request.META:
+                not_modified = etag_matches(request.META['HTTP_IF_NONE_MATCH'], etag)
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
+                not_modified = request.META['HTTP_IF_MODIFIED_SINCE'] == last_modified_at_str
+            if not_modified:
+                # a 304 carries the same validators the 200 response would have
+                # http://tools.ietf.org/html/rfc7232#section-4.1
+                response = HttpResponseNotModified()
+                set_validator_headers(response, last_modified_at_str, etag, cache_control)
+                return response
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
@@ -94,10 +135,6 @@ class StaticContentServer(object):
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
             if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -110,18 +147,24 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
+                        satisfiable_ranges = [
+                            (first, last) for first, last in ranges if 0 <= first <= last < content.length
+                        ]
+                        if not satisfiable_ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        satisfiable_ranges = coalesce_ranges(satisfiable_ranges, content.length)
+                        if satisfiable_ranges is None:
+                            # too many ranges, or more bytes than the whole file: serve the whole file
+                            log.warning(
+                                u"Ignoring excessive ranges in Range header: %s for content: %s",
+                                header_value, unicode(loc)
+                            )
+                        elif len(satisfiable_ranges) == 1:
+                            first, last = satisfiable_ranges[0]
                             response = HttpResponse(content.stream_data_in_range(first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
@@ -129,10 +172,10 @@ class StaticContentServer(object):
                             response['Content-Length'] = str(last - first + 1)
                             response.status_code = 206  # Partial Content
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            # According to Http/1.1 spec content for multiple ranges should be sent as a
+                            # multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            response = multipart_byteranges_response(content, satisfiable_ranges)
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
@@ -141,12 +184,105 @@ class StaticContentServer(object):
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
-            response['Last-Modified'] = last_modified_at_str
+            # multipart responses carry the content type in each part instead
+            if not response['Content-Type'].startswith('multipart/byteranges'):
+                response['Content-Type'] = content.content_type
+            set_validator_headers(response, last_modified_at_str, etag, cache_control)
 
             return response
 
 
+def set_validator_headers(response, last_modified_at_str, etag, cache_control):
+    """
+    Sets the Last-Modified and, if there are ones, the ETag and Cache-Control
+    headers of `response`.
+    """
+    response['Last-Modified'] = last_modified_at_str
+    if etag is not None:
+        response['ETag'] = etag
+    if cache_control is not None:
+        response['Cache-Control'] = cache_control
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Returns whether `etag` is matched by the value of an If-None-Match header,
+    which is either "*" or a list of entity tags.  As the spec requires for
+    If-None-Match, weak tags match their strong counterparts.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.26
+    """
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == '*' or tag == etag:
+            return True
+    return False
+
+
+def coalesce_ranges(ranges, content_length):
+    """
+    Returns the (first, last) tuples of `ranges` sorted, with overlapping and
+    adjacent ranges merged, or None if the header should be ignored because it
+    asks for more than MAX_RANGES ranges or, in total, for more bytes than the
+    `content_length` of the whole file.
+
+    See spec for details: https://tools.ietf.org/html/rfc7233#section-6.1
+    """
+    if len(ranges) > MAX_RANGES:
+        return None
+    if sum(last - first + 1 for first, last in ranges) > content_length:
+        return None
+
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def multipart_byteranges_response(content, ranges):
+    """
+    Returns a 206 Partial Content response whose body is a multipart/byteranges
+    message with one part for each (first, last) tuple in `ranges`.  The parts
+    are streamed from `content` rather than built in memory.
+    """
+    boundary = uuid4().hex
+    part_headers = [
+        '--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {first}-{last}/{length}\r\n\r\n'.format(
+            boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+        )
+        for first, last in ranges
+    ]
+    closing = '\r\n--{boundary}--\r\n'.format(boundary=boundary)
+
+    def _parts():
+        """
+        Yields the body of the multipart message.
+        """
+        for index, (part_header, (first, last)) in enumerate(zip(part_headers, ranges)):
+            if index > 0:
+                yield '\r\n'
+            yield part_header
+            for chunk in content.stream_data_in_range(first, last):
+                yield chunk
+        yield closing
+
+    content_length = (
+        sum(len(part_header) for part_header in part_headers) +
+        sum(last - first + 1 for first, last in ranges) +
+        len('\r\n') * (len(ranges) - 1) +
+        len(closing)
+    )
+    response = HttpResponse(_parts(), content_type='multipart/byteranges; boundary={}'.format(boundary))
+    response['Content-Length'] = str(content_length)
+    response.status_code = 206  # Partial Content
+    return response
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
@@ -4,20 +4,30 @@ Tests for StaticContentServer
 import copy
 import ddt
 import logging
+import os
+import shutil
+import tempfile
 import unittest
+from datetime import datetime
+from mock import patch
+from pytz import UTC
+from StringIO import StringIO
 from uuid import uuid4
 
 from django.conf import settings
 from django.test.client import Client
 from django.test.utils import override_settings
 
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from xmodule.contentstore.content import StaticContentStream
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_from_xml
 
-from contentserver.middleware import parse_range_header
+from contentserver.caching import PARTIAL_FILE_PREFIX, STALE_PARTIAL_FILE_AGE, StaticContentDiskCache
+from contentserver.middleware import MAX_RANGES, coalesce_ranges, parse_range_header
 from student.models import CourseEnrollment
 
 log = logging.getLogger(__name__)
@@ -110,6 +120,74 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200)
 
+    def test_etag(self):
+        """
+        Test that the ETag is the content digest recorded by the contentstore.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp['ETag'], '"{}"'.format(self.contentstore.get_attr(self.unlocked_asset, 'md5')))
+        self.assertNotIn('Cache-Control', resp)
+
+    def test_if_none_match(self):
+        """
+        Test that a request with a matching If-None-Match gets a 304 (Not Modified).
+        """
+        etag = self.client.get(self.url_unlocked)['ETag']
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", {}'.format(etag))
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='W/{}'.format(etag))
+        self.assertEqual(resp.status_code, 304)
+
+    def test_if_modified_since(self):
+        """
+        Test that a 304 (Not Modified) for If-Modified-Since carries the same validators as the 200.
+        """
+        full_resp = self.client.get(self.url_unlocked)
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=full_resp['Last-Modified'])
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], full_resp['ETag'])
+        self.assertEqual(resp['Last-Modified'], full_resp['Last-Modified'])
+
+    def test_if_none_match_takes_precedence(self):
+        """
+        Test that a non-matching If-None-Match is not overridden by If-Modified-Since.
+        """
+        last_modified = self.client.get(self.url_unlocked)['Last-Modified']
+        resp = self.client.get(
+            self.url_unlocked, HTTP_IF_NONE_MATCH='"other"', HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    def test_versioned_url(self):
+        """
+        Test that URLs carrying the content digest are cacheable for a long time.
+        """
+        digest = self.contentstore.get_attr(self.unlocked_asset, 'md5')
+        resp = self.client.get(self.url_unlocked, {'v': digest})
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=31536000')
+
+        # so is a 304 for them
+        resp = self.client.get(self.url_unlocked, {'v': digest}, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=31536000')
+
+        # a stale version is served, but not cached for long
+        resp = self.client.get(self.url_unlocked, {'v': 'stale'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('Cache-Control', resp)
+
+    def test_versioned_url_locked(self):
+        """
+        Test that locked content at a versioned URL is only cached privately.
+        """
+        self.client.login(username=self.staff_usr, password=self.staff_pwd)
+        digest = self.contentstore.get_attr(self.locked_asset, 'md5')
+        resp = self.client.get(self.url_locked, {'v': digest})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Cache-Control'], 'private, max-age=31536000')
+
     def test_range_request_full_file(self):
         """
         Test that a range request from byte 0 to last,
@@ -146,17 +224,63 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart message with
+        one part for each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
-        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -10'.format(
             first=first_byte, last=last_byte)
         )
 
-        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
         self.assertNotIn('Content-Range', resp)
-        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+
+        full_content = self.client.get(self.url_unlocked).content
+        boundary = resp['Content-Type'].split('boundary=')[1]
+        parts = resp.content.split('--' + boundary)
+        # leading empty string, two parts, and the closing '--'
+        self.assertEqual(len(parts), 4)
+        self.assertIn(
+            'Content-Range: bytes {first}-{last}/{length}\r\n\r\n{data}\r\n'.format(
+                first=first_byte, last=last_byte, length=self.length_unlocked,
+                data=full_content[first_byte:last_byte + 1]
+            ),
+            parts[1]
+        )
+        self.assertIn(
+            'Content-Range: bytes {first}-{last}/{length}\r\n\r\n{data}\r\n'.format(
+                first=self.length_unlocked - 10, last=self.length_unlocked - 1, length=self.length_unlocked,
+                data=full_content[-10:]
+            ),
+            parts[2]
+        )
+
+    def test_range_request_multiple_ranges_one_satisfiable(self):
+        """
+        Test that unsatisfiable ranges are dropped from a request for multiple ranges.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9, {first}-'.format(
+            first=self.length_unlocked)
+        )
+
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp['Content-Range'], 'bytes 0-9/{length}'.format(length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '10')
+
+    def test_range_request_from_cache(self):
+        """
+        Test that range requests for content in the cache are served from it.
+        """
+        # the first request puts the content in the cache
+        full_content = self.client.get(self.url_unlocked).content
+        with patch('contentserver.middleware.AssetManager.find') as mock_find:
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=5-14')
+        self.assertFalse(mock_find.called)
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, full_content[5:15])
 
     @ddt.data(
         'bytes 0-',
@@ -192,6 +316,143 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         )
         self.assertEqual(resp.status_code, 416)
 
+    def test_range_request_overlapping_ranges_merged(self):
+        """
+        Test that overlapping and adjacent ranges are served as a single range.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=5-9, 0-4, 3-6')
+
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp['Content-Range'], 'bytes 0-9/{length}'.format(length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '10')
+
+    def test_range_request_too_many_ranges(self):
+        """
+        Test that a Range header asking for more than MAX_RANGES ranges is ignored.
+        """
+        header_value = 'bytes=' + ', '.join('{0}-{0}'.format(2 * index) for index in range(MAX_RANGES + 1))
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE=header_value)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('Content-Range', resp)
+        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+    def test_range_request_more_than_whole_file(self):
+        """
+        Test that ranges adding up to more than the whole file result in a full content response.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-, 0-')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('Content-Range', resp)
+        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+
+class StaticContentDiskCacheTestCase(unittest.TestCase):
+    """
+    Tests for the StaticContentDiskCache.
+    """
+    def setUp(self):
+        self.root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_path)
+        self.course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+
+    def _content(self, name, data, last_modified_at=datetime(2015, 1, 1, tzinfo=UTC)):
+        """
+        Returns a StaticContentStream as read from the contentstore.
+        """
+        return StaticContentStream(
+            self.course_key.make_asset_key('asset', name), name, 'application/pdf', StringIO(data),
+            last_modified_at=last_modified_at, length=len(data)
+        )
+
+    def _read_through(self, disk_cache, name, data, last_modified_at=datetime(2015, 1, 1, tzinfo=UTC)):
+        """
+        Streams the whole of an asset through `disk_cache`, returning its data.
+        """
+        content = disk_cache.get_or_spill(self._content(name, data, last_modified_at))
+        return ''.join(content.stream_data())
+
+    def test_spill_and_hit(self):
+        disk_cache = StaticContentDiskCache(self.root_path, 1024)
+        self.assertEqual(self._read_through(disk_cache, 'a.pdf', 'a' * 100), 'a' * 100)
+        self.assertEqual(len(os.listdir(self.root_path)), 1)
+
+        # the copy on disk is used rather than the contentstore's data
+        self.assertEqual(self._read_through(disk_cache, 'a.pdf', 'b' * 100), 'a' * 100)
+        content = disk_cache.get_or_spill(self._content('a.pdf', 'b' * 100))
+        self.assertEqual(content.length, 100)
+        self.assertEqual(''.join(content.stream_data_in_range(10, 19)), 'a' * 10)
+
+    def test_data_streamed_while_copied(self):
+        disk_cache = StaticContentDiskCache(self.root_path, 10 * 1024)
+        data = 'a' * 3000
+        path = disk_cache.path_for(self._content('a.pdf', data))
+        chunks = disk_cache.get_or_spill(self._content('a.pdf', data)).stream_data()
+
+        # the first chunk is served before the copy is complete
+        first_chunk = next(chunks)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(first_chunk + ''.join(chunks), data)
+        self.assertEqual(os.listdir(self.root_path), [os.path.basename(path)])
+
+    def test_partial_read_not_cached(self):
+        disk_cache = StaticContentDiskCache(self.root_path, 10 * 1024)
+        data = 'a' * 3000
+        content = disk_cache.get_or_spill(self._content('a.pdf', data))
+        self.assertEqual(''.join(content.stream_data_in_range(1000, 1999)), 'a' * 1000)
+        self.assertEqual(os.listdir(self.root_path), [])
+
+        # an interrupted download leaves no partial copy behind
+        chunks = disk_cache.get_or_spill(self._content('a.pdf', data)).stream_data()
+        next(chunks)
+        chunks.close()
+        self.assertEqual(os.listdir(self.root_path), [])
+
+    def test_range_from_start_cached(self):
+        disk_cache = StaticContentDiskCache(self.root_path, 1024)
+        content = disk_cache.get_or_spill(self._content('a.pdf', 'a' * 100))
+        self.assertEqual(''.join(content.stream_data_in_range(0, 99)), 'a' * 100)
+        self.assertEqual(len(os.listdir(self.root_path)), 1)
+
+    def test_new_upload_not_served_from_old_copy(self):
+        disk_cache = StaticContentDiskCache(self.root_path, 1024)
+        self._read_through(disk_cache, 'a.pdf', 'a' * 100)
+        self.assertEqual(
+            self._read_through(disk_cache, 'a.pdf', 'b' * 100, datetime(2015, 2, 1, tzinfo=UTC)), 'b' * 100
+        )
+
+    def test_too_large_not_cached(self):
+        disk_cache = StaticContentDiskCache(self.root_path, 50)
+        original = self._content('a.pdf', 'a' * 100)
+        self.assertIs(disk_cache.get_or_spill(original), original)
+        self.assertEqual(os.listdir(self.root_path), [])
+
+    def test_prune(self):
+        disk_cache = StaticContentDiskCache(self.root_path, 250)
+        for name in ('a.pdf', 'b.pdf', 'c.pdf'):
+            self._read_through(disk_cache, name, 'x' * 100)
+            # make sure modification times differ
+            for filename in os.listdir(self.root_path):
+                path = os.path.join(self.root_path, filename)
+                os.utime(path, (os.path.getmtime(path) - 10,) * 2)
+
+        self.assertEqual(len(os.listdir(self.root_path)), 2)
+        self.assertFalse(os.path.exists(disk_cache.path_for(self._content('a.pdf', 'x' * 100))))
+        self.assertTrue(os.path.exists(disk_cache.path_for(self._content('c.pdf', 'x' * 100))))
+
+    def test_prune_stale_partial_copies(self):
+        disk_cache = StaticContentDiskCache(self.root_path, 1024)
+        handle, stale_path = tempfile.mkstemp(prefix=PARTIAL_FILE_PREFIX, dir=self.root_path)
+        os.close(handle)
+        os.utime(stale_path, (os.path.getmtime(stale_path) - STALE_PARTIAL_FILE_AGE - 10,) * 2)
+        handle, recent_path = tempfile.mkstemp(prefix=PARTIAL_FILE_PREFIX, dir=self.root_path)
+        os.close(handle)
+
+        self._read_through(disk_cache, 'a.pdf', 'a' * 100)
+        self.assertFalse(os.path.exists(stale_path))
+        self.assertTrue(os.path.exists(recent_path))
+
 
 @ddt.ddt
 class ParseRangeHeaderTestCase(unittest.TestCase):
@@ -236,3 +497,29 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertRaisesRegexp(
             exception_class, exception_message_regex, parse_range_header, header_value, self.content_length
         )
+
+
+@ddt.ddt
+class CoalesceRangesTestCase(unittest.TestCase):
+    """
+    Tests for the coalesce_ranges function.
+    """
+
+    @ddt.data(
+        ([(100, 199)], [(100, 199)]),
+        ([(200, 299), (100, 149)], [(100, 149), (200, 299)]),
+        ([(100, 199), (150, 299)], [(100, 299)]),
+        ([(100, 199), (200, 299)], [(100, 299)]),
+        ([(100, 999), (200, 299)], [(100, 999)]),
+    )
+    @ddt.unpack
+    def test_merge(self, ranges, expected_ranges):
+        self.assertEqual(coalesce_ranges(ranges, 10000), expected_ranges)
+
+    def test_too_many_ranges(self):
+        ranges = [(index * 10, index * 10) for index in range(MAX_RANGES + 1)]
+        self.assertIsNone(coalesce_ranges(ranges, 10000))
+        self.assertEqual(len(coalesce_ranges(ranges[:MAX_RANGES], 10000)), MAX_RANGES)
+
+    def test_more_than_content_length(self):
+        self.assertIsNone(coalesce_ranges([(0, 5999), (4000, 9999)], 10000))
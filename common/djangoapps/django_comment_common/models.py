@@ -2,13 +2,14 @@ import logging
 
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.cache import cache
 
 from django.dispatch import receiver
 from django.db.models.signals import post_save
 from django.utils.translation import ugettext_noop
 from student.models import CourseEnrollment
 
-from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.django import modulestore, SignalHandler
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule_django.models import CourseKeyField, NoneToEmptyManager
 
@@ -18,6 +19,24 @@ FORUM_ROLE_COMMUNITY_TA = ugettext_noop('Community TA')
 FORUM_ROLE_STUDENT = ugettext_noop('Student')
 
 
+def discussion_modules_cache_key(course_key):
+    """
+    The cache key of the inline discussion modules found in course_key (see
+    django_comment_client.utils).  It lives here, rather than with the code
+    that fills it, so that Studio also clears it when a course is published.
+    """
+    return u"django_comment_common.discussion_modules.{}".format(course_key)
+
+
+@receiver(SignalHandler.course_published)
+@receiver(SignalHandler.course_deleted)
+def clear_discussion_modules_cache(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Forget the inline discussion modules of a course when it's published or deleted.
+    """
+    cache.delete(discussion_modules_cache_key(course_key))
+
+
 @receiver(post_save, sender=CourseEnrollment)
 def assign_default_role_on_enrollment(sender, instance, **kwargs):
     """
@@ -1,16 +1,29 @@
 import logging
 import re
+from urllib import urlencode
+from urlparse import urlparse, urlunparse, parse_qsl
 
 from staticfiles.storage import staticfiles_storage
 from staticfiles import finders
 from django.conf import settings
 
+from cache_toolbox.core import get_course_assets_version
+from xmodule.contentstore.content import StaticContent, XASSET_VERSION_PARAM
+from xmodule.contentstore.django import contentstore
+from xmodule.exceptions import NotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore import ModuleStoreEnum
-from xmodule.contentstore.content import StaticContent
 
 log = logging.getLogger(__name__)
 
+# Compiled url replacement patterns, keyed by the prefix they match
+_URL_REPLACE_PATTERNS = {}
+
+# Rewritten urls of static content in Mongo-backed courses, keyed by (course_id, static path),
+# along with the course's assets version they were worked out for. Urls of assets carry the
+# asset's digest, so they go stale when the asset is saved, which changes the assets version.
+_COURSE_STATIC_URLS = {}
+
 
 def _url_replace_regex(prefix):
     """
@@ -28,6 +41,27 @@ def _url_replace_regex(prefix):
         """.format(prefix=prefix)
 
 
+def _url_replace_pattern(prefix):
+    """
+    Return the compiled `_url_replace_regex` for `prefix`.
+    """
+    pattern = _URL_REPLACE_PATTERNS.get(prefix)
+    if pattern is None:
+        pattern = _URL_REPLACE_PATTERNS[prefix] = re.compile(_url_replace_regex(prefix))
+    return pattern
+
+
+def _static_prefix_regex(data_dir):
+    """
+    Return the regex of the prefixes of static urls, excluding those already
+    pointing into `data_dir`.
+    """
+    return u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=data_dir
+    )
+
+
 def try_staticfiles_lookup(path):
     """
     Try to lookup a path in staticfiles_storage.  If it fails, return
@@ -69,7 +103,7 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
         rest = match.group('rest')
         return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return _url_replace_pattern('/jump_to_id/').sub(replace_jump_to_id_url, text)
 
 
 def replace_course_urls(text, course_key):
@@ -89,7 +123,7 @@ def replace_course_urls(text, course_key):
         rest = match.group('rest')
         return "".join([quote, '/courses/' + course_id + '/', rest, quote])
 
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return _url_replace_pattern('/course/').sub(replace_course_url, text)
 
 
 def process_static_urls(text, replacement_function, data_dir=None):
@@ -108,14 +142,7 @@ def process_static_urls(text, replacement_function, data_dir=None):
         rest = match.group('rest')
         return replacement_function(original, prefix, quote, rest)
 
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=data_dir
-        )),
-        wrap_part_extraction,
-        text
-    )
+    return _url_replace_pattern(_static_prefix_regex(data_dir)).sub(wrap_part_extraction, text)
 
 
 def make_static_urls_absolute(request, html):
@@ -147,6 +174,60 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
     course_id: The course identifier used to distinguish static content for this course in studio
     static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
     """
+    return process_static_urls(
+        text,
+        _static_url_replacer(data_directory, course_id, static_asset_path),
+        data_dir=static_asset_path or data_directory
+    )
+
+
+def replace_urls(text, data_directory=None, course_id=None, static_asset_path='', jump_to_id_base_url=None):
+    """
+    Apply `replace_static_urls`, `replace_course_urls` and, if `jump_to_id_base_url`
+    is given, `replace_jump_to_id_urls` to `text` in a single pass, rather than
+    scanning it once for each.
+
+    Arguments are as for those functions; course urls are only replaced if `course_id` is given.
+    """
+    data_dir = static_asset_path or data_directory
+    replace_static_url = _static_url_replacer(data_directory, course_id, static_asset_path)
+    course_url_base = u'/courses/{}/'.format(course_id.to_deprecated_string()) if course_id else None
+
+    prefixes = [_static_prefix_regex(data_dir)]
+    if course_url_base is not None:
+        prefixes.append('/course/')
+    if jump_to_id_base_url is not None:
+        prefixes.append('/jump_to_id/')
+
+    def replace_url(match):
+        """
+        Replace a single matched url, according to its prefix.
+        """
+        quote = match.group('quote')
+        prefix = match.group('prefix')
+        rest = match.group('rest')
+        if prefix == '/course/' and course_url_base is not None:
+            return "".join([quote, course_url_base, rest, quote])
+        elif prefix == '/jump_to_id/' and jump_to_id_base_url is not None:
+            return "".join([quote, jump_to_id_base_url + rest, quote])
+        return replace_static_url(match.group(0), prefix, quote, rest)
+
+    return _url_replace_pattern(u'|'.join(prefixes)).sub(replace_url, text)
+
+
+def _static_url_replacer(data_directory, course_id, static_asset_path):
+    """
+    Return a `process_static_urls` replacement function implementing `replace_static_urls`.
+    """
+    # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls.
+    # Look this up once, rather than for every url.
+    in_mongo_course = bool(
+        not static_asset_path and
+        course_id and
+        modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml
+    )
+    # The course's assets version, looked up for the first url that needs it.
+    assets_version = []
 
     def replace_static_url(original, prefix, quote, rest):
         """
@@ -160,26 +241,10 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
         # In debug mode, if we can find the url as is,
         if settings.DEBUG and finders.find(rest, True):
             return original
-        # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) \
-                and course_id \
-                and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
-            # first look in the static file pipeline and see if we are trying to reference
-            # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
-
-            exists_in_staticfiles_storage = False
-            try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
-            else:
-                # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
+        elif in_mongo_course:
+            if not assets_version:
+                assets_version.append(get_course_assets_version(course_id))
+            url = _course_static_url(course_id, rest, assets_version[0])
         # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
         else:
             course_path = "/".join((static_asset_path or data_directory, rest))
@@ -197,4 +262,64 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
 
         return "".join([quote, url, quote])
 
-    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+    return replace_static_url
+
+
+def _course_static_url(course_id, rest, assets_version):
+    """
+    Return the url of the static path `rest` in the Mongo-backed course `course_id`,
+    remembering it for later renders if settings.STATIC_URL_CACHE_MAX_ENTRIES allows.
+    Remembered urls are only used while the course's assets version is `assets_version`.
+
+    Looking up the digest of an asset costs a contentstore query, so the urls of
+    assets only carry it (see `_versioned_asset_url`) when they are remembered.
+    """
+    max_entries = getattr(settings, 'STATIC_URL_CACHE_MAX_ENTRIES', 0)
+    if max_entries:
+        remembered = _COURSE_STATIC_URLS.get((course_id, rest))
+        if remembered is not None and remembered[0] == assets_version:
+            return remembered[1]
+
+    # first look in the static file pipeline and see if we are trying to reference
+    # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
+    exists_in_staticfiles_storage = False
+    try:
+        exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+    except Exception as err:
+        log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+            rest, str(err)))
+
+    if exists_in_staticfiles_storage:
+        url = staticfiles_storage.url(rest)
+    else:
+        # if not, then assume it's courseware specific content and then look in the
+        # Mongo-backed database
+        url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
+        if max_entries:
+            url = _versioned_asset_url(url, course_id, rest)
+
+    if max_entries:
+        if len(_COURSE_STATIC_URLS) >= max_entries:
+            _COURSE_STATIC_URLS.clear()
+        _COURSE_STATIC_URLS[(course_id, rest)] = (assets_version, url)
+    return url
+
+
+def _versioned_asset_url(url, course_id, rest):
+    """
+    Return the contentstore `url` of the static path `rest` in `course_id` with the
+    digest of the asset's content added as its version parameter, so that the content
+    server lets browsers cache it for a long time. Returns `url` unchanged if there's
+    no such asset.
+    """
+    asset_key = StaticContent.compute_location(course_id, urlparse(rest).path)
+    try:
+        digest = contentstore().get_attr(asset_key, 'md5')
+    except NotFoundError:
+        return url
+    if not digest:
+        return url
+
+    scheme, netloc, path, params, query, fragment = urlparse(url)
+    query_list = parse_qsl(query) + [(XASSET_VERSION_PARAM, digest)]
+    return urlunparse((scheme, netloc, path, params, urlencode(query_list), fragment))
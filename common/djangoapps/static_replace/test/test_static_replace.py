@@ -1,16 +1,22 @@
 import re
 
 from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=no-name-in-module
+from django.test.utils import override_settings
+import static_replace
 from static_replace import (
     replace_static_urls,
     replace_course_urls,
+    replace_jump_to_id_urls,
+    replace_urls,
     _url_replace_regex,
     process_static_urls,
     make_static_urls_absolute
 )
 from mock import patch, Mock
 
+from cache_toolbox.core import del_cached_content
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from xmodule.exceptions import NotFoundError
 from xmodule.modulestore.mongo import MongoModuleStore
 from xmodule.modulestore.xml import XMLModuleStore
 
@@ -143,6 +149,113 @@ def test_static_url_with_query(mock_modulestore, mock_storage):
     assert_equals(post_text, replace_static_urls(pre_text, DATA_DIRECTORY, COURSE_KEY))
 
 
+@patch('static_replace.staticfiles_storage')
+@patch('static_replace.modulestore')
+def test_replace_urls(mock_modulestore, mock_storage):
+    """
+    Make sure replace_urls does in one pass what the separate replacements do
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    jump_to_id_base_url = '/courses/org/course/run/jump_to_id/'
+
+    text = (
+        '<img src="/static/file.png"/><a href=\'/course/info\'>info</a>'
+        '<a href="/jump_to_id/abc">abc</a><img src="/static/file.png?raw"/>'
+    )
+    expected = replace_jump_to_id_urls(
+        replace_course_urls(replace_static_urls(text, DATA_DIRECTORY, COURSE_KEY), COURSE_KEY),
+        COURSE_KEY,
+        jump_to_id_base_url
+    )
+    assert_equals(
+        expected,
+        replace_urls(text, DATA_DIRECTORY, COURSE_KEY, jump_to_id_base_url=jump_to_id_base_url)
+    )
+    assert_equals(
+        '<img src="/c4x/org/course/asset/file.png"/><a href=\'/courses/org/course/run/info\'>info</a>'
+        '<a href="/courses/org/course/run/jump_to_id/abc">abc</a><img src="/static/file.png?raw"/>',
+        expected
+    )
+
+    # without a jump_to_id base url, those links are left alone
+    assert_equals(
+        replace_course_urls(replace_static_urls(text, DATA_DIRECTORY, COURSE_KEY), COURSE_KEY),
+        replace_urls(text, DATA_DIRECTORY, COURSE_KEY)
+    )
+
+
+@override_settings(STATIC_URL_CACHE_MAX_ENTRIES=10)
+@patch('static_replace._COURSE_STATIC_URLS', {})
+@patch('static_replace.contentstore')
+@patch('static_replace.staticfiles_storage')
+@patch('static_replace.modulestore')
+def test_course_static_urls_remembered(mock_modulestore, mock_storage, mock_contentstore):
+    """
+    Make sure urls of content in Mongo-backed courses are only worked out once
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    mock_contentstore.return_value.get_attr.side_effect = NotFoundError
+
+    for __ in range(3):
+        assert_equals('"/c4x/org/course/asset/file.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY, COURSE_KEY))
+    mock_storage.exists.assert_called_once_with('file.png')
+
+
+@override_settings(STATIC_URL_CACHE_MAX_ENTRIES=10)
+@patch('static_replace._COURSE_STATIC_URLS', {})
+@patch('static_replace.contentstore')
+@patch('static_replace.staticfiles_storage')
+@patch('static_replace.modulestore')
+def test_course_static_urls_versioned(mock_modulestore, mock_storage, mock_contentstore):
+    """
+    Make sure remembered urls of assets carry the asset's digest, and are
+    worked out again when the asset changes
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    mock_contentstore.return_value.get_attr.return_value = 'digest1'
+
+    assert_equals(
+        '"/c4x/org/course/asset/file.png?v=digest1"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY, COURSE_KEY)
+    )
+
+    mock_contentstore.return_value.get_attr.return_value = 'digest2'
+    assert_equals(
+        '"/c4x/org/course/asset/file.png?v=digest1"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY, COURSE_KEY)
+    )
+
+    # saving an asset of the course deletes it from the content cache
+    del_cached_content(COURSE_KEY.make_asset_key('asset', 'file.png'))
+    assert_equals(
+        '"/c4x/org/course/asset/file.png?v=digest2"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY, COURSE_KEY)
+    )
+
+
+@override_settings(STATIC_URL_CACHE_MAX_ENTRIES=2)
+@patch('static_replace._COURSE_STATIC_URLS', {})
+@patch('static_replace.contentstore')
+@patch('static_replace.staticfiles_storage')
+@patch('static_replace.modulestore')
+def test_course_static_urls_limited(mock_modulestore, mock_storage, mock_contentstore):
+    """
+    Make sure no more than STATIC_URL_CACHE_MAX_ENTRIES urls are remembered
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    mock_contentstore.return_value.get_attr.side_effect = NotFoundError
+
+    for name in ('a.png', 'b.png', 'c.png'):
+        replace_static_urls('"/static/{}"'.format(name), DATA_DIRECTORY, COURSE_KEY)
+        assert_true(len(static_replace._COURSE_STATIC_URLS) <= 2)  # pylint: disable=protected-access
+
+    # the remembered urls were dropped to make room
+    mock_storage.exists.reset_mock()
+    replace_static_urls('"/static/a.png"', DATA_DIRECTORY, COURSE_KEY)
+    mock_storage.exists.assert_called_once_with('a.png')
+
+
 def test_regex():
     yes = ('"/static/foo.png"',
            '"/static/foo.png"',
@@ -13,7 +13,7 @@ import csv
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand, CommandError
 
-from student.models import anonymous_id_for_user
+from student.models import anonymous_id_for_user, anonymous_ids_for_users
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 
@@ -48,6 +48,10 @@ class Command(BaseCommand):
             self.stdout.write("No students enrolled in %s" % course_key.to_deprecated_string())
             return
 
+        # Look up (and save) everyone's anonymized ids at once
+        anonymous_ids_for_users(students, None)
+        anonymous_ids_for_users(students, course_key)
+
         # Write mapping to output file in CSV format with a simple header
         try:
             with open(output_filename, 'wb') as output_file:
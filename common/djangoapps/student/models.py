@@ -100,13 +100,7 @@ def anonymous_id_for_user(user, course_id, save=True):
     if cached_id is not None:
         return cached_id
 
-    # include the secret key as a salt, and to make the ids unique across different LMS installs.
-    hasher = hashlib.md5()
-    hasher.update(settings.SECRET_KEY)
-    hasher.update(unicode(user.id))
-    if course_id:
-        hasher.update(course_id.to_deprecated_string().encode('utf-8'))
-    digest = hasher.hexdigest()
+    digest = _compute_anonymous_id(user.id, course_id)
 
     if not hasattr(user, '_anonymous_id'):
         user._anonymous_id = {}  # pylint: disable=protected-access
@@ -116,6 +110,77 @@ def anonymous_id_for_user(user, course_id, save=True):
     if save is False:
         return digest
 
+    _save_anonymous_id(user, course_id, digest)
+    return digest
+
+
+def anonymous_ids_for_users(users, course_id):
+    """
+    Return a dict mapping the id of each of `users` to their anonymous id in
+    `course_id`, as `anonymous_id_for_user` would, saving the ids which aren't
+    yet stored with one query.  The ids are also cached on the user objects,
+    so later calls to `anonymous_id_for_user` for them don't query.
+
+    `users` is an iterable of Users, which is iterated over once.
+    """
+    users = list(users)
+    digests = dict((user.id, _compute_anonymous_id(user.id, course_id)) for user in users)
+
+    stored_ids = dict(
+        AnonymousUserId.objects.filter(
+            course_id=course_id,
+            user__in=digests.keys(),
+        ).values_list('user', 'anonymous_user_id')
+    )
+    for user_id, stored_id in stored_ids.iteritems():
+        if stored_id != digests[user_id]:
+            log.error(
+                u"Stored anonymous user id %r for user %r "
+                u"in course %r doesn't match computed id %r",
+                stored_id,
+                user_id,
+                course_id,
+                digests[user_id]
+            )
+
+    missing_users = [user for user in users if user.id not in stored_ids]
+    try:
+        AnonymousUserId.objects.bulk_create([
+            AnonymousUserId(user=user, course_id=course_id, anonymous_user_id=digests[user.id])
+            for user in missing_users
+        ])
+    except IntegrityError:
+        # Another thread has already created some of these entries, so save
+        # the rest one by one.
+        for user in missing_users:
+            _save_anonymous_id(user, course_id, digests[user.id])
+
+    for user in users:
+        if not hasattr(user, '_anonymous_id'):
+            user._anonymous_id = {}  # pylint: disable=protected-access
+        user._anonymous_id[course_id] = digests[user.id]  # pylint: disable=protected-access
+
+    return digests
+
+
+def _compute_anonymous_id(user_id, course_id):
+    """
+    Return the anonymous id of the user with `user_id` in `course_id`.
+    """
+    # include the secret key as a salt, and to make the ids unique across different LMS installs.
+    hasher = hashlib.md5()
+    hasher.update(settings.SECRET_KEY)
+    hasher.update(unicode(user_id))
+    if course_id:
+        hasher.update(course_id.to_deprecated_string().encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def _save_anonymous_id(user, course_id, digest):
+    """
+    Store `digest` as the anonymous id of `user` in `course_id`, if there isn't
+    one stored yet.
+    """
     try:
         anonymous_user_id, __ = AnonymousUserId.objects.get_or_create(
             defaults={'anonymous_user_id': digest},
@@ -136,8 +201,6 @@ def anonymous_id_for_user(user, course_id, save=True):
         # continue
         pass
 
-    return digest
-
 
 def user_by_anonymous_id(uid):
     """
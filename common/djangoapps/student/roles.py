@@ -40,19 +40,15 @@ class RoleCache(object):
     """
     def __init__(self, user):
         self._roles = set(
-            CourseAccessRole.objects.filter(user=user).all()
+            (access_role.role, access_role.course_id, access_role.org)
+            for access_role in CourseAccessRole.objects.filter(user=user)
         )
 
     def has_role(self, role, course_id, org):
         """
         Return whether this RoleCache contains a role with the specified role, course_id, and org
         """
-        return any(
-            access_role.role == role and
-            access_role.course_id == course_id and
-            access_role.org == org
-            for access_role in self._roles
-        )
+        return (role, course_id, org) in self._roles
 
 
 class AccessRole(object):
@@ -191,3 +191,10 @@ class RoleCacheTestCase(TestCase):
     def test_empty_cache(self, role, target):
         cache = RoleCache(self.user)
         self.assertFalse(cache.has_role(*target))
+
+    def test_roles_fetched_once(self):
+        for role, __ in self.ROLES:
+            role.add_users(self.user)
+        with self.assertNumQueries(1):
+            for role, __ in self.ROLES:
+                self.assertTrue(role.has_user(self.user))
@@ -21,7 +21,7 @@ from mock import Mock, patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 from student.models import (
-    anonymous_id_for_user, user_by_anonymous_id, CourseEnrollment, unique_id_for_user,
+    anonymous_id_for_user, anonymous_ids_for_users, user_by_anonymous_id, CourseEnrollment, unique_id_for_user,
     LinkedInAddToProfileConfiguration
 )
 from student.views import (process_survey_link, _cert_info,
@@ -931,3 +931,22 @@ class AnonymousLookupTable(ModuleStoreTestCase):
         real_user = user_by_anonymous_id(anonymous_id)
         self.assertEqual(self.user, real_user)
         self.assertEqual(anonymous_id, anonymous_id_for_user(self.user, course2.id, save=False))
+
+    def test_bulk_lookup(self):
+        users = [UserFactory() for __ in range(3)]
+        # One user's id is already stored.
+        existing_id = anonymous_id_for_user(users[0], self.course.id)
+        for user in users:
+            del user._anonymous_id  # pylint: disable=protected-access
+
+        # One query for the stored ids and one to save the others.
+        with self.assertNumQueries(2):
+            anonymous_ids = anonymous_ids_for_users(users, self.course.id)
+
+        self.assertEqual(anonymous_ids[users[0].id], existing_id)
+        for user in users:
+            self.assertEqual(user_by_anonymous_id(anonymous_ids[user.id]), user)
+            self.assertEqual(anonymous_ids[user.id], anonymous_id_for_user(user, self.course.id, save=False))
+            # Now cached on the user.
+            with self.assertNumQueries(0):
+                self.assertEqual(anonymous_ids[user.id], anonymous_id_for_user(user, self.course.id))
@@ -0,0 +1,165 @@
+"""
+Event tracker backend that hands events to another backend from a background
+thread, in batches, so that sending them doesn't add to request latency.
+
+Wrap the backend to buffer in the configuration, for example::
+
+  TRACKING_BACKENDS = {
+      'sql': {
+          'ENGINE': 'track.backends.buffered.BufferedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.django.DjangoBackend',
+                  'OPTIONS': {},
+              },
+              'max_batch_size': 100,
+              'flush_interval': 1,
+              'max_queue_size': 10000,
+              'block_timeout': 0,
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+from Queue import Queue, Empty, Full
+import threading
+import time
+
+from dogapi import dog_stats_api
+from django.db import close_connection
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+
+class BufferedBackend(BaseBackend):
+    """
+    Event tracker backend that queues events for a background thread, which
+    passes them to the wrapped backend's `send_batch`.
+    """
+
+    def __init__(self, backend, max_batch_size=100, flush_interval=1, max_queue_size=10000, block_timeout=0,
+                 **kwargs):
+        """
+        :Parameters:
+
+          - `backend`: the configuration of the wrapped backend, a dict with
+            an `ENGINE` and optionally `OPTIONS`, as in TRACKING_BACKENDS.
+          - `max_batch_size`: the most events to send to the backend at once.
+          - `flush_interval`: the most seconds an event waits in the queue
+            for a batch to fill up.
+          - `max_queue_size`: the most events to queue.  Further events are
+            dropped, and counted in `dropped_events`.
+          - `block_timeout`: seconds to wait for room in a full queue before
+            dropping an event.  0 drops it immediately.
+
+        """
+        super(BufferedBackend, self).__init__(**kwargs)
+
+        # Avoid a circular import: track.tracker instantiates this backend.
+        from track.tracker import _instantiate_backend_from_name
+
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.dropped_events = 0
+
+        self._queue = Queue(max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        atexit.register(self.flush)
+
+    def send(self, event):
+        """
+        Queue `event` to be sent, dropping it if the queue stays full.
+        """
+        self._ensure_thread()
+        try:
+            if self.block_timeout:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except Full:
+            self.dropped_events += 1
+            dog_stats_api.increment('track.buffered.dropped', tags=[u'backend:{}'.format(type(self.backend).__name__)])
+
+    def flush(self):
+        """
+        Send all queued events now, from the calling thread.
+        """
+        while True:
+            batch = self._get_batch(block=False)
+            if not batch:
+                break
+            self._send_batch(batch)
+
+    def _ensure_thread(self):
+        """
+        Start the background thread, if this process doesn't have one yet.
+        """
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            # A thread started before this process was forked doesn't run in it.
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='track.backends.buffered')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        """
+        Send batches of events from the queue for the life of the process.
+        """
+        while True:
+            batch = self._get_batch(block=True)
+            if batch:
+                self._send_batch(batch)
+                # This thread's database connections would otherwise stay
+                # open (and possibly time out) between batches.
+                close_connection()
+
+    def _get_batch(self, block):
+        """
+        Take up to `max_batch_size` events from the queue.  If `block`, wait
+        for the first event, then up to `flush_interval` seconds for the
+        batch to fill up.
+        """
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get())
+                deadline = time.time() + self.flush_interval
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    batch.append(self._queue.get(timeout=remaining))
+            else:
+                while len(batch) < self.max_batch_size:
+                    batch.append(self._queue.get_nowait())
+        except Empty:
+            pass
+        return batch
+
+    def _send_batch(self, batch):
+        """
+        Send `batch` to the wrapped backend, logging (rather than raising) any error.
+        """
+        try:
+            with dog_stats_api.timer('track.buffered.send_batch'):
+                self.backend.send_batch(batch)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Error sending a batch of %d events to %s', len(batch), self.backend)
@@ -0,0 +1,78 @@
+from __future__ import absolute_import
+
+from Queue import Queue
+import time
+
+from mock import patch
+from django.test import TestCase
+
+from track.backends import BaseBackend
+from track.backends.buffered import BufferedBackend
+
+
+class RecordingBackend(BaseBackend):
+    """Backend which records the batches it's sent."""
+    def __init__(self, **kwargs):
+        super(RecordingBackend, self).__init__(**kwargs)
+        self.batches = Queue()
+
+    def send(self, event):
+        self.batches.put([event])
+
+    def send_batch(self, events):
+        self.batches.put(events)
+
+
+class TestBufferedBackend(TestCase):
+    def make_backend(self, **options):
+        """Return a BufferedBackend wrapping a RecordingBackend."""
+        backend = {'ENGINE': 'track.backends.tests.test_buffered.RecordingBackend'}
+        return BufferedBackend(backend=backend, **options)
+
+    def test_flush_sends_batches(self):
+        backend = self.make_backend(max_batch_size=2)
+        # Don't let the background thread take the events.
+        with patch.object(backend, '_ensure_thread'):
+            for i in range(5):
+                backend.send({'test': i})
+        backend.flush()
+
+        batches = backend.backend.batches
+        self.assertEqual(batches.get_nowait(), [{'test': 0}, {'test': 1}])
+        self.assertEqual(batches.get_nowait(), [{'test': 2}, {'test': 3}])
+        self.assertEqual(batches.get_nowait(), [{'test': 4}])
+        self.assertTrue(batches.empty())
+
+    def test_background_thread_sends_events(self):
+        backend = self.make_backend(max_batch_size=10, flush_interval=0.1)
+        backend.send({'test': 1})
+        backend.send({'test': 2})
+
+        sent = []
+        deadline = time.time() + 5
+        while len(sent) < 2 and time.time() < deadline:
+            sent.extend(backend.backend.batches.get(timeout=5))
+        self.assertEqual(sent, [{'test': 1}, {'test': 2}])
+
+    @patch('track.backends.buffered.dog_stats_api')
+    def test_full_queue_drops_events(self, mock_dog_stats_api):
+        backend = self.make_backend(max_queue_size=2)
+        with patch.object(backend, '_ensure_thread'):
+            for i in range(3):
+                backend.send({'test': i})
+
+        self.assertEqual(backend.dropped_events, 1)
+        mock_dog_stats_api.increment.assert_called_once_with(
+            'track.buffered.dropped', tags=[u'backend:RecordingBackend']
+        )
+        backend.flush()
+        self.assertEqual(backend.backend.batches.get_nowait(), [{'test': 0}, {'test': 1}])
+
+    def test_backend_errors_are_logged(self):
+        backend = self.make_backend()
+        with patch.object(backend, '_ensure_thread'):
+            backend.send({'test': 1})
+        with patch.object(backend.backend, 'send_batch', side_effect=Exception):
+            with patch('track.backends.buffered.log') as mock_log:
+                backend.flush()
+        self.assertTrue(mock_log.exception.called)
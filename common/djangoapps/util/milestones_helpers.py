@@ -9,7 +9,7 @@ from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
 
 from courseware.models import StudentModule
-from xmodule.modulestore.django import modulestore
+from openedx.core.djangoapps.course_overviews.models import CourseOverview
 
 from milestones.api import (
     get_course_milestones,
@@ -98,10 +98,10 @@ def get_pre_requisite_courses_not_completed(user, enrolled_courses):
                     if key == 'courses' and value:
                         for required_course in value:
                             required_course_key = CourseKey.from_string(required_course)
-                            required_course_descriptor = modulestore().get_course(required_course_key)
+                            required_course_overview = CourseOverview.get_from_id(required_course_key)
                             required_courses.append({
                                 'key': required_course_key,
-                                'display': get_course_display_name(required_course_descriptor)
+                                'display': get_course_display_name(required_course_overview)
                             })
 
             # if there are required courses add to dict
@@ -120,10 +120,10 @@ def get_prerequisite_courses_display(course_descriptor):
     if settings.FEATURES.get('ENABLE_PREREQUISITE_COURSES', False) and course_descriptor.pre_requisite_courses:
         for course_id in course_descriptor.pre_requisite_courses:
             course_key = CourseKey.from_string(course_id)
-            required_course_descriptor = modulestore().get_course(course_key)
+            required_course_overview = CourseOverview.get_from_id(course_key)
             prc = {
                 'key': course_key,
-                'display': get_course_display_name(required_course_descriptor)
+                'display': get_course_display_name(required_course_overview)
             }
             pre_requisite_courses.append(prc)
     return pre_requisite_courses
@@ -131,7 +131,7 @@ def get_prerequisite_courses_display(course_descriptor):
 
 def get_course_display_name(descriptor):
     """
-    It would return display name from given course descriptor
+    It would return display name from given course descriptor or CourseOverview
     """
     return ' '.join([
         descriptor.display_org_with_default,
@@ -164,6 +164,21 @@ def replace_static_urls(data_dir, block, view, frag, context, course_id=None, st
     ))
 
 
+def replace_urls(data_dir, block, view, frag, context, course_id=None, static_asset_path='', jump_to_id_base_url=None):  # pylint: disable=unused-argument
+    """
+    Does the work of `replace_static_urls`, `replace_course_urls` and (if
+    `jump_to_id_base_url` is given) `replace_jump_to_id_urls` in a single pass
+    over the fragment's content.
+    """
+    return wrap_fragment(frag, static_replace.replace_urls(
+        frag.content,
+        data_dir,
+        course_id,
+        static_asset_path=static_asset_path,
+        jump_to_id_base_url=jump_to_id_base_url
+    ))
+
+
 def grade_histogram(module_id):
     '''
     Print out a histogram of grades on a given problem in staff member debug info.
@@ -13,11 +13,14 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+from collections import namedtuple, OrderedDict
 from copy import deepcopy
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from pytz import UTC
@@ -62,6 +65,55 @@ log = logging.getLogger(__name__)
 # main class for this module
 
 
+# The parsed, ID-assigned tree of a problem, which doesn't depend on the seed.
+# `response_positions` locates the responses and their inputs in the tree, for
+# copies of it (see LoncapaProblem._assign_ids).
+ParsedProblem = namedtuple('ParsedProblem', 'problem_text tree response_positions has_includes')
+
+
+class ParsedProblemCache(object):
+    """
+    A thread-safe cache of the most recently used ParsedProblems, by problem id
+    and a hash of the problem's definition.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._parsed_problems = OrderedDict()
+
+    def get(self, key):
+        """
+        Return the ParsedProblem for `key`, or None if it isn't cached.
+        """
+        with self._lock:
+            parsed_problem = self._parsed_problems.pop(key, None)
+            if parsed_problem is not None:
+                # Move it to the end, as the most recently used.
+                self._parsed_problems[key] = parsed_problem
+            return parsed_problem
+
+    def set(self, key, parsed_problem):
+        """
+        Cache `parsed_problem` for `key`, evicting the least recently used
+        ParsedProblem if the cache is full.
+        """
+        with self._lock:
+            self._parsed_problems.pop(key, None)
+            self._parsed_problems[key] = parsed_problem
+            while len(self._parsed_problems) > self.size:
+                self._parsed_problems.popitem(last=False)
+
+    def clear(self):
+        """
+        Empty the cache.
+        """
+        with self._lock:
+            self._parsed_problems.clear()
+
+
+PARSED_PROBLEM_CACHE = ParsedProblemCache(500)
+
+
 class LoncapaSystem(object):
     """
     An encapsulation of resources needed from the outside.
@@ -154,25 +206,21 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # Parsing the problem and assigning IDs doesn't depend on the seed, so
+        # it's shared by every LoncapaProblem of the same definition; each just
+        # gets its own copy of the tree.
+        parsed_problem = self._get_parsed_problem(problem_text)
+        self.problem_text = parsed_problem.problem_text
+        self.tree = deepcopy(parsed_problem.tree)
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
 
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
-        # transformations.  This also creates the dict (self.responders) of Response
-        # instances for each question in the problem. The dict has keys = xml subtree of
-        # Response, values = Response instance
-        self._preprocess_problem(self.tree)
+        # Pre-parse the XML tree: performs some in-place transformations.  This
+        # also creates the dict (self.responders) of Response instances for each
+        # question in the problem. The dict has keys = xml subtree of Response,
+        # values = Response instance
+        self._preprocess_problem(self.tree, parsed_problem.response_positions)
 
         if not self.student_answers:  # True when student_answers is an empty dict
             self.set_initial_display()
@@ -774,19 +822,55 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree):  # private
+    def _get_parsed_problem(self, problem_text):
+        """
+        Return the ParsedProblem of `problem_text`, from PARSED_PROBLEM_CACHE if
+        this problem has been parsed before.  The tree of the ParsedProblem is
+        shared, so must not be modified.
+        """
+        text_hash = hashlib.md5(problem_text.encode('utf-8') if isinstance(problem_text, unicode) else problem_text)
+        key = (self.problem_id, text_hash.hexdigest())
+        parsed_problem = PARSED_PROBLEM_CACHE.get(key)
+        if parsed_problem is None:
+            parsed_problem = self._parse_problem(problem_text)
+            # Included files may change without the problem changing, so only
+            # cache problems which don't include any.
+            if not parsed_problem.has_includes:
+                PARSED_PROBLEM_CACHE.set(key, parsed_problem)
+        return parsed_problem
+
+    def _parse_problem(self, problem_text):
+        """
+        Parse `problem_text`, process its includes and assign IDs to its
+        responses and their inputs, returning a ParsedProblem.
+        """
+        # Convert startouttext and endouttext to proper <text></text>
+        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+
+        # parse problem XML file into an element tree
+        self.tree = etree.XML(problem_text)
+        has_includes = bool(self.tree.findall('.//include'))
+
+        # handle any <include file="foo"> tags
+        self._process_includes()
+
+        response_positions = self._assign_ids(self.tree)
+        return ParsedProblem(problem_text, self.tree, response_positions, has_includes)
+
+    def _assign_ids(self, tree):  # private
         """
         Assign IDs to all the responses
         Assign sub-IDs to all entries (textline, schematic, etc.)
-        Annoted correctness and value
         In-place transformation
 
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        Returns a list with an item for each response, of the position of the
+        response in `tree.iter()` and a list of the positions of its entries.
         """
+        positions = dict((element, position) for position, element in enumerate(tree.iter()))
+        response_positions = []
+
         response_id = 1
-        self.responders = {}
         for response in tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags())):
             response_id_str = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
@@ -807,6 +891,27 @@ class LoncapaProblem(object):
                 entry.attrib['id'] = "%s_%i_%i" % (self.problem_id, response_id, answer_id)
                 answer_id = answer_id + 1
 
+            response_positions.append((positions[response], [positions[entry] for entry in inputfields]))
+
+        return response_positions
+
+    def _preprocess_problem(self, tree, response_positions):  # private
+        """
+        Annoted correctness and value
+        In-place transformation
+
+        Create capa Response instances for each responsetype and save as self.responders.
+        `response_positions` is what `_assign_ids` returned for the tree `tree` was
+        copied from.
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        """
+        elements = list(tree.iter())
+        self.responders = {}
+        for response_position, inputfield_positions in response_positions:
+            response = elements[response_position]
+            inputfields = [elements[position] for position in inputfield_positions]
+
             # instantiate capa Response
             responsetype_cls = responsetypes.registry.get_class_for_tag(response.tag)
             responder = responsetype_cls(response, inputfields, self.context, self.capa_system)
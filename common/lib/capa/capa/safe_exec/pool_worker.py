@@ -0,0 +1,308 @@
+"""
+The program run by each process of the sandbox pool (see sandbox_pool.py).
+
+This file isn't imported: its source is run by the sandboxed Python with -c,
+so it must only use the standard library.  The names of modules to import up
+front are passed as arguments.
+
+The worker reads jobs from stdin, one JSON object per line, and writes one
+JSON result line to stdout for each.  Right after importing, the worker forks
+a template process, which never sees any job's data.  Every job runs in a
+child forked from the template, in a fresh temporary directory and with the
+sandbox's resource limits, so nothing a job does can affect the worker or
+later jobs, and no job can read what an earlier one was given or returned.
+Children inherit the modules imported by the worker, which is what makes this
+faster than starting a new sandboxed Python for every execution.
+
+A job has these keys:
+
+    code: the code to run.
+    globals: the JSON-safe globals to run it with.
+    extra_files: a list of [filename, base64-encoded contents] pairs to
+        create in the temporary directory.
+    python_path: a list of names (of extra files) to add to sys.path.
+    limits: a dict of the codejail limits: "CPU" seconds, "VMEM" bytes and
+        "REALTIME" seconds.  A limit of 0 is no limit.
+
+A result is either {"globals": the JSON-safe globals after running the code}
+or {"error": a description of what went wrong}.
+"""
+import errno
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+# Wall clock seconds a job may take if no REALTIME limit is given.
+DEFAULT_REALTIME = 5
+
+# The file descriptors to close in a job's child if there's no limit on them.
+MAXFD = 65536
+
+# The files in a job's temporary directory holding its job and its result.
+JOB_FILE = "job.json"
+RESULT_FILE = "result.json"
+
+# The types of the globals that are passed back, like codejail's jailed code.
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+BAD_KEYS = ("__builtins__",)
+
+
+def jsonable_globals(g_dict):
+    """
+    Return the items of `g_dict` which can be passed back as JSON.
+    """
+    def jsonable(value):
+        """Return whether `value` can be serialized."""
+        if not isinstance(value, OK_TYPES):
+            return False
+        try:
+            json.dumps(value)
+        except Exception:  # pylint: disable=broad-except
+            return False
+        return True
+
+    return dict((k, v) for k, v in g_dict.iteritems() if k not in BAD_KEYS and jsonable(v))
+
+
+def set_limits(limits):
+    """
+    Apply the sandbox's resource limits to this (child) process.
+    """
+    # No subprocesses.
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    # CPU seconds, not wall clock time.
+    cpu = limits.get("CPU")
+    if cpu:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    # Total process virtual memory.
+    vmem = limits.get("VMEM")
+    if vmem:
+        resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+
+
+def isolate_fds(*keep_fds):
+    """
+    Point stdin, stdout and stderr of this process at /dev/null, and close
+    every other file descriptor except `keep_fds`, so a job can't read the
+    worker's queued jobs or write fake results to it.
+    """
+    devnull_fd = os.open(os.devnull, os.O_RDWR)
+    for std_fd in (0, 1, 2):
+        os.dup2(devnull_fd, std_fd)
+    max_fd = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    if max_fd == resource.RLIM_INFINITY:
+        max_fd = MAXFD
+    low_fd = 3
+    for keep_fd in sorted(keep_fds):
+        os.closerange(low_fd, keep_fd)
+        low_fd = keep_fd + 1
+    os.closerange(low_fd, max_fd)
+
+
+def reseed_random():
+    """
+    Seed the random number generators of the imported modules from the OS.
+    Every child is forked from the same template, so otherwise every job
+    would draw the same numbers, where a new sandboxed Python would not.
+    """
+    if "random" in sys.modules:
+        sys.modules["random"].seed()
+    if "numpy" in sys.modules:
+        sys.modules["numpy"].random.seed()
+
+
+def run_job(tmpdir, done_fd):
+    """
+    Run the job written to `tmpdir` in this child process, writing its result
+    next to it.  `done_fd` is held open until the child exits.  Never returns.
+    """
+    status = 0
+    result_path = os.path.join(tmpdir, RESULT_FILE)
+    try:
+        isolate_fds(done_fd)
+        reseed_random()
+        os.chdir(tmpdir)
+        with open(JOB_FILE) as job_file:
+            job = json.load(job_file)
+        os.remove(JOB_FILE)
+        for filename, contents in job["extra_files"]:
+            with open(filename, "wb") as extra_file:
+                extra_file.write(contents.decode("base64"))
+        sys.path[0:0] = [os.path.join(tmpdir, name) for name in job["python_path"]]
+
+        # Anything the code prints must not get mixed into the results.
+        sys.stdout = sys.stderr = open(os.devnull, "w")
+        set_limits(job["limits"])
+
+        g_dict = job["globals"]
+        exec compile(job["code"], "jailed_code", "exec") in g_dict  # pylint: disable=exec-used
+        result = {"globals": jsonable_globals(g_dict)}
+    except BaseException:  # pylint: disable=broad-except
+        result = {"error": traceback.format_exc()}
+        status = 1
+
+    try:
+        with open(result_path, "w") as result_file:
+            json.dump(result, result_file)
+    finally:
+        os._exit(status)  # pylint: disable=protected-access
+
+
+def wait_for_child(child_pid, done_fd, realtime):
+    """
+    Wait for the job running in `child_pid` to finish, killing the child if it
+    takes more than `realtime` seconds.  `done_fd` reaches end of file when the
+    child exits.  Returns the child's exit status, or None if it was killed.
+    """
+    deadline = time.time() + realtime
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            readable, _, _ = select.select([done_fd], [], [], remaining)
+        except select.error as err:
+            if err.args[0] == errno.EINTR:
+                continue
+            raise
+        if not readable:
+            break
+        if not os.read(done_fd, 65536):
+            break
+
+    # The child has closed `done_fd`, which it may have done before exiting.
+    while True:
+        pid, status = os.waitpid(child_pid, os.WNOHANG)
+        if pid:
+            return status
+        if time.time() >= deadline:
+            os.kill(child_pid, signal.SIGKILL)
+            os.waitpid(child_pid, 0)
+            return None
+        time.sleep(0.001)
+
+
+def run_template(control_fd, status_fd):
+    """
+    The template process: fork a child for each job directory named on
+    `control_fd`, and report how it ended on `status_fd`.  This process is
+    forked before the worker reads any jobs and never sees their code, globals
+    or results, so a child can't find another job's data in its memory.
+    Returns when the worker closes `control_fd`.
+    """
+    isolate_fds(control_fd, status_fd)
+    control = os.fdopen(control_fd)
+    while True:
+        line = control.readline()
+        if not line:
+            return
+        tmpdir, realtime = json.loads(line)
+        done_read_fd, done_write_fd = os.pipe()
+        child_pid = os.fork()
+        if child_pid == 0:
+            os.close(done_read_fd)
+            run_job(tmpdir, done_write_fd)
+        os.close(done_write_fd)
+        try:
+            status = wait_for_child(child_pid, done_read_fd, realtime)
+        finally:
+            os.close(done_read_fd)
+        data = json.dumps(status) + "\n"
+        while data:
+            data = data[os.write(status_fd, data):]
+
+
+class Template(object):
+    """
+    The worker's handle on its template process.
+    """
+    def __init__(self):
+        control_read_fd, control_write_fd = os.pipe()
+        status_read_fd, status_write_fd = os.pipe()
+        self.pid = os.fork()
+        if self.pid == 0:
+            os.close(control_write_fd)
+            os.close(status_read_fd)
+            try:
+                run_template(control_read_fd, status_write_fd)
+            finally:
+                os._exit(0)  # pylint: disable=protected-access
+        os.close(control_read_fd)
+        os.close(status_write_fd)
+        self.control = os.fdopen(control_write_fd, "w")
+        self.status = os.fdopen(status_read_fd)
+
+    def run(self, job):
+        """
+        Run `job` in a child of the template and return its result.
+        """
+        realtime = job["limits"].get("REALTIME") or DEFAULT_REALTIME
+        tmpdir = tempfile.mkdtemp(prefix="codejail-")
+        try:
+            job_fd = os.open(os.path.join(tmpdir, JOB_FILE), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(job_fd, "w") as job_file:
+                json.dump(job, job_file)
+
+            self.control.write(json.dumps([tmpdir, realtime]) + "\n")
+            self.control.flush()
+            line = self.status.readline()
+            if not line:
+                raise TemplateError("the template process has exited")
+            status = json.loads(line)
+            if status is None:
+                return {"error": "Execution took more than {} seconds".format(realtime)}
+            try:
+                with open(os.path.join(tmpdir, RESULT_FILE)) as result_file:
+                    return json.load(result_file)
+            except (IOError, ValueError):
+                return {"error": "Execution failed with status {}".format(status)}
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+class TemplateError(Exception):
+    """
+    The template process has failed, so the worker can't run any more jobs.
+    """
+    pass
+
+
+def main():
+    """
+    Import the modules named in our arguments, start the template process,
+    then run jobs until stdin is closed.
+    """
+    for modname in sys.argv[1:]:
+        try:
+            __import__(modname)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    template = Template()
+    stdin, stdout = sys.stdin, sys.stdout
+    while True:
+        line = stdin.readline()
+        if not line:
+            break
+        try:
+            result = template.run(json.loads(line))
+        except TemplateError:
+            result = {"error": traceback.format_exc()}
+            stdout.write(json.dumps(result) + "\n")
+            stdout.flush()
+            break
+        except Exception:  # pylint: disable=broad-except
+            result = {"error": traceback.format_exc()}
+        stdout.write(json.dumps(result) + "\n")
+        stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,11 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import sandbox_pool
 from dogapi import dog_stats_api
 
 import hashlib
+import time
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -47,6 +49,15 @@ for name, modname in ASSUMED_IMPORTS:
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
 
+def configure_sandbox_pool(size, max_runs):
+    """
+    Run safe_exec's sandboxed code in a pool of up to `size` long-lived
+    sandbox processes, each replaced after `max_runs` executions, which have
+    the assumed imports already imported.  A `size` of 0 turns the pool off.
+    """
+    sandbox_pool.configure(size, max_runs, [modname for _, modname in ASSUMED_IMPORTS])
+
+
 def update_hash(hasher, obj):
     """
     Update a `hashlib` hasher with a nested object.
@@ -128,12 +139,19 @@ def safe_exec(
     code_prolog = CODE_PROLOG % random_seed
 
     # Decide which code executor to use.
+    pool = sandbox_pool.get_pool()
     if unsafely:
         exec_fn = codejail_not_safe_exec
+        executor = "unsafe"
+    elif pool is not None and pool.can_run(python_path, extra_files):
+        exec_fn = pool.safe_exec
+        executor = "pool"
     else:
         exec_fn = codejail_safe_exec
+        executor = "codejail"
 
     # Run the code!  Results are side effects in globals_dict.
+    start_time = time.time()
     try:
         exec_fn(
             code_prolog + LAZY_IMPORTS + code, globals_dict,
@@ -143,6 +161,11 @@ def safe_exec(
         emsg = e.message
     else:
         emsg = None
+    dog_stats_api.histogram(
+        'capa.safe_exec.execution_time',
+        time.time() - start_time,
+        tags=[u'executor:{}'.format(executor), u'slug:{}'.format(slug)],
+    )
 
     # Put the result back in the cache.  This is complicated by the fact that
     # the globals dict might not be entirely serializable.
@@ -0,0 +1,237 @@
+"""
+A pool of long-lived sandboxed Python processes for running capa code.
+
+codejail starts a new sandboxed Python for every execution, which then has to
+import numpy, scipy and the rest of the assumed imports again.  The processes
+in this pool are started with the same sandboxed Python (so they're confined
+in the same way), import those modules once, and then fork a child for each
+execution from a template process that never holds any execution's data.
+The child runs the code with codejail's resource limits in its
+own temporary directory, so executions stay isolated from each other.  Each
+process is replaced after running `max_runs` executions.
+
+The pool is off until `configure()` is called, and is only used once codejail
+has been configured with a sandboxed Python.
+"""
+import json
+import logging
+import os
+import select
+import subprocess
+import threading
+
+from codejail import jail_code
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+from codejail.safe_exec import json_safe, SafeExecException
+
+from . import pool_worker
+
+log = logging.getLogger(__name__)
+
+# The source of the program the pool's processes run.
+pool_worker_py_file = pool_worker.__file__
+if pool_worker_py_file.endswith("c"):
+    pool_worker_py_file = pool_worker_py_file[:-1]
+
+POOL_WORKER_PY = open(pool_worker_py_file).read()
+
+# Extra seconds to wait for a process to report on an execution, beyond the
+# real time limit it enforces itself, before giving up on the process.
+RESPONSE_GRACE_SECONDS = 5
+
+_POOL = None
+
+
+class SandboxProcess(object):
+    """
+    One sandboxed Python process running pool_worker.py.
+    """
+    def __init__(self, cmdline, preload_modules):
+        self.process = subprocess.Popen(
+            cmdline + ["-c", POOL_WORKER_PY] + list(preload_modules),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            close_fds=True,
+        )
+        self.runs = 0
+
+    def execute(self, job, timeout):
+        """
+        Send `job` to the process and return its result dict.  Raises
+        SandboxProcessError if the process doesn't answer within `timeout`
+        seconds or has died.
+        """
+        self.runs += 1
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+        except IOError:
+            raise SandboxProcessError("the sandbox process has exited")
+
+        readable, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not readable:
+            raise SandboxProcessError("no response from the sandbox process")
+        line = self.process.stdout.readline()
+        if not line:
+            raise SandboxProcessError("the sandbox process has exited")
+        return json.loads(line)
+
+    def is_alive(self):
+        """
+        Return whether the process is still running.
+        """
+        return self.process.poll() is None
+
+    def stop(self):
+        """
+        Stop the process.
+        """
+        if self.is_alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class SandboxProcessError(Exception):
+    """
+    A pooled sandbox process failed, rather than the code it was running.
+    """
+    pass
+
+
+class SandboxPool(object):
+    """
+    Up to `size` sandboxed processes, each used for up to `max_runs` executions.
+
+    Executions which arrive while all `size` processes are busy are run by
+    codejail as usual, rather than waiting for a process.
+    """
+    def __init__(self, size, max_runs, preload_modules=(), cmdline=None):
+        self.size = size
+        self.max_runs = max_runs
+        self.preload_modules = preload_modules
+        self._cmdline = cmdline
+        self._lock = threading.Lock()
+        self._idle = []
+        self._busy = 0
+        self._pid = os.getpid()
+
+    @property
+    def cmdline(self):
+        """
+        The command line of codejail's sandboxed Python, or None if codejail
+        hasn't been configured with one.
+        """
+        if self._cmdline is not None:
+            return self._cmdline
+        if not jail_code.is_configured("python"):
+            return None
+        command = jail_code.COMMANDS["python"]
+        cmdline = []
+        # Run as the sandbox user, as jail_code does.
+        if command.get("user"):
+            cmdline.extend(["sudo", "-u", command["user"]])
+        cmdline.extend(command["cmdline_start"])
+        return cmdline
+
+    def _checkout(self):
+        """
+        Return an idle process, starting one if there are none, or None if
+        `size` processes are already busy.
+        """
+        with self._lock:
+            if os.getpid() != self._pid:
+                # We're in a process forked from the one which started the
+                # idle processes, so their pipes aren't ours to use.
+                self._pid = os.getpid()
+                self._idle = []
+                self._busy = 0
+            if self._busy >= self.size:
+                return None
+            self._busy += 1
+            while self._idle:
+                process = self._idle.pop()
+                if process.is_alive():
+                    return process
+                process.stop()
+
+        try:
+            return SandboxProcess(self.cmdline, self.preload_modules)
+        except Exception:
+            with self._lock:
+                self._busy -= 1
+            raise
+
+    def _checkin(self, process, reusable):
+        """
+        Return `process` to the pool, or stop it if it shouldn't be used again.
+        """
+        if not reusable or process.runs >= self.max_runs or not process.is_alive():
+            process.stop()
+            process = None
+        with self._lock:
+            self._busy -= 1
+            if process is not None:
+                self._idle.append(process)
+
+    def can_run(self, python_path, extra_files):
+        """
+        Return whether code with this `python_path` and `extra_files` can be run
+        by the pool.  The processes can only be given files by content, so every
+        entry of `python_path` must be one of the `extra_files`.
+        """
+        if self.size <= 0 or self.cmdline is None:
+            return False
+        extra_names = set(name for name, _ in extra_files or ())
+        return all(name in extra_names for name in python_path or ())
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Like codejail's safe_exec: execute `code` in a sandbox, with the results
+        as changes to `globals_dict`.  Raises SafeExecException if the code fails.
+        """
+        process = self._checkout()
+        if process is None:
+            return codejail_safe_exec(
+                code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug
+            )
+
+        limits = dict(jail_code.LIMITS)
+        job = {
+            "code": code,
+            "globals": json_safe(globals_dict),
+            "extra_files": [[name, contents.encode("base64")] for name, contents in extra_files or ()],
+            "python_path": list(python_path or ()),
+            "limits": limits,
+        }
+        realtime = limits.get("REALTIME") or pool_worker.DEFAULT_REALTIME
+
+        reusable = False
+        try:
+            result = process.execute(job, realtime + RESPONSE_GRACE_SECONDS)
+            reusable = True
+        except SandboxProcessError as err:
+            log.warning("Sandbox pool process failed running %s: %s", slug, err)
+            raise SafeExecException("Couldn't execute jailed code: {}".format(err))
+        finally:
+            self._checkin(process, reusable)
+
+        if "error" in result:
+            raise SafeExecException("Couldn't execute jailed code: {}".format(result["error"]))
+        globals_dict.update(result["globals"])
+
+
+def configure(size, max_runs, preload_modules=()):
+    """
+    Start using a pool of up to `size` sandbox processes, each replaced after
+    `max_runs` executions, which import `preload_modules` when they start.
+    A `size` of 0 turns the pool off.
+    """
+    global _POOL  # pylint: disable=global-statement
+    _POOL = SandboxPool(size, max_runs, preload_modules) if size > 0 else None
+
+
+def get_pool():
+    """
+    Return the configured SandboxPool, or None if there isn't one.
+    """
+    return _POOL
@@ -0,0 +1,131 @@
+"""Test sandbox_pool.py"""
+
+from cStringIO import StringIO
+import os
+import sys
+import unittest
+import zipfile
+
+from mock import patch
+
+from capa.safe_exec import sandbox_pool
+from capa.safe_exec.sandbox_pool import SandboxPool
+from codejail.safe_exec import SafeExecException
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    Run the pool's processes with this Python, rather than a sandboxed one.
+    """
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.pool = SandboxPool(2, 3, ["math"], cmdline=[sys.executable, "-E", "-B"])
+        self.addCleanup(self.stop_processes)
+
+    def stop_processes(self):
+        """Stop the pool's idle processes."""
+        for process in self.pool._idle:  # pylint: disable=protected-access
+            process.stop()
+
+    def test_set_values(self):
+        g = {"a": 17}
+        self.pool.safe_exec("import math\nb = a + 1\nc = int(math.pi)", g)
+        self.assertEqual(g["b"], 18)
+        self.assertEqual(g["c"], 3)
+        # Modules can't be passed back.
+        self.assertNotIn("math", g)
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_python_lib(self):
+        zip_buffer = StringIO()
+        with zipfile.ZipFile(zip_buffer, "w") as zip_file:
+            zip_file.write(os.path.join(os.path.dirname(__file__), "test_files/pylib/constant.py"), "constant.py")
+        g = {}
+        self.pool.safe_exec(
+            "import constant; a = constant.THE_CONST", g,
+            python_path=["python_lib.zip"], extra_files=[("python_lib.zip", zip_buffer.getvalue())],
+        )
+        self.assertIn("a", g)
+
+    def test_executions_are_isolated(self):
+        self.pool.safe_exec("import sys; sys.leaked = 1", {})
+        g = {}
+        self.pool.safe_exec("import sys; leaked = hasattr(sys, 'leaked')", g)
+        self.assertFalse(g["leaked"])
+
+    def test_executions_cant_see_earlier_data(self):
+        self.pool.safe_exec("secret_answer = 42", {"student": "alice"})
+        g = {}
+        # Look for the earlier execution's globals in every frame of the stack.
+        self.pool.safe_exec(
+            "import sys\n"
+            "frame, leaked = sys._getframe().f_back, False\n"
+            "while frame is not None:\n"
+            "    leaked = leaked or ('secret_' + 'answer') in repr(frame.f_locals)\n"
+            "    frame = frame.f_back\n",
+            g,
+        )
+        self.assertFalse(g["leaked"])
+
+    def test_random_numbers_differ(self):
+        # Both executions are forked from the same template, which imported the modules.
+        self.pool = SandboxPool(1, 3, ["random", "numpy"], cmdline=[sys.executable, "-E", "-B"])
+        draws = []
+        for __ in range(2):
+            g = {}
+            self.pool.safe_exec("import random, numpy\na = random.random()\nb = numpy.random.random()", g)
+            draws.append((g["a"], g["b"]))
+        self.assertNotEqual(draws[0][0], draws[1][0])
+        self.assertNotEqual(draws[0][1], draws[1][1])
+
+    def test_processes_are_reused_then_replaced(self):
+        pids = []
+        for __ in range(4):
+            g = {}
+            self.pool.safe_exec("import os; pid = os.getppid()", g)
+            pids.append(g["pid"])
+        # Each process runs up to 3 executions.
+        self.assertEqual(len(set(pids[:3])), 1)
+        self.assertNotEqual(pids[2], pids[3])
+
+    def test_real_time_limit(self):
+        with patch.dict(sandbox_pool.jail_code.LIMITS, {"REALTIME": 1}):
+            with self.assertRaises(SafeExecException) as cm:
+                self.pool.safe_exec("import time; time.sleep(10)", {})
+        self.assertIn("more than 1 seconds", cm.exception.message)
+
+    def test_can_run(self):
+        self.assertTrue(self.pool.can_run(None, None))
+        self.assertTrue(self.pool.can_run(["python_lib.zip"], [("python_lib.zip", "")]))
+        # Directories on the python path can't be sent to the processes.
+        self.assertFalse(self.pool.can_run(["/course/python_lib"], []))
+
+    @patch("capa.safe_exec.sandbox_pool.codejail_safe_exec")
+    def test_busy_pool_uses_codejail(self, mock_codejail_safe_exec):
+        self.pool._busy = self.pool.size  # pylint: disable=protected-access
+        g = {}
+        self.pool.safe_exec("a = 1", g, slug="busy")
+        mock_codejail_safe_exec.assert_called_once_with("a = 1", g, python_path=None, extra_files=None, slug="busy")
+
+    def test_worker_pipes_are_not_inherited(self):
+        g = {}
+        self.pool.safe_exec(
+            "import os\n"
+            "written = os.write(1, 'fake')\n"
+            "read = os.read(0, 10)\n",
+            g,
+        )
+        self.assertEqual(g["read"], "")
+        # The next execution still gets its own result.
+        self.pool.safe_exec("a = 1", g)
+        self.assertEqual(g["a"], 1)
+
+    def test_cmdline_runs_as_sandbox_user(self):
+        pool = SandboxPool(1, 1)
+        commands = {"python": {"cmdline_start": ["/sandbox/python", "-E", "-B"], "user": "sandbox"}}
+        with patch.dict(sandbox_pool.jail_code.COMMANDS, commands):
+            self.assertEqual(pool.cmdline, ["sudo", "-u", "sandbox", "/sandbox/python", "-E", "-B"])
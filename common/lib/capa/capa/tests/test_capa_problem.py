@@ -0,0 +1,76 @@
+"""Tests the caching of parsed problems by LoncapaProblem."""
+
+import textwrap
+import unittest
+
+from mock import patch
+
+from . import new_loncapa_problem
+from capa import capa_problem
+
+
+class ParsedProblemCacheTest(unittest.TestCase):
+    """Problems with the same definition share the parse, but not the tree."""
+
+    XML = textwrap.dedent("""
+        <problem>
+        <multiplechoiceresponse>
+          <choicegroup type="MultipleChoice" shuffle="true">
+            <choice correct="false">Apple</choice>
+            <choice correct="false">Banana</choice>
+            <choice correct="false">Chocolate</choice>
+            <choice correct ="true">Donut</choice>
+          </choicegroup>
+        </multiplechoiceresponse>
+        <stringresponse answer="Michigan">
+          <textline size="20"/>
+        </stringresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ParsedProblemCacheTest, self).setUp()
+        capa_problem.PARSED_PROBLEM_CACHE.clear()
+
+    def test_parsed_once(self):
+        parse_problem = capa_problem.LoncapaProblem._parse_problem  # pylint: disable=protected-access
+        with patch.object(
+            capa_problem.LoncapaProblem, '_parse_problem', autospec=True, side_effect=parse_problem
+        ) as mock_parse_problem:
+            new_loncapa_problem(self.XML, seed=0)
+            new_loncapa_problem(self.XML, seed=1)
+        self.assertEqual(mock_parse_problem.call_count, 1)
+
+    def test_same_ids_and_responders(self):
+        uncached = new_loncapa_problem(self.XML, seed=0)
+        cached = new_loncapa_problem(self.XML, seed=0)
+        self.assertEqual(
+            sorted(responder.id for responder in cached.responders.values()),
+            sorted(responder.id for responder in uncached.responders.values()),
+        )
+        self.assertEqual(cached.get_html(), uncached.get_html())
+        self.assertEqual(sorted(cached.inputs), sorted(uncached.inputs))
+
+    def test_trees_are_not_shared(self):
+        # Each problem transforms (e.g. shuffles) its own copy of the tree.
+        first = new_loncapa_problem(self.XML, seed=0)
+        second = new_loncapa_problem(self.XML, seed=1)
+        self.assertIsNot(first.tree, second.tree)
+        for response in second.responders:
+            self.assertIs(response.getroottree().getroot(), second.tree)
+
+    def test_changed_definition_is_reparsed(self):
+        new_loncapa_problem(self.XML)
+        problem = new_loncapa_problem(self.XML.replace('Michigan', 'Ohio'))
+        responder = [r for r in problem.responders.values() if r.tags == ['stringresponse']][0]
+        self.assertEqual(responder.correct_answer, [u'Ohio'])
+
+    def test_least_recently_used_evicted(self):
+        cache = capa_problem.ParsedProblemCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
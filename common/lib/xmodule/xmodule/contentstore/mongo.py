@@ -78,6 +78,8 @@ class MongoContentStore(ContentStore):
             else:
                 fp.write(content.data)
 
+        # GridFS computes the md5 of the file as it is closed and stores it with it
+        content.content_digest = fp.md5
         return content
 
     def delete(self, location_or_id):
@@ -102,7 +104,8 @@ class MongoContentStore(ContentStore):
                     location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
                     thumbnail_location=thumbnail_location,
                     import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
+                    length=fp.length, locked=getattr(fp, 'locked', False),
+                    content_digest=fp.md5
                 )
             else:
                 with self.fs.get(content_id) as fp:
@@ -116,7 +119,8 @@ class MongoContentStore(ContentStore):
                         location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
                         thumbnail_location=thumbnail_location,
                         import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
+                        length=fp.length, locked=getattr(fp, 'locked', False),
+                        content_digest=fp.md5
                     )
         except NoFile:
             if throw_on_not_found:
@@ -177,6 +181,24 @@ class MongoContentStore(ContentStore):
             course_key, start=start, maxresults=maxresults, get_thumbnails=False, sort=sort, filter_params=filter_params
         )
 
+    def generate_thumbnails_for_course(self, course_key):
+        """
+        Generate the thumbnails of the course's images which don't have one yet, e.g. because
+        they were imported without generating thumbnails
+        """
+        query = query_for_course(course_key, 'asset')
+        query['contentType'] = {'$regex': '^image/'}
+        query['thumbnail_location'] = None
+        for asset in list(self.fs_files.find(query, {'content_son': True})):
+            asset_id = asset.get('content_son', asset['_id'])
+            asset_key = course_key.make_asset_key(asset_id['category'], asset_id['name'])
+            content = self.find(asset_key, throw_on_not_found=False)
+            if content is None:
+                continue
+            thumbnail_content, thumbnail_location = self.generate_thumbnail(content)
+            if thumbnail_content is not None:
+                self.set_attr(asset_key, 'thumbnail_location', thumbnail_location.to_deprecated_list_repr())
+
     def remove_redundant_content_for_courses(self):
         """
         Finds and removes all redundant files (Mac OS metadata files with filename ".DS_Store"
@@ -15,6 +15,7 @@ import collections
 from contextlib import contextmanager
 import functools
 import threading
+import cPickle
 from operator import itemgetter
 from sortedcontainers import SortedListWithKey
 
@@ -39,6 +40,9 @@ new_contract('AssetKey', AssetKey)
 new_contract('AssetMetadata', AssetMetadata)
 new_contract('XBlock', XBlock)
 
+# The largest pickled value memcached accepts by default is 1MB, less room for the key and flags
+MAX_CACHED_VALUE_SIZE = 1000 * 1000
+
 
 class ModuleStoreEnum(object):
     """
@@ -116,6 +120,7 @@ class BulkOpsRecord(object):
     """
     def __init__(self):
         self._active_count = 0
+        self.has_publish_item = False
 
     @property
     def active(self):
@@ -268,6 +273,10 @@ class BulkOperationsMixin(object):
 
         self._end_outermost_bulk_operation(bulk_ops_record, course_key)
 
+        # Send the course_published signal deferred from within the bulk operation
+        if bulk_ops_record.has_publish_item:
+            self._send_course_published(course_key)
+
         self._clear_bulk_ops_record(course_key)
 
     def _is_in_bulk_operation(self, course_key, ignore_case=False):
@@ -276,6 +285,25 @@ class BulkOperationsMixin(object):
         """
         return self._get_bulk_ops_record(course_key, ignore_case).active
 
+    def _flag_publish_event(self, course_key):
+        """
+        Record that the published version of course_key changed.  The course_published
+        signal is sent now, or when the outermost bulk operation on the course ends.
+        """
+        bulk_ops_record = self._get_bulk_ops_record(course_key)
+        if bulk_ops_record.active:
+            bulk_ops_record.has_publish_item = True
+        else:
+            self._send_course_published(course_key)
+
+    def _send_course_published(self, course_key):
+        """
+        Send the course_published signal for course_key, if this store has a signal handler.
+        """
+        signal_handler = getattr(self, 'signal_handler', None)
+        if signal_handler:
+            signal_handler.send("course_published", course_key=course_key.for_branch(None))
+
 
 class EditInfo(object):
     """
@@ -1047,7 +1075,7 @@ class ModuleStoreReadBase(BulkOperationsMixin, ModuleStoreRead):
         contentstore=None,
         doc_store_config=None,  # ignore if passed up
         metadata_inheritance_cache_subsystem=None, request_cache=None,
-        xblock_mixins=(), xblock_select=None,
+        xblock_mixins=(), xblock_select=None, signal_handler=None,
         # temporary parms to enable backward compatibility. remove once all envs migrated
         db=None, collection=None, host=None, port=None, tz_aware=True, user=None, password=None,
         # allow lower level init args to pass harmlessly
@@ -1065,6 +1093,7 @@ class ModuleStoreReadBase(BulkOperationsMixin, ModuleStoreRead):
         self.xblock_mixins = xblock_mixins
         self.xblock_select = xblock_select
         self.contentstore = contentstore
+        self.signal_handler = signal_handler
 
     def get_course_errors(self, course_key):
         """
@@ -1181,6 +1210,14 @@ class ModuleStoreReadBase(BulkOperationsMixin, ModuleStoreRead):
         return wrapper
 
 
+def fits_in_cache(value):
+    """
+    Whether `value` is small enough to be stored in a caching subsystem backed by memcached,
+    which refuses items larger than MAX_CACHED_VALUE_SIZE once pickled.
+    """
+    return len(cPickle.dumps(value)) < MAX_CACHED_VALUE_SIZE
+
+
 def hashvalue(arg):
     """
     If arg is an xblock, use its location. otherwise just turn it into a string
@@ -3,6 +3,7 @@ from __future__ import absolute_import
 
 import logging
 
+from django.core.cache import cache
 from django.utils.translation import ugettext as _
 from opaque_keys.edx.locator import CourseLocator
 from search.search_engine_base import SearchEngine
@@ -14,9 +15,20 @@ from .exceptions import ItemNotFoundError
 INDEX_NAME = "courseware_index"
 DOCUMENT_TYPE = "courseware_content"
 
+# How long to remember which version of each block was indexed, for incremental reindexing
+INDEXED_VERSIONS_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
 log = logging.getLogger('edx.modulestore')
 
 
+def indexed_version_cache_key(usage_id):
+    """
+    The cache key of the version of the block with usage_id which was last indexed.  Each
+    block has its own key, so that large courses don't make one value too big to cache.
+    """
+    return u"courseware_index.indexed_version.{}".format(usage_id)
+
+
 class SearchIndexingError(Exception):
     """ Indicates some error(s) occured during indexing """
 
@@ -31,12 +43,16 @@ class CoursewareSearchIndexer(object):
     """
 
     @staticmethod
-    def add_to_search_index(modulestore, location, delete=False, raise_on_error=False):
+    def add_to_search_index(modulestore, location, delete=False, raise_on_error=False, incremental=False):
         """
         Add to courseware search index from given location and its children
+
+        The published subtree is loaded from the modulestore at once, and its documents are
+        sent to the search engine once they have all been built.  If incremental, only the
+        blocks which were edited (or whose start date changed) since they were last indexed
+        are sent.
         """
         error_list = []
-        # TODO - inline for now, need to move this out to a celery task
         searcher = SearchEngine.get_search_engine(INDEX_NAME)
         if not searcher:
             return
@@ -50,25 +66,28 @@ class CoursewareSearchIndexer(object):
             "course": unicode(course_key),
         }
 
+        # (item, usage id, version, start date) of each indexable block found
+        indexable_items = []
+        # (usage id, version, document) of each block to send to the search engine
+        documents = []
+
         def _fetch_item(item_location):
-            """ Fetch the item from the modulestore location, log if not found, but continue """
+            """ Fetch the published item and all its descendants, log if not found, but continue """
             try:
                 if isinstance(item_location, CourseLocator):
-                    item = modulestore.get_course(item_location)
+                    item = modulestore.get_course(item_location, depth=None)
                 else:
-                    item = modulestore.get_item(item_location, revision=ModuleStoreEnum.RevisionOption.published_only)
+                    item = modulestore.get_item(
+                        item_location, depth=None, revision=ModuleStoreEnum.RevisionOption.published_only
+                    )
             except ItemNotFoundError:
                 log.warning('Cannot find: %s', item_location)
                 return None
 
             return item
 
-        def index_item_location(item_location, current_start_date):
-            """ add this item to the search index """
-            item = _fetch_item(item_location)
-            if not item:
-                return
-
+        def find_indexable_items(item, current_start_date):
+            """ add this item, and its children, to the indexable items if they can be indexed """
             is_indexable = hasattr(item, "index_dictionary")
             # if it's not indexable and it does not have children, then ignore
             if not is_indexable and not item.has_children:
@@ -79,42 +98,88 @@ class CoursewareSearchIndexer(object):
                 current_start_date = item.start
 
             if item.has_children:
-                for child_loc in item.children:
-                    index_item_location(child_loc, current_start_date)
-
+                for child in item.get_children():
+                    find_indexable_items(child, current_start_date)
+
+            if is_indexable:
+                usage_id = unicode(item.scope_ids.usage_id)
+                edited_on = getattr(item, 'edited_on', None)
+                version = u"{}|{}".format(edited_on, current_start_date) if edited_on else None
+                indexable_items.append((item, usage_id, version, current_start_date))
+
+        def index_items():
+            """ add the documents of the indexable items which changed since they were last indexed """
+            indexed_versions = {}
+            if incremental:
+                indexed_versions = cache.get_many([
+                    indexed_version_cache_key(usage_id) for __, usage_id, version, __ in indexable_items if version
+                ])
+            for item, usage_id, version, current_start_date in indexable_items:
+                if version and indexed_versions.get(indexed_version_cache_key(usage_id)) == version:
+                    continue
+                index_item(item, usage_id, version, current_start_date)
+
+        def index_item(item, usage_id, version, current_start_date):
+            """ add the document for this item to the documents to index """
             item_index = {}
-            item_index_dictionary = item.index_dictionary() if is_indexable else None
+            item_index_dictionary = item.index_dictionary()
 
             # if it has something to add to the index, then add it
             if item_index_dictionary:
                 try:
                     item_index.update(location_info)
                     item_index.update(item_index_dictionary)
-                    item_index['id'] = unicode(item.scope_ids.usage_id)
+                    item_index['id'] = usage_id
                     if current_start_date:
                         item_index['start_date'] = current_start_date
 
-                    searcher.index(DOCUMENT_TYPE, item_index)
+                    documents.append((usage_id, version, item_index))
                 except Exception as err:  # pylint: disable=broad-except
                     # broad exception so that index operation does not fail on one item of many
-                    log.warning('Could not index item: %s - %s', item_location, unicode(err))
-                    error_list.append(_('Could not index item: {}').format(item_location))
+                    log.warning('Could not index item: %s - %s', item.location, unicode(err))
+                    error_list.append(_('Could not index item: {}').format(item.location))
 
-        def remove_index_item_location(item_location):
-            """ remove this item from the search index """
-            item = _fetch_item(item_location)
-            if item:
-                if item.has_children:
-                    for child_loc in item.children:
-                        remove_index_item_location(child_loc)
+        def send_documents():
+            """ send the documents which were built to the search engine, and remember their versions """
+            sent_versions = {}
+            for usage_id, version, item_index in documents:
+                try:
+                    searcher.index(DOCUMENT_TYPE, item_index)
+                except Exception as err:  # pylint: disable=broad-except
+                    log.warning('Could not index item: %s - %s', usage_id, unicode(err))
+                    error_list.append(_('Could not index item: {}').format(usage_id))
+                else:
+                    if version:
+                        sent_versions[indexed_version_cache_key(usage_id)] = version
+            cache.set_many(sent_versions, INDEXED_VERSIONS_CACHE_TIMEOUT)
+
+        def remove_index_item(item, removed_usage_ids):
+            """ remove this item, and its children, from the search index """
+            if item.has_children:
+                for child in item.get_children():
+                    remove_index_item(child, removed_usage_ids)
 
-                searcher.remove(DOCUMENT_TYPE, unicode(item.scope_ids.usage_id))
+            usage_id = unicode(item.scope_ids.usage_id)
+            searcher.remove(DOCUMENT_TYPE, usage_id)
+            removed_usage_ids.append(usage_id)
 
         try:
-            if delete:
-                remove_index_item_location(location)
-            else:
-                index_item_location(location, None)
+            with modulestore.bulk_operations(course_key):
+                with modulestore.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+                    item = _fetch_item(location)
+                    if item:
+                        if delete:
+                            removed_usage_ids = []
+                            try:
+                                remove_index_item(item, removed_usage_ids)
+                            finally:
+                                cache.delete_many([
+                                    indexed_version_cache_key(usage_id) for usage_id in removed_usage_ids
+                                ])
+                        else:
+                            find_indexable_items(item, None)
+                            index_items()
+            send_documents()
         except Exception as err:  # pylint: disable=broad-except
             # broad exception so that index operation does not prevent the rest of the application from working
             log.exception(
@@ -133,3 +198,10 @@ class CoursewareSearchIndexer(object):
         (Re)index all content within the given course
         """
         return cls.add_to_search_index(modulestore, course_key, delete=False, raise_on_error=True)
+
+    @classmethod
+    def do_incremental_course_reindex(cls, modulestore, course_key):
+        """
+        Reindex the content within the given course which changed since it was last indexed
+        """
+        return cls.add_to_search_index(modulestore, course_key, delete=False, incremental=True)
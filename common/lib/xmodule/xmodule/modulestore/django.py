@@ -11,8 +11,10 @@ from django.conf import settings
 if not settings.configured:
     settings.configure()
 from django.core.cache import get_cache, InvalidCacheBackendError
+import django.dispatch
 import django.utils
 
+import logging
 import re
 
 from xmodule.util.django import get_current_request_hostname
@@ -39,6 +41,54 @@ except ImportError:
 
 ASSET_IGNORE_REGEX = getattr(settings, "ASSET_IGNORE_REGEX", r"(^\._.*$)|(^\.DS_Store$)|(^.*~$)")
 
+log = logging.getLogger(__name__)
+
+
+class SignalHandler(object):
+    """
+    Sends the signals the modulestores emit to the rest of the django application.
+
+    The modulestores don't import django, so create_modulestore_instance gives each one
+    a SignalHandler, and the store calls `send` with the name of one of these signals:
+
+        course_published: the published version of the course with the given course_key
+            changed, either because something was published or because a direct-only
+            block (such as the course itself) was edited.  Inside a bulk operation, this
+            is sent once when the outermost bulk operation ends.
+        course_deleted: the course with the given course_key was deleted.
+
+    Receivers are called with the modulestore class as the sender, e.g.:
+
+        @receiver(SignalHandler.course_published)
+        def listen_for_course_publish(sender, course_key, **kwargs):
+            ...
+    """
+    course_published = django.dispatch.Signal(providing_args=["course_key"])
+    course_deleted = django.dispatch.Signal(providing_args=["course_key"])
+
+    _mapping = {
+        "course_published": course_published,
+        "course_deleted": course_deleted,
+    }
+
+    def __init__(self, modulestore_class):
+        self.modulestore_class = modulestore_class
+
+    def send(self, signal_name, **kwargs):
+        """
+        Send the signal `signal_name` with `kwargs`.  A receiver which raises doesn't stop
+        the others from being called, nor the modulestore operation which sent the signal.
+        """
+        signal = self._mapping[signal_name]
+        responses = signal.send_robust(sender=self.modulestore_class, **kwargs)
+
+        for receiver, response in responses:
+            if isinstance(response, Exception):
+                log.error(
+                    u"Receiver %s of the %s signal failed with kwargs %s: %r",
+                    receiver, signal_name, kwargs, response
+                )
+
 
 def load_function(path):
     """
@@ -83,6 +133,11 @@ def create_modulestore_instance(
     except InvalidCacheBackendError:
         metadata_inheritance_cache = get_cache('default')
 
+    try:
+        structure_cache = get_cache('course_structure_cache')
+    except InvalidCacheBackendError:
+        structure_cache = None
+
     if issubclass(class_, MixedModuleStore):
         _options['create_modulestore_instance'] = create_modulestore_instance
 
@@ -97,6 +152,7 @@ def create_modulestore_instance(
     return class_(
         contentstore=content_store,
         metadata_inheritance_cache_subsystem=metadata_inheritance_cache,
+        structure_cache_subsystem=structure_cache,
         request_cache=request_cache,
         xblock_mixins=getattr(settings, 'XBLOCK_MIXINS', ()),
         xblock_select=getattr(settings, 'XBLOCK_SELECT_FUNCTION', None),
@@ -104,6 +160,7 @@ def create_modulestore_instance(
         i18n_service=i18n_service or ModuleI18nService(),
         fs_service=fs_service or xblock.reference.plugins.FSService(),
         user_service=user_service or xb_user_service,
+        signal_handler=SignalHandler(class_),
         **_options
     )
 
@@ -52,6 +52,19 @@ class EditInfoMixin(XBlockMixin):
         return self.runtime.get_published_on(self)
 
 
+def get_course_version(course):
+    """
+    Return a string identifying the current version of `course`'s content, used to
+    discard data computed from an older version of the course.
+
+    Courses whose runtime doesn't track edits (e.g. XML courses) get an empty
+    version, since their content can only change on restart.
+    """
+    get_subtree_edited_on = getattr(course.runtime, 'get_subtree_edited_on', None)
+    edited_on = get_subtree_edited_on(course) if get_subtree_edited_on is not None else None
+    return unicode(edited_on) if edited_on else u''
+
+
 class EditInfoRuntimeMixin(object):
     """
     An abstract mixin class for the functions which the :class: `EditInfoMixin` methods call on the runtime
@@ -43,7 +43,9 @@ from xmodule.error_module import ErrorDescriptor
 from xmodule.errortracker import null_error_tracker, exc_info_to_str
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.mako_module import MakoDescriptorSystem
-from xmodule.modulestore import ModuleStoreWriteBase, ModuleStoreEnum, BulkOperationsMixin, BulkOpsRecord
+from xmodule.modulestore import (
+    ModuleStoreWriteBase, ModuleStoreEnum, BulkOperationsMixin, BulkOpsRecord, fits_in_cache
+)
 from xmodule.modulestore.draft_and_published import ModuleStoreDraftAndPublished, DIRECT_ONLY_CATEGORIES
 from xmodule.modulestore.edit_info import EditInfoRuntimeMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError
@@ -505,9 +507,12 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                  fs_service=None,
                  user_service=None,
                  retry_wait_time=0.1,
+                 cache_parent_locations=False,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param cache_parent_locations: whether to keep an index of each course's parent locations in the
+            metadata_inheritance_cache_subsystem, rather than querying for each parent
         """
 
         super(MongoModuleStore, self).__init__(contentstore=contentstore, **kwargs)
@@ -558,6 +563,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         self.i18n_service = i18n_service
         self.fs_service = fs_service
         self.user_service = user_service
+        self.cache_parent_locations = cache_parent_locations
 
         self._course_run_cache = {}
 
@@ -771,6 +777,116 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
+            self._invalidate_cached_parent_index(course_id)
+
+    def _uses_parent_index(self, course_key):
+        """
+        Whether parent locations in the course should be looked up in the cached parent index. The index
+        isn't kept up to date during a bulk operation, so it is only refreshed (and used) outside of them.
+        """
+        return (
+            self.cache_parent_locations and
+            self.metadata_inheritance_cache_subsystem is not None and
+            not self._is_in_bulk_operation(course_key.for_branch(None))
+        )
+
+    def _parent_index_generation_key(self, course_key):
+        """
+        The key under which the generation of the course's parent index is cached. A write which
+        may change some parent starts a new generation, rather than clearing the cached index, so
+        that an index computed before the write can't be cached over the cleared one afterwards.
+        """
+        return u'{}/parents/generation'.format(self.fill_in_run(course_key.for_branch(None)))
+
+    def _parent_index_cache_key(self, course_key):
+        """
+        The key under which the current generation of the parent index of the course is cached.
+        """
+        generation_key = self._parent_index_generation_key(course_key)
+        generation = self.metadata_inheritance_cache_subsystem.get(generation_key)
+        if generation is None:
+            generation = uuid4().hex
+            self.metadata_inheritance_cache_subsystem.set(generation_key, generation)
+        return u'{}/parents/{}'.format(self.fill_in_run(course_key.for_branch(None)), generation)
+
+    def _compute_parent_index(self, course_id):
+        """
+        Find the parent of every child in the course, for both of the revision options that
+        _get_raw_parent_location accepts. Returns a dict mapping each revision option to a pair of
+            - a dict mapping the child's url to the _id of its parent (children without a parent are absent)
+            - the set of urls of the children which several parents claim. Deciding which of those is the
+              actual parent requires the orphan checks in _get_raw_parent_location, so they aren't indexed.
+        """
+        query = self._course_key_to_son(course_id)
+        # only the items which have children
+        query['definition.children.0'] = {'$exists': True}
+
+        published_parents = {}
+        draft_parents = {}
+        for result in self.collection.find(query, {'_id': True, 'definition.children': True}):
+            if result['_id'].get('revision') == MongoRevisionKey.draft:
+                parents_by_child = draft_parents
+            else:
+                parents_by_child = published_parents
+            for child in result['definition']['children']:
+                parents_by_child.setdefault(child, []).append(result['_id'])
+
+        published_only = ({}, set())
+        for child, parent_ids in published_parents.iteritems():
+            if len(parent_ids) == 1:
+                published_only[0][child] = parent_ids[0]
+            else:
+                published_only[1].add(child)
+
+        # mirror the query in _get_raw_parent_location, which prefers the draft parent
+        draft_preferred = ({}, set())
+        for child in set(published_parents) | set(draft_parents):
+            drafts = draft_parents.get(child, [])
+            published = published_parents.get(child, [])
+            if len(drafts) > 1 or len(published) > 1:
+                draft_preferred[1].add(child)
+            else:
+                draft_preferred[0][child] = (drafts + published)[0]
+
+        return {
+            ModuleStoreEnum.RevisionOption.published_only: published_only,
+            ModuleStoreEnum.RevisionOption.draft_preferred: draft_preferred,
+        }
+
+    def _get_cached_parent_index(self, course_key):
+        """
+        Return the parent index of the course (see _compute_parent_index), computing it if it
+        isn't in the request cache or the caching subsystem (e.g. memcached). Returns False if
+        the index is too large to cache, in which case parents have to be queried.
+        """
+        course_key = self.fill_in_run(course_key.for_branch(None))
+        if self.request_cache is not None and unicode(course_key) in self.request_cache.data.get('parent_index', {}):
+            return self.request_cache.data['parent_index'][unicode(course_key)]
+
+        cache_key = self._parent_index_cache_key(course_key)
+        parent_index = self.metadata_inheritance_cache_subsystem.get(cache_key)
+        if parent_index is None:
+            parent_index = self._compute_parent_index(course_key)
+            if not fits_in_cache(parent_index):
+                # remember not to compute it again until the next write
+                parent_index = False
+            self.metadata_inheritance_cache_subsystem.set(cache_key, parent_index)
+
+        if self.request_cache is not None:
+            self.request_cache.data.setdefault('parent_index', {})[unicode(course_key)] = parent_index
+        return parent_index
+
+    def _invalidate_cached_parent_index(self, course_key):
+        """
+        Start a new generation of the parent index of the course, after a write which may have
+        changed some parent. It is recomputed on the next lookup.
+        """
+        if not self._uses_parent_index(course_key):
+            return
+        course_key = self.fill_in_run(course_key.for_branch(None))
+        if self.request_cache is not None:
+            self.request_cache.data.get('parent_index', {}).pop(unicode(course_key), None)
+        self.metadata_inheritance_cache_subsystem.set(self._parent_index_generation_key(course_key), uuid4().hex)
 
     def _clean_item_data(self, item):
         """
@@ -1413,6 +1529,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                         multi=False,
                         upsert=True,
                     )
+                    self._invalidate_cached_parent_index(location.course_key)
                 elif ancestor_loc.category == 'course':
                     # once we reach the top location of the tree and if the location is not an orphan then the
                     # parent is not an orphan either
@@ -1434,6 +1551,21 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         if parent_cache.has(unicode(location)):
             return parent_cache.get(unicode(location))
 
+        def cache_and_return(parent_loc):  # pylint:disable=missing-docstring
+            parent_cache.set(unicode(location), parent_loc)
+            return parent_loc
+
+        if self._uses_parent_index(location.course_key):
+            parent_index = self._get_cached_parent_index(location.course_key)
+            # a course whose index is too large to cache has its parents queried below
+            if parent_index:
+                parent_ids, unresolved = parent_index[revision]
+                if unicode(location) not in unresolved:
+                    parent_id = parent_ids.get(unicode(location))
+                    if parent_id is None:
+                        return cache_and_return(None)
+                    return cache_and_return(Location._from_deprecated_son(parent_id, location.course_key.run))
+
         # create a query with tag, org, course, and the children field set to the given location
         query = self._course_key_to_son(location.course_key)
         query['definition.children'] = unicode(location)
@@ -1442,10 +1574,6 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         if revision == ModuleStoreEnum.RevisionOption.published_only:
             query['_id.revision'] = MongoRevisionKey.published
 
-        def cache_and_return(parent_loc):  # pylint:disable=missing-docstring
-            parent_cache.set(unicode(location), parent_loc)
-            return parent_loc
-
         # query the collection, sorting by DRAFT first
         parents = list(
             self.collection.find(query, {'_id': True}, sort=[SORT_REVISION_FAVOR_DRAFT])
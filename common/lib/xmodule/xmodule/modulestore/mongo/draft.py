@@ -154,10 +154,14 @@ class DraftModuleStore(MongoModuleStore):
         super(DraftModuleStore, self).delete_course(course_key, user_id)
 
         # delete all of the db records for the course
+        self._invalidate_cached_parent_index(course_key)
         course_query = self._course_key_to_son(course_key)
         self.collection.remove(course_query, multi=True)
         self.delete_all_asset_metadata(course_key, user_id)
 
+        if self.signal_handler:
+            self.signal_handler.send("course_deleted", course_key=course_key)
+
     def clone_course(self, source_course_id, dest_course_id, user_id, fields=None, **kwargs):
         """
         Only called if cloning within this store or if env doesn't set up mixed.
@@ -436,6 +440,7 @@ class DraftModuleStore(MongoModuleStore):
 
         # convert the subtree using the original item as the root
         self._breadth_first(convert_item, [location])
+        self._invalidate_cached_parent_index(location.course_key)
 
     def update_item(self, xblock, user_id, allow_not_found=False, force=False, isPublish=False, **kwargs):
         """
@@ -447,7 +452,9 @@ class DraftModuleStore(MongoModuleStore):
 
         # if the revision is published, defer to base
         if draft_loc.revision == MongoRevisionKey.published:
-            return super(DraftModuleStore, self).update_item(xblock, user_id, allow_not_found)
+            item = super(DraftModuleStore, self).update_item(xblock, user_id, allow_not_found)
+            self._flag_publish_event(xblock.location.course_key)
+            return item
 
         if not super(DraftModuleStore, self).has_item(draft_loc):
             try:
@@ -719,9 +726,9 @@ class DraftModuleStore(MongoModuleStore):
             bulk_record = self._get_bulk_ops_record(location.course_key)
             bulk_record.dirty = True
             self.collection.remove({'_id': {'$in': to_be_deleted}})
+            self._invalidate_cached_parent_index(location.course_key)
 
-        # Now it's been published, add the object to the courseware search index so that it appears in search results
-        CoursewareSearchIndexer.add_to_search_index(self, location)
+        self._flag_publish_event(location.course_key)
 
         return self.get_item(as_published(location))
 
@@ -734,6 +741,7 @@ class DraftModuleStore(MongoModuleStore):
         """
         self._verify_branch_setting(ModuleStoreEnum.Branch.draft_preferred)
         self._convert_to_draft(location, user_id, delete_published=True)
+        self._flag_publish_event(location.course_key)
 
     def revert_to_published(self, location, user_id=None):
         """
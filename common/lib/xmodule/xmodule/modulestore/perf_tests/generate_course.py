@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Generates synthetic courses of a given size in a modulestore.
+"""
+
+from collections import namedtuple
+
+from xmodule.modulestore import ModuleStoreEnum
+
+# The shape of a generated course: the number of children of each block at each level.
+CourseShape = namedtuple('CourseShape', 'chapters sequentials verticals problems')
+
+# Course sizes used by the read path performance tests.
+COURSE_SHAPES = {
+    'small': CourseShape(chapters=2, sequentials=2, verticals=2, problems=2),
+    'medium': CourseShape(chapters=10, sequentials=5, verticals=4, problems=3),
+    'large': CourseShape(chapters=20, sequentials=10, verticals=5, problems=5),
+}
+
+PROBLEM_DATA = u"""<problem>
+<p>Which number is the largest?</p>
+<multiplechoiceresponse>
+  <choicegroup type="MultipleChoice">
+    <choice correct="false">1</choice>
+    <choice correct="true">2</choice>
+  </choicegroup>
+</multiplechoiceresponse>
+</problem>
+"""
+
+USER_ID = ModuleStoreEnum.UserID.test
+
+
+def num_blocks(shape):
+    """
+    Return the number of blocks, including the course itself, in a course of the given shape.
+    """
+    per_vertical = 1 + shape.problems
+    per_sequential = 1 + shape.verticals * per_vertical
+    per_chapter = 1 + shape.sequentials * per_sequential
+    return 1 + shape.chapters * per_chapter
+
+
+def make_course(store, course_key, shape, publish=True):
+    """
+    Create a course with the key `course_key` in `store`, a MixedModuleStore, filled out to `shape`.  Every vertical
+    holds `shape.problems` problems and, if `publish`, is published.
+
+    Returns the usage keys of the blocks created, by category.
+    """
+    created = {'course': [], 'chapter': [], 'sequential': [], 'vertical': [], 'problem': []}
+    with store.default_store(_store_type(store)):
+        course = store.create_course(
+            course_key.org, course_key.course, course_key.run, USER_ID,
+            fields={'display_name': u'Synthetic {}'.format(course_key.course)},
+        )
+    course_key = course.id
+    created['course'].append(course.location)
+
+    with store.bulk_operations(course_key):
+        with store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, course_key):
+            for chapter_num in xrange(shape.chapters):
+                chapter = _make_child(store, course.location, 'chapter', chapter_num)
+                created['chapter'].append(chapter)
+                for sequential_num in xrange(shape.sequentials):
+                    sequential = _make_child(store, chapter, 'sequential', sequential_num)
+                    created['sequential'].append(sequential)
+                    for vertical_num in xrange(shape.verticals):
+                        vertical = _make_child(store, sequential, 'vertical', vertical_num)
+                        created['vertical'].append(vertical)
+                        for problem_num in xrange(shape.problems):
+                            created['problem'].append(_make_child(
+                                store, vertical, 'problem', problem_num,
+                                data=PROBLEM_DATA, weight=1.0, max_attempts=problem_num + 1,
+                            ))
+                        if publish:
+                            store.publish(vertical, USER_ID)
+
+    return created
+
+
+def _make_child(store, parent, category, num, **fields):
+    """
+    Create a block of the given category under `parent` and return its usage key.
+    """
+    fields['display_name'] = u'{} {}'.format(category.capitalize(), num)
+    return store.create_child(USER_ID, parent, category, fields=fields).location
+
+
+def _store_type(store):
+    """
+    Return the type of the (first) store beneath a MixedModuleStore.
+    """
+    return store.modulestores[0].get_modulestore_type(None)
@@ -15,6 +15,8 @@ except ImportError:
 
 
 DB_NAME = 'block_times.db'
+# Table written by read_metrics.MetricsRecorder.
+READ_METRICS_TABLE = 'read_path_metrics'
 
 
 class HTMLTable(object):
@@ -265,11 +267,90 @@ class FindReportGen(ReportGenerator):
         return html
 
 
+class ReadPathReportGen(object):
+    """
+    Class which generates report for modulestore read path performance test data.
+    """
+    # Metrics saved per measurement, and their table titles.
+    METRICS = (
+        ('elapsed', 'Duration Per Call (ms)'),
+        ('queries', 'Mongo Queries Per Call'),
+        ('objects', 'Objects Retained'),
+        ('peak_rss_kb', 'Peak RSS Growth (kB)'),
+    )
+
+    def __init__(self, db_name):
+        conn = sqlite3.connect(db_name)
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+        # Only report the most recent run.
+        cur.execute(
+            'SELECT * FROM {table} WHERE run_id = (SELECT MAX(run_id) FROM {table})'.format(table=READ_METRICS_TABLE)
+        )
+        self.all_rows = cur.fetchall()
+        self._read_metrics_data()
+
+    def _read_metrics_data(self):
+        """
+        Read in the metrics data from the sqlite DB and save into a dict.
+        """
+        self.run_data = {}
+
+        self.all_modulestores = set()
+        self.course_sizes = {}
+        for row in self.all_rows:
+            self.all_modulestores.add(row['store'])
+            self.course_sizes[row['course_size']] = row['num_blocks']
+
+            # Save the data in a multi-level dict - { operation1: { course_size1: { modulestore1: row, ...}, ...}, ...}.
+            op_data = self.run_data.setdefault(row['operation'], {})
+            size_data = op_data.setdefault(row['course_size'], {})
+            __ = size_data.setdefault(row['store'], row)
+
+    def generate_html(self):
+        """
+        Generate HTML.
+        """
+        html = HTMLDocument("Results")
+        ms_keys = sorted(self.all_modulestores)
+        course_sizes = sorted(self.course_sizes, key=self.course_sizes.get)
+
+        # Output each operation to a different set of tables, one per metric.
+        for operation in sorted(self.run_data.keys()):
+            per_op = self.run_data[operation]
+            html.add_header(1, operation)
+
+            for metric, title in self.METRICS:
+                columns = ["Course Size (blocks)", ]
+                for k in ms_keys:
+                    columns.append("{} ({})".format(k, metric))
+                metric_table = HTMLTable(columns)
+
+                # Make a row for each course size.
+                for size in course_sizes:
+                    per_size = per_op.get(size, {})
+                    row = ["{} ({})".format(size, self.course_sizes[size]), ]
+                    for modulestore in ms_keys:
+                        if modulestore not in per_size:
+                            row.append("")
+                            continue
+                        value = per_size[modulestore][metric]
+                        if metric in ('elapsed', 'queries'):
+                            value = value / float(per_size[modulestore]['calls'])
+                        row.append("{}".format(value))
+                    metric_table.add_row(row)
+
+                html.add_header(2, title)
+                html.add_to_body(metric_table.table)
+
+        return html
+
+
 if click is not None:
     @click.command()
     @click.argument('outfile', type=click.File('w'), default='-', required=False)
     @click.option('--db_name', help='Name of sqlite database from which to read data.', default=DB_NAME)
-    @click.option('--data_type', help='Data type to process. One of: "imp_exp" or "find"', default="find")
+    @click.option('--data_type', help='Data type to process. One of: "imp_exp", "find" or "reads"', default="find")
     def cli(outfile, db_name, data_type):
         """
         Generate an HTML report from the sqlite timing data.
@@ -280,6 +361,9 @@ if click is not None:
         elif data_type == 'find':
             f_gen = FindReportGen(db_name)
             html = f_gen.generate_html()
+        elif data_type == 'reads':
+            r_gen = ReadPathReportGen(db_name)
+            html = r_gen.generate_html()
         click.echo(html.tostring(), file=outfile)
 
 if __name__ == '__main__':
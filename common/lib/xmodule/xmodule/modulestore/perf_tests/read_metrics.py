@@ -0,0 +1,92 @@
+"""
+Measures modulestore operations - wall time, mongo queries and memory - and saves the
+measurements in the sqlite database read by generate_report.py.
+"""
+from contextlib import contextmanager
+import gc
+import resource
+import sqlite3
+import time
+
+from mock import Mock, patch
+import pymongo.message
+
+# Same database as the CodeBlockTimer timings, in a separate table.
+from xmodule.modulestore.perf_tests.generate_report import DB_NAME, READ_METRICS_TABLE as TABLE_NAME
+
+# pymongo.message functions which build a message that reads from mongo.
+QUERY_FUNCTIONS = ('query', 'get_more')
+
+
+class Measurement(object):
+    """
+    The cost of one measured block of code.
+    """
+    def __init__(self):
+        self.elapsed = 0.0
+        self.queries = 0
+        self.objects = 0
+        self.peak_rss_kb = 0
+
+
+@contextmanager
+def measure():
+    """
+    Measure the enclosed block, yielding a `Measurement` which is filled in when the block exits:
+        elapsed: wall time, in ms
+        queries: the number of mongo find/get_more messages sent
+        objects: the growth in the number of gc-tracked objects, i.e. what the block left in memory
+        peak_rss_kb: the growth of the process' peak resident set size, in kB
+    """
+    measurement = Measurement()
+    mocks = {name: Mock(wraps=getattr(pymongo.message, name)) for name in QUERY_FUNCTIONS}
+
+    gc.collect()
+    start_objects = len(gc.get_objects())
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with patch.multiple(pymongo.message, **mocks):
+        start = time.time()
+        yield measurement
+        measurement.elapsed = (time.time() - start) * 1000
+
+    measurement.queries = sum(mock.call_count for mock in mocks.values())
+    measurement.peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss
+    gc.collect()
+    measurement.objects = len(gc.get_objects()) - start_objects
+
+
+class MetricsRecorder(object):
+    """
+    Saves measurements, tagged with the store and course size they were taken for, to sqlite.
+    All measurements saved by one recorder share a run_id.
+    """
+    def __init__(self, db_name=DB_NAME):
+        self.conn = sqlite3.connect(db_name)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS {} ('
+            'id INTEGER PRIMARY KEY, run_id INTEGER, store TEXT, course_size TEXT, num_blocks INTEGER, '
+            'operation TEXT, calls INTEGER, elapsed REAL, queries INTEGER, objects INTEGER, peak_rss_kb INTEGER, '
+            'timestamp TEXT DEFAULT CURRENT_TIMESTAMP)'.format(TABLE_NAME)
+        )
+        last_run_id = self.conn.execute('SELECT MAX(run_id) FROM {}'.format(TABLE_NAME)).fetchone()[0]
+        self.run_id = (last_run_id or 0) + 1
+
+    def record(self, store, course_size, num_blocks, operation, measurement, calls=1):
+        """
+        Save `measurement`, which covered `calls` calls of `operation`.
+        """
+        self.conn.execute(
+            'INSERT INTO {} (run_id, store, course_size, num_blocks, operation, calls, elapsed, queries, objects, '
+            'peak_rss_kb) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'.format(TABLE_NAME),
+            (
+                self.run_id, store, course_size, num_blocks, operation, calls, measurement.elapsed,
+                measurement.queries, measurement.objects, measurement.peak_rss_kb,
+            )
+        )
+        self.conn.commit()
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
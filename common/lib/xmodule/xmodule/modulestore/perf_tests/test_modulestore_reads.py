@@ -0,0 +1,132 @@
+"""
+Performance tests for the modulestore read paths, and publish, on synthetic courses.
+"""
+import itertools
+import random
+import unittest
+
+import ddt
+#from nose.plugins.attrib import attr
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import (
+    MIXED_MODULESTORE_SETUPS,
+    SHORT_NAME_MAP,
+    MongoContentstoreBuilder,
+)
+from xmodule.modulestore.perf_tests.generate_course import COURSE_SHAPES, USER_ID, make_course, num_blocks
+from xmodule.modulestore.perf_tests.read_metrics import MetricsRecorder, measure
+
+# Course sizes to generate per test run, from COURSE_SHAPES.
+COURSE_SIZES = ('small', 'medium', 'large')
+
+# The branches each store is read from, and the names their results are reported under.  Old mongo read
+# from the published branch behaves as MongoModuleStore, and from the draft branch as DraftModuleStore.
+STORE_BRANCHES = {
+    'mixed_mongo': (
+        ('mongo', ModuleStoreEnum.Branch.published_only),
+        ('draft', ModuleStoreEnum.Branch.draft_preferred),
+    ),
+    'mixed_split': (
+        ('split', ModuleStoreEnum.Branch.published_only),
+        ('split_draft', ModuleStoreEnum.Branch.draft_preferred),
+    ),
+}
+
+# get_items variations: (name, kwargs).
+GET_ITEMS_QUERIES = (
+    ('category', {'qualifiers': {'category': 'problem'}}),
+    ('settings', {'settings': {'display_name': u'Problem 0'}}),
+    ('category_and_settings', {'qualifiers': {'category': 'problem'}, 'settings': {'max_attempts': 1}}),
+)
+
+# Number of blocks which get_item, get_parent_location and publish are measured over.
+SAMPLE_SIZE = 10
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class ModulestoreReadPaths(unittest.TestCase):
+    """
+    This class exists to record the time, mongo queries and memory used by the common
+    modulestore read operations, and by publish, for different stores and course sizes.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(ModulestoreReadPaths, self).setUp()
+        self.recorder = MetricsRecorder()
+        self.addCleanup(self.recorder.close)
+
+    @ddt.data(*itertools.product(
+        MIXED_MODULESTORE_SETUPS,
+        COURSE_SIZES,
+    ))
+    @ddt.unpack
+    def test_generate_read_metrics(self, store_builder, course_size):
+        """
+        Generate metrics for each read operation on a course of the given size.
+        """
+        shape = COURSE_SHAPES[course_size]
+        # Sample the same blocks on every run so that the runs are comparable.
+        sampler = random.Random(0)
+
+        with MongoContentstoreBuilder().build() as contentstore:
+            with store_builder.build(contentstore) as store:
+                blocks = make_course(store, store.make_course_key('perf', course_size, 'run'), shape)
+                course_key = blocks['course'][0].course_key
+                problems = sampler.sample(blocks['problem'], min(SAMPLE_SIZE, len(blocks['problem'])))
+                verticals = sampler.sample(blocks['vertical'], min(SAMPLE_SIZE, len(blocks['vertical'])))
+
+                for name, branch in STORE_BRANCHES[SHORT_NAME_MAP[store_builder]]:
+                    desc = (name, course_size, num_blocks(shape))
+                    with store.branch_setting(branch, course_key):
+                        self._record_reads(store, course_key, problems, desc)
+                        if branch == ModuleStoreEnum.Branch.draft_preferred:
+                            self._record_publish(store, verticals, desc)
+
+    def _record_reads(self, store, course_key, problems, desc):
+        """
+        Measure each read operation, looking up `problems` where the operation takes a single block.
+        """
+        with measure() as measurement:
+            course = store.get_course(course_key, depth=None)
+        self.recorder.record(*desc, operation='get_course', measurement=measurement)
+        self.assertIsNotNone(course)
+        del course
+
+        with measure() as measurement:
+            for usage_key in problems:
+                store.get_item(usage_key)
+        self.recorder.record(*desc, operation='get_item', measurement=measurement, calls=len(problems))
+
+        for query_name, kwargs in GET_ITEMS_QUERIES:
+            with measure() as measurement:
+                items = store.get_items(course_key, **kwargs)
+            self.recorder.record(*desc, operation='get_items:{}'.format(query_name), measurement=measurement)
+            self.assertTrue(items)
+            del items
+
+        with measure() as measurement:
+            for usage_key in problems:
+                store.get_parent_location(usage_key)
+        self.recorder.record(*desc, operation='get_parent_location', measurement=measurement, calls=len(problems))
+
+    def _record_publish(self, store, verticals, desc):
+        """
+        Edit a problem in each of `verticals`, then measure publishing the verticals.
+        """
+        for vertical in verticals:
+            problem = store.get_item(vertical, depth=1).get_children()[0]
+            problem.display_name = u'Edited'
+            store.update_item(problem, USER_ID)
+
+        with measure() as measurement:
+            for vertical in verticals:
+                store.publish(vertical, USER_ID)
+        self.recorder.record(*desc, operation='publish', measurement=measurement, calls=len(verticals))
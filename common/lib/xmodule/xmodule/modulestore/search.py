@@ -1,5 +1,93 @@
+from . import fits_in_cache
+from .edit_info import get_course_version
 from .exceptions import (ItemNotFoundError, NoPathToItem)
 
+# The categories of the sections whose children are numbered in a position
+POSITIONAL_CATEGORIES = ('sequential', 'videosequence')
+
+
+def _compute_path_index(course):
+    """
+    Return a dict mapping the (block_type, block_id) of every block in course to its
+    (chapter, section, position), as path_to_location would compute them.  The first
+    path found to a block with several parents wins.
+    """
+    path_index = {}
+    # (block, depth below the course, chapter, section, positions in the sections above block)
+    stack = [(course, 0, None, None, [])]
+    while stack:
+        block, depth, chapter, section, positions = stack.pop()
+        key = (block.location.block_type, block.location.block_id)
+        if key in path_index:
+            continue
+        path_index[key] = (chapter, section, "_".join(positions) if depth > 2 else None)
+
+        # this calls get_children rather than just children b/c old mongo includes private children
+        # in children but not in get_children
+        children = block.get_children() if block.has_children else []
+        for index, child in reversed(list(enumerate(children))):
+            child_positions = positions
+            if depth >= 2 and block.location.block_type in POSITIONAL_CATEGORIES:
+                # positions are 1-indexed, and should be strings to be consistent with url parsing.
+                child_positions = positions + [str(index + 1)]
+            stack.append((
+                child,
+                depth + 1,
+                child.location.name if depth == 0 else chapter,
+                child.location.name if depth == 1 else section,
+                child_positions,
+            ))
+    return path_index
+
+
+def _get_cached_path_index(modulestore, course_key):
+    """
+    Return the path index of the current version of the course (see _compute_path_index), computing
+    it if it isn't in the request cache or the modulestore's caching subsystem (e.g. memcached).
+    Returns None if the modulestore has no caching subsystem, the course doesn't exist, or its
+    index is too large to cache.
+    """
+    cache = getattr(modulestore, 'metadata_inheritance_cache_subsystem', None)
+    if cache is None:
+        return None
+
+    # old mongo prefers draft children on the draft branch, so each branch gets its own index.  Mixed
+    # sets the branch of the store serving the course rather than its own, so ask that store.
+    get_store = getattr(modulestore, '_get_modulestore_for_courselike', None)  # pylint: disable=protected-access
+    store = get_store(course_key) if get_store is not None else modulestore
+    get_branch_setting = getattr(store, 'get_branch_setting', None)
+    branch = get_branch_setting() if get_branch_setting is not None else None
+    cache_key = u'{}/paths/{}'.format(course_key.for_branch(None), branch)
+
+    # the request cache only lives as long as the request, so its index is used without
+    # looking up the course's version again
+    request_cache = getattr(modulestore, 'request_cache', None)
+    if request_cache is not None:
+        path_indexes = request_cache.data.setdefault('path_index', {})
+        if cache_key in path_indexes:
+            return path_indexes[cache_key]
+
+    cached = cache.get(cache_key)
+    if cached is not None:
+        course = modulestore.get_course(course_key)
+        if course is None:
+            return None
+        if cached[0] != get_course_version(course):
+            cached = None
+    if cached is None:
+        course = modulestore.get_course(course_key, depth=None)
+        if course is None:
+            return None
+        cached = (get_course_version(course), _compute_path_index(course))
+        if not fits_in_cache(cached):
+            # remember not to compute it again for this version: path_to_location walks up the parents
+            cached = (cached[0], None)
+        cache.set(cache_key, cached)
+
+    if request_cache is not None:
+        path_indexes[cache_key] = cached[1]
+    return cached[1]
+
 
 def path_to_location(modulestore, usage_key):
     '''
@@ -22,6 +110,9 @@ def path_to_location(modulestore, usage_key):
 
     If the section is a sequential or vertical, position will be the children index
     of this location under that sequence.
+
+    If the modulestore has a caching subsystem, the paths are looked up in an index of
+    every block in the course, which is computed once for each version of the course.
     '''
 
     def flatten(xs):
@@ -72,6 +163,12 @@ def path_to_location(modulestore, usage_key):
         if not modulestore.has_item(usage_key):
             raise ItemNotFoundError(usage_key)
 
+        path_index = _get_cached_path_index(modulestore, usage_key.course_key)
+        if path_index is not None:
+            cached_path = path_index.get((usage_key.block_type, usage_key.block_id))
+            if cached_path is not None:
+                return (usage_key.course_key,) + cached_path
+
         path = find_path_to_course()
         if path is None:
             raise NoPathToItem(usage_key)
@@ -94,7 +191,7 @@ def path_to_location(modulestore, usage_key):
             position_list = []
             for path_index in range(2, n - 1):
                 category = path[path_index].block_type
-                if category == 'sequential' or category == 'videosequence':
+                if category in POSITIONAL_CATEGORIES:
                     section_desc = modulestore.get_item(path[path_index])
                     # this calls get_children rather than just children b/c old mongo includes private children
                     # in children but not in get_children
@@ -1,7 +1,11 @@
 """
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
+import cPickle as pickle
 import re
+import threading
+import zlib
+from collections import OrderedDict
 from mongodb_proxy import autoretry_read, MongoProxy
 import pymongo
 
@@ -70,17 +74,152 @@ def structure_to_mongo(structure):
     return new_structure
 
 
+class DocumentCache(object):
+    """
+    A bounded, thread-safe LRU cache of split modulestore documents (structures
+    and definitions) keyed by their ObjectId.
+
+    Structures and definitions are never changed once written under an id, so
+    they never need to be invalidated. Entries are kept pickled: this lets the
+    cache bound itself by the number of bytes it holds, and gives every caller
+    its own copy of the document (the modulestore updates block data in place,
+    e.g. when it loads definitions into a structure).
+
+    If a `second_tier` cache (anything with Django's cache get/set interface,
+    e.g. memcached) is given, it is consulted on local misses and populated on
+    writes. Values larger than the backend's item size limit are simply not
+    stored there.
+    """
+    def __init__(self, name, max_bytes, second_tier=None, timeout=None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.second_tier = second_tier
+        self.timeout = timeout
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.second_tier_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        """
+        Whether this cache will store anything.
+        """
+        return self.max_bytes > 0 or self.second_tier is not None
+
+    def get(self, key):
+        """
+        Return a fresh copy of the document cached under `key`, or None.
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            data = self._entries.pop(key, None)
+            if data is not None:
+                # re-insert to mark as most recently used
+                self._entries[key] = data
+                self.hits += 1
+
+        if data is None and self.second_tier is not None:
+            compressed = self.second_tier.get(self._second_tier_key(key))
+            if compressed is not None:
+                data = zlib.decompress(compressed)
+                self._store(key, data)
+                with self._lock:
+                    self.second_tier_hits += 1
+
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        return pickle.loads(data)
+
+    def set(self, key, document):
+        """
+        Cache a copy of `document` under `key`.
+        """
+        if not self.enabled:
+            return
+
+        data = pickle.dumps(document, pickle.HIGHEST_PROTOCOL)
+        self._store(key, data)
+        if self.second_tier is not None:
+            self.second_tier.set(self._second_tier_key(key), zlib.compress(data, 1), self.timeout)
+
+    def clear(self):
+        """
+        Drop all locally cached documents.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        Return a dict of counters describing the use of this cache.
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'second_tier_hits': self.second_tier_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _second_tier_key(self, key):
+        """
+        The key used to store `key` in the second tier cache.
+        """
+        return u'split.{}.{}'.format(self.name, key)
+
+    def _store(self, key, data):
+        """
+        Put the serialized `data` in the local cache, evicting the least
+        recently used entries until it fits.
+        """
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+
+            while self._size > self.max_bytes:
+                __, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, structure_cache=None, definition_cache=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        `structure_cache` and `definition_cache` are optional :class:`DocumentCache` instances
+        to consult before reading structures and definitions from the database.
         """
+        self.structure_cache = structure_cache or DocumentCache('structures', 0)
+        self.definition_cache = definition_cache or DocumentCache('definitions', 0)
+
         self.database = MongoProxy(
             pymongo.database.Database(
                 pymongo.MongoClient(
@@ -122,7 +261,11 @@ class MongoConnection(object):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
-        return structure_from_mongo(self.structures.find_one({'_id': key}))
+        structure = self.structure_cache.get(key)
+        if structure is None:
+            structure = structure_from_mongo(self.structures.find_one({'_id': key}))
+            self.structure_cache.set(key, structure)
+        return structure
 
     @autoretry_read()
     def find_structures_by_id(self, ids):
@@ -132,7 +275,24 @@ class MongoConnection(object):
         Arguments:
             ids (list): A list of structure ids
         """
-        return [structure_from_mongo(structure) for structure in self.structures.find({'_id': {'$in': ids}})]
+        if not self.structure_cache.enabled:
+            return [structure_from_mongo(structure) for structure in self.structures.find({'_id': {'$in': ids}})]
+
+        structures = []
+        missing_ids = []
+        for structure_id in ids:
+            structure = self.structure_cache.get(structure_id)
+            if structure is None:
+                missing_ids.append(structure_id)
+            else:
+                structures.append(structure)
+
+        if missing_ids:
+            for structure in self.structures.find({'_id': {'$in': missing_ids}}):
+                structure = structure_from_mongo(structure)
+                self.structure_cache.set(structure['_id'], structure)
+                structures.append(structure)
+        return structures
 
     @autoretry_read()
     def find_structures_derived_from(self, ids):
@@ -174,6 +334,7 @@ class MongoConnection(object):
         Insert a new structure into the database.
         """
         self.structures.insert(structure_to_mongo(structure))
+        self.structure_cache.set(structure['_id'], structure)
 
     def get_course_index(self, key, ignore_case=False):
         """
@@ -253,19 +414,41 @@ class MongoConnection(object):
         """
         Get the definition from the persistence mechanism whose id is the given key
         """
-        return self.definitions.find_one({'_id': key})
+        definition = self.definition_cache.get(key)
+        if definition is None:
+            definition = self.definitions.find_one({'_id': key})
+            if definition is not None:
+                self.definition_cache.set(key, definition)
+        return definition
 
     def get_definitions(self, definitions):
         """
         Retrieve all definitions listed in `definitions`.
         """
-        return self.definitions.find({'_id': {'$in': definitions}})
+        if not self.definition_cache.enabled:
+            return self.definitions.find({'_id': {'$in': definitions}})
+
+        found = []
+        missing_ids = []
+        for definition_id in definitions:
+            definition = self.definition_cache.get(definition_id)
+            if definition is None:
+                missing_ids.append(definition_id)
+            else:
+                found.append(definition)
+
+        if missing_ids:
+            for definition in self.definitions.find({'_id': {'$in': missing_ids}}):
+                self.definition_cache.set(definition['_id'], definition)
+                found.append(definition)
+        return found
 
     def insert_definition(self, definition):
         """
         Create the definition in the db
         """
         self.definitions.insert(definition)
+        self.definition_cache.set(definition['_id'], definition)
 
     def ensure_indexes(self):
         """
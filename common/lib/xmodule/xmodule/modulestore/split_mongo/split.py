@@ -79,8 +79,9 @@ from xmodule.modulestore import (
 
 from ..exceptions import ItemNotFoundError
 from .caching_descriptor_system import CachingDescriptorSystem
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DocumentCache, DuplicateKeyError
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
+from xmodule.modulestore.split_mongo.structure_index import StructureIndexCache
 from xmodule.error_module import ErrorDescriptor
 from collections import defaultdict
 from types import NoneType
@@ -110,6 +111,9 @@ log = logging.getLogger(__name__)
 # When blacklists are this, all children should be excluded
 EXCLUDE_ALL = '*'
 
+# Default number of structures whose get_items indexes are kept in memory
+STRUCTURE_INDEX_CACHE_SIZE = 100
+
 
 new_contract('BlockUsageLocator', BlockUsageLocator)
 new_contract('BlockKey', BlockKey)
@@ -608,15 +612,26 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, **kwargs):
+                 services=None, structure_cache_max_bytes=0, definition_cache_max_bytes=0,
+                 structure_cache_subsystem=None, structure_index_cache_size=STRUCTURE_INDEX_CACHE_SIZE, **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param structure_cache_max_bytes: the size of the in-process cache of structures (0 disables it)
+        :param definition_cache_max_bytes: the size of the in-process cache of definitions (0 disables it)
+        :param structure_cache_subsystem: an optional shared cache (e.g. memcached) backing the
+            in-process structure cache
+        :param structure_index_cache_size: the number of structures whose get_items indexes are kept
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(
+            structure_cache=DocumentCache('structures', structure_cache_max_bytes, structure_cache_subsystem),
+            definition_cache=DocumentCache('definitions', definition_cache_max_bytes),
+            **doc_store_config
+        )
         self.db = self.db_connection.database
+        self.structure_indexes = StructureIndexCache(structure_index_cache_size)
 
         if default_class is not None:
             module_path, __, class_name = default_class.rpartition('.')
@@ -1023,35 +1038,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             return []
 
         course = self._lookup_course(course_locator)
-        items = []
         qualifiers = qualifiers.copy() if qualifiers else {}  # copy the qualifiers (destructively manipulated here)
-
-        def _block_matches_all(block_data):
-            """
-            Check that the block matches all the criteria
-            """
-            # do the checks which don't require loading any additional data
-            if (  # pylint: disable=bad-continuation
-                self._block_matches(block_data, qualifiers) and
-                self._block_matches(block_data.fields, settings)
-            ):
-                if content:
-                    definition_block = self.get_definition(course_locator, block_data.definition)
-                    return self._block_matches(definition_block['fields'], content)
-                else:
-                    return True
-
-        if settings is None:
-            settings = {}
-        if 'name' in qualifiers:
-            # odd case where we don't search just confirm
-            block_name = qualifiers.pop('name')
-            block_ids = []
-            for block_id, block in course.structure['blocks'].iteritems():
-                if block_name == block_id.id and _block_matches_all(block):
-                    block_ids.append(block_id)
-
-            return self._load_items(course, block_ids, lazy=True, **kwargs)
+        settings = settings.copy() if settings else {}
 
         if 'category' in qualifiers:
             qualifiers['block_type'] = qualifiers.pop('category')
@@ -1059,15 +1047,53 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # don't expect caller to know that children are in fields
         if 'children' in qualifiers:
             settings['children'] = qualifiers.pop('children')
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
-                items.append(block_id)
 
-        if len(items) > 0:
-            return self._load_items(course, items, 0, lazy=True, **kwargs)
+        # name is the block id, which is in the BlockKey rather than the block data;
+        # the index answers for it, so it doesn't need confirming below
+        block_name = qualifiers.pop('name', None)
+
+        blocks = course.structure['blocks']
+        index = self._get_structure_index(course)
+        candidates = index.candidates(dict(qualifiers, name=block_name), settings) if index is not None else None
+        if candidates is None:
+            candidates = blocks.iterkeys()
+        block_ids = [
+            block_id for block_id in candidates
+            if (block_name is None or block_id.id == block_name) and
+            self._block_matches(blocks[block_id], qualifiers) and
+            self._block_matches(blocks[block_id].fields, settings)
+        ]
+
+        if content and block_ids:
+            # do the checks which require loading the definitions, fetching them all at once
+            definitions = {
+                definition['_id']: definition
+                for definition in self.get_definitions(
+                    course_locator, set(blocks[block_id].definition for block_id in block_ids)
+                )
+            }
+            block_ids = [
+                block_id for block_id in block_ids
+                if blocks[block_id].definition in definitions and
+                self._block_matches(definitions[blocks[block_id].definition]['fields'], content)
+            ]
+
+        if len(block_ids) > 0:
+            return self._load_items(course, block_ids, 0, lazy=True, **kwargs)
         else:
             return []
 
+    def _get_structure_index(self, course):
+        """
+        Return the (cached) StructureIndex of the blocks in the course envelope's structure, or
+        None if the structure is being edited in the active bulk operation and so can still change.
+        """
+        structure = course.structure
+        bulk_write_record = self._get_bulk_ops_record(course.course_key)
+        if bulk_write_record.active and structure['_id'] not in bulk_write_record.structures_in_db:
+            return None
+        return self.structure_indexes.get(structure)
+
     def get_parent_location(self, locator, **kwargs):
         '''
         Return the location (Locators w/ block_ids) for the parent of this location in this
@@ -2359,6 +2385,9 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         log.info(u"deleting course from split-mongo: %s", course_key)
         self.delete_course_index(course_key)
 
+        if self.signal_handler:
+            self.signal_handler.send("course_deleted", course_key=course_key)
+
         # We do NOT call the super class here since we need to keep the assets
         # in case the course is later restored.
         # super(SplitMongoModuleStore, self).delete_course(course_key, user_id)
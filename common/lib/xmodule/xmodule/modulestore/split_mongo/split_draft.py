@@ -204,6 +204,9 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
                 if branch == ModuleStoreEnum.BranchName.draft and branched_location.block_type in DIRECT_ONLY_CATEGORIES:
                     self.publish(parent_loc.version_agnostic(), user_id, blacklist=EXCLUDE_ALL, **kwargs)
 
+            if ModuleStoreEnum.BranchName.published in branches_to_delete:
+                self._flag_publish_event(location.course_key)
+
         # Remove this location from the courseware search index so that searches
         # will refrain from showing it as a result
         CoursewareSearchIndexer.add_to_search_index(self, location, delete=True)
@@ -351,8 +354,7 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
             blacklist=blacklist
         )
 
-        # Now it's been published, add the object to the courseware search index so that it appears in search results
-        CoursewareSearchIndexer.add_to_search_index(self, location)
+        self._flag_publish_event(location.course_key)
 
         return self.get_item(location.for_branch(ModuleStoreEnum.BranchName.published), **kwargs)
 
@@ -0,0 +1,94 @@
+"""
+Secondary indexes over the blocks of a split modulestore structure, used to narrow
+down the blocks which get_items has to match against its qualifiers.
+"""
+from collections import defaultdict, OrderedDict
+import numbers
+import threading
+
+
+class StructureIndex(object):
+    """
+    Maps block types, block ids (names) and the values of selected settings fields to
+    the BlockKeys of the blocks in a structure which have them.
+
+    The index is only ever used to pick candidate blocks; callers still match each
+    candidate against all of their criteria.
+    """
+    # Settings fields whose values are indexed.
+    INDEXED_SETTINGS = ('display_name',)
+
+    def __init__(self, blocks):
+        self.by_type = defaultdict(set)
+        self.by_name = defaultdict(set)
+        self.by_setting = {field: defaultdict(set) for field in self.INDEXED_SETTINGS}
+
+        for block_key, block_data in blocks.iteritems():
+            self.by_type[block_data.block_type].add(block_key)
+            self.by_name[block_key.id].add(block_key)
+            for field, by_value in self.by_setting.iteritems():
+                if field not in block_data.fields:
+                    continue
+                value = block_data.fields[field]
+                # a list value matches a criteria if any of its elements do
+                for element in (value if isinstance(value, list) else [value]):
+                    if _is_indexable(element):
+                        by_value[element].add(block_key)
+
+    def candidates(self, qualifiers, settings):
+        """
+        Return the set of BlockKeys which may match `qualifiers` and `settings` (as passed to
+        get_items, with 'category' already renamed to 'block_type'), or None if the index can't
+        narrow them down.
+        """
+        candidate_sets = []
+        if _is_indexable(qualifiers.get('block_type')):
+            candidate_sets.append(self.by_type.get(qualifiers['block_type'], set()))
+        if _is_indexable(qualifiers.get('name')):
+            candidate_sets.append(self.by_name.get(qualifiers['name'], set()))
+        for field, by_value in self.by_setting.iteritems():
+            if _is_indexable(settings.get(field)):
+                candidate_sets.append(by_value.get(settings[field], set()))
+
+        if not candidate_sets:
+            return None
+        return set.intersection(*sorted(candidate_sets, key=len))
+
+
+def _is_indexable(criteria):
+    """
+    Only plain values are looked up in the indexes; regexes, functions, lists and
+    $in/$nin dicts have to be matched block by block.
+    """
+    return isinstance(criteria, (basestring, numbers.Number))
+
+
+class StructureIndexCache(object):
+    """
+    A thread-safe LRU cache of StructureIndexes, keyed by structure id, holding at most
+    `max_entries` indexes.  Structures are never changed once saved under an id, so the
+    indexes never need invalidating.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, structure):
+        """
+        Return the index for `structure`, building it if it isn't cached.
+        """
+        with self._lock:
+            index = self._entries.pop(structure['_id'], None)
+            if index is not None:
+                # re-insert to mark as most recently used
+                self._entries[structure['_id']] = index
+                return index
+
+        index = StructureIndex(structure['blocks'])
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[structure['_id']] = index
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return index
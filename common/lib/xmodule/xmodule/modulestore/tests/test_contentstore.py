@@ -1,6 +1,7 @@
 """
  Test contentstore.mongo functionality
 """
+import hashlib
 import logging
 from uuid import uuid4
 import unittest
@@ -105,6 +106,23 @@ class TestContentstore(unittest.TestCase):
         # ensure deleting a non-existent file is a noop
         self.contentstore.delete(asset_key)
 
+    @ddt.data(True, False)
+    def test_content_digest(self, deprecated):
+        """
+        Test that the md5 of saved content is recorded and returned by find
+        """
+        self.set_up_assets(deprecated)
+        filename = self.course1_files[0]
+        asset_key = self.course1_key.make_asset_key('asset', filename)
+        with open("{}/static/{}".format(DATA_DIR, filename), "rb") as f:
+            expected_digest = hashlib.md5(f.read()).hexdigest()
+
+        self.assertEqual(self.contentstore.find(asset_key).content_digest, expected_digest)
+        self.assertEqual(self.contentstore.find(asset_key, as_stream=True).content_digest, expected_digest)
+
+        content = StaticContent(asset_key, filename, 'text/plain', 'new data')
+        self.assertEqual(self.contentstore.save(content).content_digest, hashlib.md5('new data').hexdigest())
+
     @ddt.data(True, False)
     def test_find(self, deprecated):
         """
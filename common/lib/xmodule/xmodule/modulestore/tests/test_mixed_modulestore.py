@@ -7,6 +7,7 @@ import datetime
 import ddt
 import itertools
 import mimetypes
+from mock import patch, Mock
 from uuid import uuid4
 
 # Mixed modulestore depends on django, so we'll manually configure some django settings
@@ -19,7 +20,7 @@ from pytz import UTC
 
 from xmodule.modulestore.edit_info import EditInfoMixin
 from xmodule.modulestore.inheritance import InheritanceMixin
-from xmodule.modulestore.tests.test_cross_modulestore_import_export import MongoContentstoreBuilder
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import MemoryCache, MongoContentstoreBuilder
 from xmodule.contentstore.content import StaticContent
 from opaque_keys.edx.keys import CourseKey
 from xmodule.modulestore.xml_importer import import_from_xml
@@ -1122,6 +1123,93 @@ class TestMixedModuleStore(CourseComparisonTest):
         with self.assertRaises(NoPathToItem):
             path_to_location(self.store, orphan)
 
+    @ddt.data('draft', 'split')
+    def test_path_to_location_index(self, default_ms):
+        """
+        Make sure that path_to_location looks paths up in the cached path index, and
+        recomputes it when the course changes
+        """
+        self.initdb(default_ms)
+        self.store.metadata_inheritance_cache_subsystem = MemoryCache()
+
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            self._create_block_hierarchy()
+
+            with patch.object(self.store, 'get_parent_location', side_effect=AssertionError):
+                self.assertEqual(
+                    path_to_location(self.store, self.problem_x1a_2),
+                    (course_key, u"Chapter_x", u"Sequential_x1", '1')
+                )
+                self.assertEqual(path_to_location(self.store, self.chapter_x), (course_key, "Chapter_x", None, None))
+
+                problem = self.store.create_child(self.user_id, self.vertical_x1b, 'problem', block_id='Problem_x1b_1')
+                self.assertEqual(
+                    path_to_location(self.store, problem.location),
+                    (course_key, u"Chapter_x", u"Sequential_x1", '2')
+                )
+
+    @ddt.data('draft', 'split')
+    def test_path_to_location_index_too_large(self, default_ms):
+        """
+        Make sure that path_to_location walks up the parents when the path index is too large to cache
+        """
+        self.initdb(default_ms)
+        self.store.metadata_inheritance_cache_subsystem = MemoryCache()
+
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            self._create_block_hierarchy()
+
+            with patch('xmodule.modulestore.MAX_CACHED_VALUE_SIZE', 0):
+                self.assertEqual(
+                    path_to_location(self.store, self.problem_x1a_2),
+                    (course_key, u"Chapter_x", u"Sequential_x1", '1')
+                )
+            with patch('xmodule.modulestore.search._compute_path_index', side_effect=AssertionError):
+                self.assertEqual(
+                    path_to_location(self.store, self.problem_x1a_2),
+                    (course_key, u"Chapter_x", u"Sequential_x1", '1')
+                )
+
+    @ddt.data('draft', 'split')
+    def test_path_to_location_index_per_branch(self, default_ms):
+        """
+        Make sure that the path index computed on one branch isn't used on the other
+        """
+        self.initdb(default_ms)
+        self.store.metadata_inheritance_cache_subsystem = MemoryCache()
+
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            self._create_block_hierarchy()
+            path_to_location(self.store, self.problem_x1a_2)
+
+        with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, course_key):
+            with patch('xmodule.modulestore.search._compute_path_index', side_effect=AssertionError):
+                with self.assertRaises(AssertionError):
+                    path_to_location(self.store, self.problem_x1a_2)
+
+    @ddt.data('draft', 'split')
+    def test_path_to_location_index_request_cache(self, default_ms):
+        """
+        Make sure that path_to_location only looks the course up once per request
+        """
+        self.initdb(default_ms)
+        self.store.metadata_inheritance_cache_subsystem = MemoryCache()
+        self.store.request_cache = Mock(data={})
+
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            self._create_block_hierarchy()
+            path_to_location(self.store, self.problem_x1a_2)
+
+            with patch.object(self.store, 'get_course', side_effect=AssertionError):
+                self.assertEqual(
+                    path_to_location(self.store, self.problem_x1a_2),
+                    (course_key, u"Chapter_x", u"Sequential_x1", '1')
+                )
+
     def test_xml_path_to_location(self):
         """
         Make sure that path_to_location works: should be passed a modulestore
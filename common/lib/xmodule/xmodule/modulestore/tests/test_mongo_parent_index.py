@@ -0,0 +1,134 @@
+"""
+Tests of the cached parent index used by the old mongo modulestore's get_parent_location
+"""
+from shutil import rmtree
+from tempfile import mkdtemp
+import unittest
+from mock import patch
+from uuid import uuid4
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.mongo.draft import DraftModuleStore
+from xmodule.modulestore.tests.factories import check_mongo_calls
+from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import (
+    MemoryCache, MongoContentstoreBuilder, XBLOCK_MIXINS,
+)
+
+
+class TestParentIndex(unittest.TestCase):
+    """
+    Tests of get_parent_location with cache_parent_locations enabled
+    """
+    def setUp(self):
+        super(TestParentIndex, self).setUp()
+        contentstore_builder = MongoContentstoreBuilder().build()
+        contentstore = contentstore_builder.__enter__()
+        self.addCleanup(contentstore_builder.__exit__, None, None, None)
+
+        fs_root = mkdtemp()
+        self.addCleanup(rmtree, fs_root, ignore_errors=True)
+
+        self.store = DraftModuleStore(
+            contentstore,
+            {
+                'host': MONGO_HOST,
+                'port': MONGO_PORT_NUM,
+                'db': 'test_parent_index_{}'.format(uuid4().hex[:5]),
+                'collection': 'modulestore',
+            },
+            fs_root,
+            render_template=repr,
+            branch_setting_func=lambda: ModuleStoreEnum.Branch.draft_preferred,
+            metadata_inheritance_cache_subsystem=MemoryCache(),
+            xblock_mixins=XBLOCK_MIXINS,
+            cache_parent_locations=True,
+        )
+        self.addCleanup(self.store._drop_database)  # pylint: disable=protected-access
+
+        self.user_id = ModuleStoreEnum.UserID.test
+        self.course = self.store.create_course('org', 'course', 'run', self.user_id)
+        self.chapter = self._create_child(self.course.location, 'chapter')
+        self.sequential = self._create_child(self.chapter, 'sequential')
+        self.vertical_a = self._create_child(self.sequential, 'vertical')
+        self.vertical_b = self._create_child(self.sequential, 'vertical')
+        self.problem = self._create_child(self.vertical_a, 'problem')
+        self.store.publish(self.chapter, self.user_id)
+
+    def _create_child(self, parent, category):
+        """
+        Create a block under `parent` and return its location.
+        """
+        return self.store.create_child(self.user_id, parent, category).location
+
+    def assert_parent(self, location, parent, revision=ModuleStoreEnum.RevisionOption.draft_preferred):
+        """
+        Check the parent the store returns for location.
+        """
+        self.assertEqual(self.store.get_parent_location(location, revision=revision), parent)
+
+    def test_lookups_use_index(self):
+        self.assert_parent(self.problem, self.vertical_a)
+        with check_mongo_calls(0):
+            self.assert_parent(self.vertical_a, self.sequential)
+            self.assert_parent(self.sequential, self.chapter, ModuleStoreEnum.RevisionOption.published_only)
+            self.assert_parent(self.course.location, None)
+
+    def test_moved_child(self):
+        self.assert_parent(self.problem, self.vertical_a)
+
+        # move the problem to the other vertical, in draft
+        vertical_a = self.store.get_item(self.vertical_a)
+        vertical_a.children.remove(self.problem)
+        self.store.update_item(vertical_a, self.user_id)
+        vertical_b = self.store.get_item(self.vertical_b)
+        vertical_b.children.append(self.problem)
+        self.store.update_item(vertical_b, self.user_id)
+
+        self.assert_parent(self.problem, self.vertical_b)
+        self.assert_parent(self.problem, self.vertical_a, ModuleStoreEnum.RevisionOption.published_only)
+
+        self.store.publish(self.sequential, self.user_id)
+        self.assert_parent(self.problem, self.vertical_b, ModuleStoreEnum.RevisionOption.published_only)
+
+    def test_deleted_child(self):
+        self.assert_parent(self.problem, self.vertical_a)
+        self.store.delete_item(self.problem, self.user_id)
+        # the published vertical still has the problem until it is published
+        self.assert_parent(self.problem, self.vertical_a)
+        self.assert_parent(self.problem, self.vertical_a, ModuleStoreEnum.RevisionOption.published_only)
+
+        self.store.publish(self.vertical_a, self.user_id)
+        self.assert_parent(self.problem, None)
+        self.assert_parent(self.problem, None, ModuleStoreEnum.RevisionOption.published_only)
+
+    def test_not_used_in_bulk_operation(self):
+        self.assert_parent(self.problem, self.vertical_a)
+        with self.store.bulk_operations(self.course.id):
+            html = self._create_child(self.vertical_b, 'html')
+            self.assert_parent(html, self.vertical_b)
+        self.assert_parent(html, self.vertical_b)
+
+    def test_write_starts_new_generation(self):
+        self.assert_parent(self.problem, self.vertical_a)
+        cache = self.store.metadata_inheritance_cache_subsystem
+        cache_key = self.store._parent_index_cache_key(self.course.id)  # pylint: disable=protected-access
+        index = cache.get(cache_key)
+
+        self.store.delete_item(self.problem, self.user_id)
+        self.assertNotEqual(
+            self.store._parent_index_cache_key(self.course.id), cache_key  # pylint: disable=protected-access
+        )
+        # an index computed before the write, but cached after it, is never read again
+        cache.set(cache_key, index)
+        self.store.publish(self.vertical_a, self.user_id)
+        self.assert_parent(self.problem, None)
+
+    def test_too_large_to_cache(self):
+        with patch('xmodule.modulestore.MAX_CACHED_VALUE_SIZE', 0):
+            self.assert_parent(self.problem, self.vertical_a)
+        # the parents are queried rather than looked up in an index
+        with check_mongo_calls(1):
+            self.assert_parent(self.vertical_a, self.sequential)
+        with patch.object(self.store, '_compute_parent_index', side_effect=AssertionError):
+            self.assert_parent(self.sequential, self.chapter)
@@ -0,0 +1,186 @@
+"""
+Tests for the DocumentCache used by the split modulestore's MongoConnection
+"""
+from shutil import rmtree
+from tempfile import mkdtemp
+import unittest
+from uuid import uuid4
+from bson.objectid import ObjectId
+
+from xmodule.modulestore import BlockData, ModuleStoreEnum
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import DocumentCache
+from xmodule.modulestore.split_mongo.split_draft import DraftVersioningModuleStore
+from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import XBLOCK_MIXINS
+
+
+class FakeCache(object):
+    """
+    Minimal stand-in for a Django cache backend
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, timeout=None):  # pylint: disable=unused-argument
+        self.data[key] = value
+
+
+def make_structure(num_blocks=1):
+    """
+    Return a minimal structure with `num_blocks` blocks.
+    """
+    blocks = {
+        BlockKey('problem', 'problem_{}'.format(index)): BlockData(
+            block_type='problem', definition=ObjectId(), fields={'display_name': 'Problem'}, edit_info={}
+        )
+        for index in xrange(num_blocks)
+    }
+    return {'_id': ObjectId(), 'root': blocks.keys()[0], 'blocks': blocks}
+
+
+class TestDocumentCache(unittest.TestCase):
+    """
+    Tests of DocumentCache
+    """
+    def test_disabled(self):
+        cache = DocumentCache('structures', 0)
+        structure = make_structure()
+        cache.set(structure['_id'], structure)
+        self.assertIsNone(cache.get(structure['_id']))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_get_returns_copy(self):
+        cache = DocumentCache('structures', 1024 * 1024)
+        structure = make_structure()
+        cache.set(structure['_id'], structure)
+
+        cached = cache.get(structure['_id'])
+        self.assertIsNot(cached, structure)
+        self.assertEqual(cached['root'], structure['root'])
+        self.assertIsInstance(cached['blocks'][structure['root']], BlockData)
+
+        # Changes made by one caller aren't seen by the next
+        cached['blocks'][structure['root']].fields['display_name'] = 'Changed'
+        self.assertEqual(cache.get(structure['_id'])['blocks'][structure['root']].fields['display_name'], 'Problem')
+
+    def test_counters(self):
+        cache = DocumentCache('structures', 1024 * 1024)
+        structure = make_structure()
+        self.assertIsNone(cache.get(structure['_id']))
+        cache.set(structure['_id'], structure)
+        cache.get(structure['_id'])
+        cache.get(structure['_id'])
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+    def test_lru_eviction(self):
+        structures = [make_structure() for __ in xrange(3)]
+        cache = DocumentCache('structures', 1024 * 1024)
+        cache.set(structures[0]['_id'], structures[0])
+        cache.max_bytes = 2 * cache.stats()['bytes']
+
+        cache.set(structures[1]['_id'], structures[1])
+        # touch the first structure so that the second is least recently used
+        cache.get(structures[0]['_id'])
+        cache.set(structures[2]['_id'], structures[2])
+
+        self.assertIsNotNone(cache.get(structures[0]['_id']))
+        self.assertIsNone(cache.get(structures[1]['_id']))
+        self.assertIsNotNone(cache.get(structures[2]['_id']))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.stats()['bytes'], cache.max_bytes)
+
+    def test_too_large_document_not_cached(self):
+        cache = DocumentCache('structures', 100)
+        structure = make_structure(num_blocks=50)
+        cache.set(structure['_id'], structure)
+        self.assertIsNone(cache.get(structure['_id']))
+
+    def test_second_tier(self):
+        second_tier = FakeCache()
+        structure = make_structure()
+        DocumentCache('structures', 1024 * 1024, second_tier).set(structure['_id'], structure)
+
+        # A different process' cache finds the structure in the second tier
+        cache = DocumentCache('structures', 1024 * 1024, second_tier)
+        self.assertEqual(cache.get(structure['_id'])['_id'], structure['_id'])
+        self.assertEqual(cache.stats()['second_tier_hits'], 1)
+
+        # and from then on serves it locally
+        cache.get(structure['_id'])
+        self.assertEqual(cache.stats()['hits'], 1)
+
+
+class TestSplitStoreWithDocumentCaches(unittest.TestCase):
+    """
+    Tests of the split modulestore with its structure and definition caches on,
+    as they are in the LMS and Studio
+    """
+    def setUp(self):
+        super(TestSplitStoreWithDocumentCaches, self).setUp()
+        fs_root = mkdtemp()
+        self.addCleanup(rmtree, fs_root, ignore_errors=True)
+
+        self.store = DraftVersioningModuleStore(
+            None,
+            {
+                'host': MONGO_HOST,
+                'port': MONGO_PORT_NUM,
+                'db': 'test_split_document_cache_{}'.format(uuid4().hex[:5]),
+                'collection': 'split_module',
+            },
+            fs_root,
+            render_template=repr,
+            xblock_mixins=XBLOCK_MIXINS,
+            structure_cache_max_bytes=10 * 1024 * 1024,
+            definition_cache_max_bytes=10 * 1024 * 1024,
+        )
+        self.addCleanup(self.store._drop_database)  # pylint: disable=protected-access
+
+        self.user_id = ModuleStoreEnum.UserID.test
+        course = self.store.create_course('org', 'course', 'run', self.user_id)
+        self.course_key = course.id
+        self.problem = self.store.create_child(
+            self.user_id, course.location, 'problem', fields={'display_name': 'Problem', 'data': '<problem/>'}
+        )
+
+    def test_reads_are_cached(self):
+        structure_cache = self.store.db_connection.structure_cache
+        definition_cache = self.store.db_connection.definition_cache
+        self.store.get_item(self.problem.location).data  # pylint: disable=pointless-statement
+        structure_hits = structure_cache.stats()['hits']
+        definition_hits = definition_cache.stats()['hits']
+
+        self.assertEqual(self.store.get_item(self.problem.location).data, '<problem/>')
+        self.assertGreater(structure_cache.stats()['hits'], structure_hits)
+        self.assertGreater(definition_cache.stats()['hits'], definition_hits)
+
+    def test_edits_are_seen(self):
+        self.store.get_item(self.problem.location)
+
+        # an edit writes a new structure and definition rather than changing cached ones
+        problem = self.store.get_item(self.problem.location)
+        problem.display_name = 'Changed'
+        problem.data = '<problem>changed</problem>'
+        self.store.update_item(problem, self.user_id)
+
+        problem = self.store.get_item(self.problem.location)
+        self.assertEqual(problem.display_name, 'Changed')
+        self.assertEqual(problem.data, '<problem>changed</problem>')
+        self.assertEqual(self.store.get_course(self.course_key).get_children()[0].display_name, 'Changed')
+
+    def test_size_limit(self):
+        structure_cache = self.store.db_connection.structure_cache
+        structure_cache.max_bytes = 1
+        structure_cache.clear()
+
+        self.assertEqual(self.store.get_item(self.problem.location).display_name, 'Problem')
+        self.assertEqual(structure_cache.stats()['entries'], 0)
+        self.assertLessEqual(structure_cache.stats()['bytes'], structure_cache.max_bytes)
@@ -924,6 +924,13 @@ class SplitModuleItemTests(SplitModuleTest):
             settings={'display_name': re.compile(r'Hera')},
         )
         self.assertEqual(len(matches), 2)
+        matches = modulestore().get_items(locator, settings={'display_name': 'Hercules'})
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0].location.block_id, 'chapter1')
+        matches = modulestore().get_items(locator, qualifiers={'category': 'chapter', 'name': 'chapter2'})
+        self.assertEqual(len(matches), 1)
+        matches = modulestore().get_items(locator, qualifiers={'category': 'problem', 'name': 'chapter2'})
+        self.assertEqual(len(matches), 0)
 
     def test_get_parents(self):
         '''
@@ -0,0 +1,94 @@
+"""
+Tests for the StructureIndex used by the split modulestore's get_items
+"""
+import re
+import unittest
+from bson.objectid import ObjectId
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.structure_index import StructureIndex, StructureIndexCache
+
+
+def make_blocks(*blocks):
+    """
+    Return structure blocks for the given (block_type, block_id, fields) tuples.
+    """
+    return {
+        BlockKey(block_type, block_id): BlockData(
+            block_type=block_type, definition=ObjectId(), fields=fields, edit_info={}
+        )
+        for block_type, block_id, fields in blocks
+    }
+
+
+class TestStructureIndex(unittest.TestCase):
+    """
+    Tests of StructureIndex
+    """
+    def setUp(self):
+        super(TestStructureIndex, self).setUp()
+        self.index = StructureIndex(make_blocks(
+            ('chapter', 'intro', {'display_name': 'Introduction'}),
+            ('problem', 'intro', {'display_name': 'Warm up'}),
+            ('problem', 'quiz', {'display_name': 'Quiz'}),
+            ('html', 'tags', {'display_name': ['Tagged', 'Quiz']}),
+        ))
+
+    def test_by_type(self):
+        self.assertEqual(
+            self.index.candidates({'block_type': 'problem'}, {}),
+            {BlockKey('problem', 'intro'), BlockKey('problem', 'quiz')}
+        )
+        self.assertEqual(self.index.candidates({'block_type': 'video'}, {}), set())
+
+    def test_by_type_and_name(self):
+        self.assertEqual(
+            self.index.candidates({'block_type': 'problem', 'name': 'intro'}, {}),
+            {BlockKey('problem', 'intro')}
+        )
+
+    def test_by_setting(self):
+        # list values are indexed by each of their elements
+        self.assertEqual(
+            self.index.candidates({}, {'display_name': 'Quiz'}),
+            {BlockKey('problem', 'quiz'), BlockKey('html', 'tags')}
+        )
+
+    def test_not_indexable(self):
+        self.assertIsNone(self.index.candidates({}, {}))
+        self.assertIsNone(self.index.candidates({'block_type': re.compile('prob')}, {}))
+        self.assertIsNone(self.index.candidates({'block_type': {'$in': ['problem', 'html']}}, {}))
+        self.assertIsNone(self.index.candidates({'edited_by': 4}, {'display_name': lambda name: True}))
+
+
+class TestStructureIndexCache(unittest.TestCase):
+    """
+    Tests of StructureIndexCache
+    """
+    def make_structure(self):
+        """
+        Return a minimal structure.
+        """
+        return {'_id': ObjectId(), 'blocks': make_blocks(('course', 'course', {}))}
+
+    def test_cached(self):
+        cache = StructureIndexCache(2)
+        structure = self.make_structure()
+        self.assertIs(cache.get(structure), cache.get(structure))
+
+    def test_lru_eviction(self):
+        cache = StructureIndexCache(2)
+        structures = [self.make_structure() for __ in xrange(3)]
+        indexes = [cache.get(structure) for structure in structures[:2]]
+        # touch the first structure so that the second is least recently used
+        cache.get(structures[0])
+        cache.get(structures[2])
+
+        self.assertIs(cache.get(structures[0]), indexes[0])
+        self.assertIsNot(cache.get(structures[1]), indexes[1])
+
+    def test_disabled(self):
+        cache = StructureIndexCache(0)
+        structure = self.make_structure()
+        self.assertIsNot(cache.get(structure), cache.get(structure))
@@ -20,7 +20,10 @@ Modulestore virtual   |          XML physical (draft, published)
              (a, a)   |  (a, a) | (x, a) | (x, x) | (x, y) | (a, x)
              (a, b)   |  (a, b) | (x, b) | (x, x) | (x, y) | (a, x)
 """
+from functools import partial
+import hashlib
 import logging
+from multiprocessing.pool import ThreadPool
 import os
 import mimetypes
 from path import path
@@ -49,11 +52,63 @@ from xmodule.modulestore.store_utilities import draft_node_constructor, get_draf
 
 log = logging.getLogger(__name__)
 
+# The number of threads saving static files to the contentstore during an import
+STATIC_IMPORT_THREADS = 4
+
+# The bytes of a static file read at once during an import (GridFS's default chunk size)
+STATIC_IMPORT_CHUNK_SIZE = 255 * 1024
+
+
+class StaticFileChunks(object):
+    """
+    The contents of a static file, read in chunks whenever it's iterated over, so that
+    importing the file doesn't need all of it in memory.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def __iter__(self):
+        with open(self.file_path, 'rb') as static_file:
+            while True:
+                chunk = static_file.read(STATIC_IMPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def md5(self):
+        """
+        Return the md5 hex digest of the file, as GridFS computes it.
+        """
+        digest = hashlib.md5()
+        for chunk in self:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+def _save_static_content(static_content_store, content):
+    """
+    Save content to static_content_store, logging (rather than raising) any error.
+    """
+    try:
+        static_content_store.save(content)
+    except Exception as err:
+        log.exception(u'Error importing {0}, error={1}'.format(
+            content.import_path, err
+        ))
+
 
 def import_static_content(
         course_data_path, static_content_store,
-        target_course_id, subpath='static', verbose=False):
+        target_course_id, subpath='static', verbose=False, num_threads=STATIC_IMPORT_THREADS):
+    """
+    Import the files under course_data_path/subpath as the static assets of target_course_id.
 
+    The files are streamed to static_content_store by a pool of num_threads threads.  Files whose
+    contents and attributes are the same as the stored asset's aren't saved again.  Thumbnails
+    aren't generated here (see ContentStore.generate_thumbnails_for_course).
+
+    Returns a dict mapping each file's path under subpath to its asset key.
+    """
     remap_dict = {}
 
     # now import all static assets
@@ -61,7 +116,7 @@ def import_static_content(
     try:
         with open(course_data_path / 'policies/assets.json') as f:
             policy = json.load(f)
-    except (IOError, ValueError) as err:
+    except (IOError, ValueError):
         # xml backed courses won't have this file, only exported courses;
         # so, its absence is not really an exception.
         policy = {}
@@ -72,6 +127,10 @@ def import_static_content(
     mimetypes.add_type('application/octet-stream', '.srt')
     mimetypes_list = mimetypes.types_map.values()
 
+    existing_assets, __ = static_content_store.get_all_content_for_course(target_course_id)
+    existing_assets = {asset['asset_key'].name: asset for asset in existing_assets}
+    contents = []
+
     for dirname, _, filenames in os.walk(static_dir):
         for filename in filenames:
 
@@ -85,9 +144,11 @@ def import_static_content(
             if verbose:
                 log.debug('importing static content %s...', content_path)
 
+            data = StaticFileChunks(content_path)
             try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
+                # The file is only read once it is saved, or if its digest is needed to
+                # tell whether it is already stored; just check that it can be read.
+                open(content_path, 'rb').close()
             except IOError:
                 if filename.startswith('._'):
                     # OS X "companion files". See
@@ -110,29 +171,40 @@ def import_static_content(
             # Check extracted contentType in list of all valid mimetypes
             if not mime_type or mime_type not in mimetypes_list:
                 mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
-            content = StaticContent(
-                asset_key, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
-
-            # first let's save a thumbnail so we can get back a thumbnail location
-            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
-
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
-
-            # then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception(u'Error importing {0}, error={1}'.format(
-                    fullname_with_subpath, err
-                ))
 
             # store the remapping information which will be needed
             # to subsitute in the module data
             remap_dict[fullname_with_subpath] = asset_key
 
+            # skip the files which are already stored, e.g. when a course is imported again.
+            # The file is read for its digest only if everything else matches, so that files
+            # which are saved are otherwise read once, by GridFS computing their md5 as it
+            # stores them.
+            existing_asset = existing_assets.get(asset_key.name)
+            if existing_asset is not None and (
+                    existing_asset.get('displayname') == displayname and
+                    existing_asset.get('contentType') == mime_type and
+                    existing_asset.get('locked', False) == locked and
+                    existing_asset.get('import_path') == fullname_with_subpath and
+                    existing_asset.get('length') == os.path.getsize(content_path) and
+                    existing_asset.get('md5') == data.md5()
+            ):
+                if verbose:
+                    log.debug('static content %s is unchanged', content_path)
+                continue
+
+            contents.append(StaticContent(
+                asset_key, displayname, mime_type, data,
+                import_path=fullname_with_subpath, locked=locked
+            ))
+
+    pool = ThreadPool(num_threads)
+    try:
+        pool.map(partial(_save_static_content, static_content_store), contents)
+    finally:
+        pool.close()
+        pool.join()
+
     return remap_dict
 
 
@@ -142,7 +214,7 @@ def import_from_xml(
         load_error_modules=True, static_content_store=None,
         target_course_id=None, verbose=False,
         do_import_static=True, create_course_if_not_present=False,
-        raise_on_failure=False):
+        raise_on_failure=False, generate_thumbnails=True):
     """
     Import xml-based courses from data_dir into modulestore.
 
@@ -173,6 +245,10 @@ def import_from_xml(
         create_course_if_not_present: If True, then a new course is created if it doesn't already exist.
             Otherwise, it throws an InvalidLocationError if the course does not exist.
 
+        generate_thumbnails: If True, then the thumbnails of the imported images are generated once
+            their files are imported.  Otherwise, the caller is expected to generate them later, with
+            static_content_store.generate_thumbnails_for_course.
+
         default_class, load_error_modules: are arguments for constructing the XMLModuleStore (see its doc)
     """
 
@@ -230,7 +306,8 @@ def import_from_xml(
 
             # STEP 2: import static content
             _import_static_content_wrapper(
-                static_content_store, do_import_static, course_data_path, dest_course_id, verbose
+                static_content_store, do_import_static, course_data_path, dest_course_id, verbose,
+                generate_thumbnails
             )
 
             # Import asset metadata stored in XML.
@@ -421,7 +498,9 @@ def _import_course_module(
     return course, course_data_path
 
 
-def _import_static_content_wrapper(static_content_store, do_import_static, course_data_path, dest_course_id, verbose):
+def _import_static_content_wrapper(
+        static_content_store, do_import_static, course_data_path, dest_course_id, verbose, generate_thumbnails=True
+):
     # then import all the static content
     if static_content_store is not None and do_import_static:
         # first pass to find everything in /static/
@@ -453,6 +532,10 @@ def _import_static_content_wrapper(static_content_store, do_import_static, cours
             dest_course_id, subpath=simport, verbose=verbose
         )
 
+    # the thumbnails are generated after all the files are imported, rather than as each one is
+    if static_content_store is not None and generate_thumbnails:
+        static_content_store.generate_thumbnails_for_course(dest_course_id)
+
 
 def _import_module_and_update_references(
         module, store, user_id,
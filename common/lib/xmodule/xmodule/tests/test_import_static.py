@@ -1,9 +1,10 @@
 """
 Tests that check that we ignore the appropriate files when importing courses.
 """
+import hashlib
 import unittest
-from mock import Mock
-from xmodule.modulestore.xml_importer import import_static_content
+from mock import Mock, patch
+from xmodule.modulestore.xml_importer import StaticFileChunks, import_static_content
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from xmodule.tests import DATA_DIR
 
@@ -14,10 +15,10 @@ class IgnoredFilesTestCase(unittest.TestCase):
         course_dir = DATA_DIR / "tilde"
         course_id = SlashSeparatedCourseKey("edX", "tilde", "Fall_2012")
         content_store = Mock()
-        content_store.generate_thumbnail.return_value = ("content", "location")
+        content_store.get_all_content_for_course.return_value = ([], 0)
         import_static_content(course_dir, content_store, course_id)
         saved_static_content = [call[0][0] for call in content_store.save.call_args_list]
-        name_val = {sc.name: sc.data for sc in saved_static_content}
+        name_val = {sc.name: "".join(sc.data) for sc in saved_static_content}
         self.assertIn("example.txt", name_val)
         self.assertNotIn("example.txt~", name_val)
         self.assertIn("GREEN", name_val["example.txt"])
@@ -29,13 +30,51 @@ class IgnoredFilesTestCase(unittest.TestCase):
         course_dir = DATA_DIR / "dot-underscore"
         course_id = SlashSeparatedCourseKey("edX", "dot-underscore", "2014_Fall")
         content_store = Mock()
-        content_store.generate_thumbnail.return_value = ("content", "location")
+        content_store.get_all_content_for_course.return_value = ([], 0)
         import_static_content(course_dir, content_store, course_id)
         saved_static_content = [call[0][0] for call in content_store.save.call_args_list]
-        name_val = {sc.name: sc.data for sc in saved_static_content}
+        name_val = {sc.name: "".join(sc.data) for sc in saved_static_content}
         self.assertIn("example.txt", name_val)
         self.assertIn(".example.txt", name_val)
         self.assertNotIn("._example.txt", name_val)
         self.assertNotIn(".DS_Store", name_val)
         self.assertIn("GREEN", name_val["example.txt"])
         self.assertIn("BLUE", name_val[".example.txt"])
+
+
+class UnchangedFilesTestCase(unittest.TestCase):
+    "Tests for files which are already in the contentstore"
+    def setUp(self):
+        super(UnchangedFilesTestCase, self).setUp()
+        self.course_dir = DATA_DIR / "tilde"
+        self.course_id = SlashSeparatedCourseKey("edX", "tilde", "Fall_2012")
+        with open(self.course_dir / "static" / "example.txt", "rb") as example_file:
+            example_data = example_file.read()
+            self.stored_asset = {
+                'asset_key': self.course_id.make_asset_key('asset', 'example.txt'),
+                'md5': hashlib.md5(example_data).hexdigest(),
+                'length': len(example_data),
+                'displayname': 'example.txt',
+                'contentType': 'text/plain',
+                'import_path': 'example.txt',
+            }
+        self.content_store = Mock()
+        self.content_store.get_all_content_for_course.return_value = ([self.stored_asset], 1)
+
+    def test_unchanged_file_not_saved(self):
+        remap_dict = import_static_content(self.course_dir, self.content_store, self.course_id)
+        self.assertFalse(self.content_store.save.called)
+        self.assertIn("example.txt", remap_dict)
+
+    def test_changed_file_saved(self):
+        self.stored_asset['md5'] = 'changed'
+        import_static_content(self.course_dir, self.content_store, self.course_id)
+        saved_static_content = [call[0][0] for call in self.content_store.save.call_args_list]
+        self.assertEqual([sc.name for sc in saved_static_content], ["example.txt"])
+
+    def test_changed_length_saved_without_digest(self):
+        self.stored_asset['length'] += 1
+        with patch.object(StaticFileChunks, 'md5', side_effect=AssertionError("file read for its digest")):
+            import_static_content(self.course_dir, self.content_store, self.course_id)
+        saved_static_content = [call[0][0] for call in self.content_store.save.call_args_list]
+        self.assertEqual([sc.name for sc in saved_static_content], ["example.txt"])
@@ -2,9 +2,15 @@
 Computes the data to display on the Instructor Dashboard
 """
 from util.json_request import JsonResponse
+from util.query import use_read_replica_if_available
+from datetime import datetime, timedelta
 import json
+import pytz
 
 from courseware import models
+from class_dashboard.models import CourseAggregates, ModuleAggregate
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models import Count
 from django.utils.translation import ugettext as _
 
@@ -17,6 +23,88 @@ from opaque_keys.edx.locations import Location
 # Used to limit the length of list displayed to the screen.
 MAX_SCREEN_LIST_LENGTH = 250
 
+# How old the aggregates of a course may get before a dashboard load has them recomputed.
+AGGREGATES_MAX_AGE = timedelta(minutes=15)
+
+
+def refresh_lock_key(course_id):
+    """
+    The cache key which is set while the aggregates of the course are being recomputed.
+    """
+    return u"class_dashboard.refresh_course_aggregates.{}".format(course_id)
+
+
+def refresh_course_aggregates(course_id):
+    """
+    Recompute the ModuleAggregates of the course from its StudentModules.
+    """
+    problem_rows = use_read_replica_if_available(models.StudentModule.objects.filter(
+        course_id__exact=course_id,
+        grade__isnull=False,
+        module_type__exact="problem",
+    ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Count('grade')))
+
+    sequential_rows = use_read_replica_if_available(models.StudentModule.objects.filter(
+        course_id__exact=course_id,
+        module_type__exact="sequential",
+    ).values('module_state_key').annotate(count_sequential=Count('module_state_key')))
+
+    aggregates = [
+        ModuleAggregate(
+            course_id=course_id,
+            module_state_key=course_id.make_usage_key_from_deprecated_string(row['module_state_key']),
+            module_type="problem",
+            grade=row['grade'],
+            max_grade=row['max_grade'],
+            count=row['count_grade'],
+        )
+        for row in problem_rows
+    ]
+    aggregates.extend(
+        ModuleAggregate(
+            course_id=course_id,
+            module_state_key=course_id.make_usage_key_from_deprecated_string(row['module_state_key']),
+            module_type="sequential",
+            count=row['count_sequential'],
+        )
+        for row in sequential_rows
+    )
+
+    with transaction.commit_on_success():
+        ModuleAggregate.objects.filter(course_id=course_id).delete()
+        ModuleAggregate.objects.bulk_create(aggregates)
+        course_aggregates, __ = CourseAggregates.objects.get_or_create(
+            course_id=course_id,
+            defaults={'refreshed_at': datetime.now(pytz.UTC)},
+        )
+        course_aggregates.refreshed_at = datetime.now(pytz.UTC)
+        course_aggregates.save()
+
+
+def get_course_aggregates(course_id, module_type):
+    """
+    Returns a queryset of the ModuleAggregates of `module_type` for the course.
+
+    The aggregates are computed here the first time the course's are asked
+    for.  Aggregates older than AGGREGATES_MAX_AGE are still returned, and a
+    task is queued to recompute them (unless one already has been).
+    """
+    # Avoid a circular import: the tasks call refresh_course_aggregates.
+    from class_dashboard.tasks import refresh_aggregates
+
+    try:
+        refreshed_at = CourseAggregates.objects.get(course_id=course_id).refreshed_at
+    except CourseAggregates.DoesNotExist:
+        refreshed_at = None
+
+    if refreshed_at is None:
+        refresh_course_aggregates(course_id)
+    elif refreshed_at < datetime.now(pytz.UTC) - AGGREGATES_MAX_AGE:
+        if cache.add(refresh_lock_key(course_id), True, AGGREGATES_MAX_AGE.seconds):
+            refresh_aggregates.delay(unicode(course_id))
+
+    return ModuleAggregate.objects.filter(course_id=course_id, module_type=module_type)
+
 
 def get_problem_grade_distribution(course_id):
     """
@@ -32,12 +120,8 @@ def get_problem_grade_distribution(course_id):
         attempting the problem
     """
 
-    # Aggregate query on studentmodule table for grade data for all problems in course
-    db_query = models.StudentModule.objects.filter(
-        course_id__exact=course_id,
-        grade__isnull=False,
-        module_type__exact="problem",
-    ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Count('grade'))
+    # Aggregated grade data for all problems in course
+    db_query = get_course_aggregates(course_id, "problem").values('module_state_key', 'grade', 'max_grade', 'count')
 
     prob_grade_distrib = {}
     total_student_count = {}
@@ -48,7 +132,7 @@ def get_problem_grade_distribution(course_id):
 
         # Build set of grade distributions for each problem that has student responses
         if curr_problem in prob_grade_distrib:
-            prob_grade_distrib[curr_problem]['grade_distrib'].append((row['grade'], row['count_grade']))
+            prob_grade_distrib[curr_problem]['grade_distrib'].append((row['grade'], row['count']))
 
             if (prob_grade_distrib[curr_problem]['max_grade'] != row['max_grade']) and \
                     (prob_grade_distrib[curr_problem]['max_grade'] < row['max_grade']):
@@ -57,11 +141,11 @@ def get_problem_grade_distribution(course_id):
         else:
             prob_grade_distrib[curr_problem] = {
                 'max_grade': row['max_grade'],
-                'grade_distrib': [(row['grade'], row['count_grade'])]
+                'grade_distrib': [(row['grade'], row['count'])]
             }
 
         # Build set of total students attempting each problem
-        total_student_count[curr_problem] = total_student_count.get(curr_problem, 0) + row['count_grade']
+        total_student_count[curr_problem] = total_student_count.get(curr_problem, 0) + row['count']
 
     return prob_grade_distrib, total_student_count
 
@@ -75,17 +159,14 @@ def get_sequential_open_distrib(course_id):
     Outputs a dict mapping the 'module_id' to the number of students that have opened that subsection/sequential.
     """
 
-    # Aggregate query on studentmodule table for "opening a subsection" data
-    db_query = models.StudentModule.objects.filter(
-        course_id__exact=course_id,
-        module_type__exact="sequential",
-    ).values('module_state_key').annotate(count_sequential=Count('module_state_key'))
+    # Aggregated "opening a subsection" data
+    db_query = get_course_aggregates(course_id, "sequential").values('module_state_key', 'count')
 
     # Build set of "opened" data for each subsection that has "opened" data
     sequential_open_distrib = {}
     for row in db_query:
         row_loc = course_id.make_usage_key_from_deprecated_string(row['module_state_key'])
-        sequential_open_distrib[row_loc] = row['count_sequential']
+        sequential_open_distrib[row_loc] = row['count']
 
     return sequential_open_distrib
 
@@ -98,24 +179,22 @@ def get_problem_set_grade_distrib(course_id, problem_set):
 
     `problem_set` an array of UsageKeys representing problem module_id's.
 
-    Requests from the database the a count of each grade for each problem in the `problem_set`.
+    Reads the aggregated count of each grade for each problem in the `problem_set`.
 
     Returns a dict, where the key is the problem 'module_id' and the value is a dict with two parts:
       'max_grade' - the maximum grade possible for the course
       'grade_distrib' - array of tuples (`grade`,`count`) ordered by `grade`
     """
 
-    # Aggregate query on studentmodule table for grade data for set of problems in course
-    db_query = models.StudentModule.objects.filter(
-        course_id__exact=course_id,
-        grade__isnull=False,
-        module_type__exact="problem",
+    # Aggregated grade data for set of problems in course
+    db_query = get_course_aggregates(course_id, "problem").filter(
         module_state_key__in=problem_set,
     ).values(
         'module_state_key',
         'grade',
         'max_grade',
-    ).annotate(count_grade=Count('grade')).order_by('module_state_key', 'grade')
+        'count',
+    ).order_by('module_state_key', 'grade')
 
     prob_grade_distrib = {}
 
@@ -129,7 +208,7 @@ def get_problem_set_grade_distrib(course_id, problem_set):
             }
 
         curr_grade_distrib = prob_grade_distrib[row_loc]
-        curr_grade_distrib['grade_distrib'].append((row['grade'], row['count_grade']))
+        curr_grade_distrib['grade_distrib'].append((row['grade'], row['count']))
 
         if curr_grade_distrib['max_grade'] < row['max_grade']:
             curr_grade_distrib['max_grade'] = row['max_grade']
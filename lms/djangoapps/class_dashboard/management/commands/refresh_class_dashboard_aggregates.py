@@ -0,0 +1,35 @@
+"""
+Recompute the aggregated StudentModule data that the class dashboard displays.
+
+Run this periodically (e.g. from cron) so that dashboard loads find recent
+aggregates, rather than computing them while the instructor waits.
+"""
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand, CommandError
+
+from class_dashboard.dashboard_data import refresh_course_aggregates
+from class_dashboard.models import CourseAggregates
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+
+class Command(BaseCommand):
+    """
+    Recompute the class dashboard aggregates of the given courses, or of every
+    course whose dashboard has been viewed if no courses are given.
+    """
+    args = '<course_id course_id ...>'
+    help = dedent(__doc__).strip()
+
+    def handle(self, *args, **options):
+        if args:
+            try:
+                course_keys = [CourseKey.from_string(arg) for arg in args]
+            except InvalidKeyError:
+                raise CommandError('Invalid course key')
+        else:
+            course_keys = [aggregates.course_id for aggregates in CourseAggregates.objects.all()]
+
+        for course_key in course_keys:
+            refresh_course_aggregates(course_key)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'CourseAggregates'
+        db.create_table('class_dashboard_courseaggregates', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('course_id', self.gf('xmodule_django.models.CourseKeyField')(unique=True, max_length=255)),
+            ('refreshed_at', self.gf('django.db.models.fields.DateTimeField')()),
+        ))
+        db.send_create_signal('class_dashboard', ['CourseAggregates'])
+
+        # Adding model 'ModuleAggregate'
+        db.create_table('class_dashboard_moduleaggregate', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('course_id', self.gf('xmodule_django.models.CourseKeyField')(max_length=255, db_index=True)),
+            ('module_state_key', self.gf('xmodule_django.models.UsageKeyField')(max_length=255, db_column='module_id')),
+            ('module_type', self.gf('django.db.models.fields.CharField')(max_length=32)),
+            ('grade', self.gf('django.db.models.fields.FloatField')(null=True)),
+            ('max_grade', self.gf('django.db.models.fields.FloatField')(null=True)),
+            ('count', self.gf('django.db.models.fields.IntegerField')()),
+        ))
+        db.send_create_signal('class_dashboard', ['ModuleAggregate'])
+
+
+    def backwards(self, orm):
+        # Deleting model 'CourseAggregates'
+        db.delete_table('class_dashboard_courseaggregates')
+
+        # Deleting model 'ModuleAggregate'
+        db.delete_table('class_dashboard_moduleaggregate')
+
+
+    models = {
+        'class_dashboard.courseaggregates': {
+            'Meta': {'object_name': 'CourseAggregates'},
+            'course_id': ('xmodule_django.models.CourseKeyField', [], {'unique': 'True', 'max_length': '255'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'refreshed_at': ('django.db.models.fields.DateTimeField', [], {})
+        },
+        'class_dashboard.moduleaggregate': {
+            'Meta': {'object_name': 'ModuleAggregate'},
+            'count': ('django.db.models.fields.IntegerField', [], {}),
+            'course_id': ('xmodule_django.models.CourseKeyField', [], {'max_length': '255', 'db_index': 'True'}),
+            'grade': ('django.db.models.fields.FloatField', [], {'null': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'max_grade': ('django.db.models.fields.FloatField', [], {'null': 'True'}),
+            'module_state_key': ('xmodule_django.models.UsageKeyField', [], {'max_length': '255', 'db_column': "'module_id'"}),
+            'module_type': ('django.db.models.fields.CharField', [], {'max_length': '32'})
+        }
+    }
+
+    complete_apps = ['class_dashboard']
@@ -0,0 +1,31 @@
+"""
+Aggregates of the StudentModule rows of a course, displayed by the class dashboard.
+
+Computing them takes GROUP BY queries over every StudentModule of the course,
+so they're stored here and recomputed at most every few minutes (see
+dashboard_data.get_course_aggregates), rather than on every dashboard load.
+"""
+from django.db import models
+
+from xmodule_django.models import CourseKeyField, UsageKeyField
+
+
+class CourseAggregates(models.Model):
+    """
+    When the ModuleAggregates of a course were last computed.
+    """
+    course_id = CourseKeyField(max_length=255, unique=True)
+    refreshed_at = models.DateTimeField()
+
+
+class ModuleAggregate(models.Model):
+    """
+    The number of StudentModules of a problem with a particular grade, or the
+    number of StudentModules of a sequential (i.e. how many students opened it).
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    module_state_key = UsageKeyField(max_length=255, db_column='module_id')
+    module_type = models.CharField(max_length=32)
+    grade = models.FloatField(null=True)
+    max_grade = models.FloatField(null=True)
+    count = models.IntegerField()
@@ -0,0 +1,20 @@
+"""
+Celery tasks of the class dashboard.
+"""
+from celery import task
+from django.core.cache import cache
+
+from class_dashboard.dashboard_data import refresh_course_aggregates, refresh_lock_key
+from opaque_keys.edx.keys import CourseKey
+
+
+@task()  # pylint: disable=not-callable
+def refresh_aggregates(course_id):
+    """
+    Recompute the stale aggregates of a course, queued by a dashboard load.
+    """
+    course_key = CourseKey.from_string(course_id)
+    try:
+        refresh_course_aggregates(course_key)
+    finally:
+        cache.delete(refresh_lock_key(course_key))
@@ -2,12 +2,15 @@
 Tests for class dashboard (Metrics tab in instructor dashboard)
 """
 
+from datetime import datetime
 import json
 
+from django.core.management import call_command
 from django.test.utils import override_settings
 from django.core.urlresolvers import reverse
 from django.test.client import RequestFactory
 from mock import patch
+from pytz import UTC
 
 from capa.tests.response_xml_factory import StringResponseXMLFactory
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MOCK_MODULESTORE
@@ -22,6 +25,8 @@ from class_dashboard.dashboard_data import (get_problem_grade_distribution, get_
                                             get_section_display_name, get_array_section_has_problem,
                                             get_students_opened_subsection, get_students_problem_grades,
                                             )
+from class_dashboard.models import CourseAggregates
+from class_dashboard.tasks import refresh_aggregates
 from class_dashboard.views import has_instructor_access_for_class
 
 USER_COUNT = 11
@@ -317,3 +322,49 @@ class TestGetProblemGradeDistribution(ModuleStoreTestCase):
         """
         ret_val = has_instructor_access_for_class(self.instructor, self.course.id)
         self.assertEquals(ret_val, True)
+
+    def add_opened_subsection(self):
+        """
+        Record that a new student opened the subsection.
+        """
+        StudentModuleFactory.create(
+            course_id=self.course.id,
+            module_type='sequential',
+            module_state_key=self.sub_section.location,
+        )
+
+    def test_aggregates_reused(self):
+        get_sequential_open_distrib(self.course.id)
+        self.add_opened_subsection()
+
+        with patch('class_dashboard.dashboard_data.refresh_course_aggregates') as mock_refresh:
+            sequential_open_distrib = get_sequential_open_distrib(self.course.id)
+        self.assertFalse(mock_refresh.called)
+        self.assertNotIn(self.sub_section.location, sequential_open_distrib)
+
+    def test_stale_aggregates_refreshed(self):
+        get_sequential_open_distrib(self.course.id)
+        self.add_opened_subsection()
+        CourseAggregates.objects.filter(course_id=self.course.id).update(
+            refreshed_at=datetime(2015, 1, 1, tzinfo=UTC)
+        )
+
+        # the stale aggregates are served while the refresh is queued
+        with patch('class_dashboard.tasks.refresh_aggregates.delay') as mock_delay:
+            sequential_open_distrib = get_sequential_open_distrib(self.course.id)
+            get_sequential_open_distrib(self.course.id)
+        mock_delay.assert_called_once_with(unicode(self.course.id))
+        self.assertNotIn(self.sub_section.location, sequential_open_distrib)
+
+        refresh_aggregates(unicode(self.course.id))
+        sequential_open_distrib = get_sequential_open_distrib(self.course.id)
+        self.assertEquals(sequential_open_distrib[self.sub_section.location], 1)
+
+    def test_refresh_command(self):
+        get_sequential_open_distrib(self.course.id)
+        self.add_opened_subsection()
+
+        call_command('refresh_class_dashboard_aggregates')
+
+        sequential_open_distrib = get_sequential_open_distrib(self.course.id)
+        self.assertEquals(sequential_open_distrib[self.sub_section.location], 1)
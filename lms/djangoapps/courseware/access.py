@@ -19,7 +19,8 @@ from xblock.core import XBlock
 from xmodule.partitions.partitions import NoSuchUserPartitionError, NoSuchUserPartitionGroupError
 
 from external_auth.models import ExternalAuthMap
-from courseware.masquerade import get_masquerade_role, is_masquerading_as_student
+from courseware.masquerade import get_course_masquerade, get_masquerade_role, is_masquerading_as_student
+from openedx.core.djangoapps.course_overviews.models import CourseOverview
 from django.utils.timezone import UTC
 from student import auth
 from student.roles import (
@@ -76,7 +77,7 @@ def has_access(user, action, obj, course_key=None):
 
     # delegate the work to type-specific functions.
     # (start with more specific types, then get more general)
-    if isinstance(obj, CourseDescriptor):
+    if isinstance(obj, (CourseDescriptor, CourseOverview)):
         return _has_access_course_desc(user, action, obj)
 
     if isinstance(obj, ErrorDescriptor):
@@ -107,7 +108,8 @@ def has_access(user, action, obj, course_key=None):
 # ================ Implementation helpers ================================
 def _has_access_course_desc(user, action, course):
     """
-    Check if user has access to a course descriptor.
+    Check if user has access to a course descriptor, or to the course a CourseOverview
+    summarizes.
 
     Valid actions:
 
@@ -128,6 +130,9 @@ def _has_access_course_desc(user, action, course):
 
         NOTE: this is not checking whether user is actually enrolled in the course.
         """
+        if isinstance(course, CourseOverview):
+            return _can_load_course_overview(user, course)
+
         # delegate to generic descriptor check to check start dates
         return _has_access_descriptor(user, 'load', course, course.id)
 
@@ -366,11 +371,7 @@ def _has_group_access(descriptor, user, course_key):
     # look up the user's group for each partition
     user_groups = {}
     for partition, groups in partition_groups:
-        user_groups[partition.id] = partition.scheme.get_group_for_user(
-            course_key,
-            user,
-            partition,
-        )
+        user_groups[partition.id] = _get_group_for_user(course_key, user, partition)
 
     # finally: check that the user has a satisfactory group assignment
     # for each partition.
@@ -381,6 +382,28 @@ def _has_group_access(descriptor, user, course_key):
     return True
 
 
+def _get_group_for_user(course_key, user, partition):
+    """
+    Return the group of `user` in `partition`, remembering it on the user object
+    so that checking the other blocks rendered for the user doesn't look it up again.
+    Groups aren't remembered while the user is masquerading, since they then depend
+    on the masquerade.
+    """
+    if get_course_masquerade(user, course_key) is not None:
+        return partition.scheme.get_group_for_user(course_key, user, partition)
+
+    if not hasattr(user, '_partition_groups'):
+        user._partition_groups = {}  # pylint: disable=protected-access
+    key = (course_key, partition.id)
+    if key not in user._partition_groups:  # pylint: disable=protected-access
+        user._partition_groups[key] = partition.scheme.get_group_for_user(  # pylint: disable=protected-access
+            course_key,
+            user,
+            partition,
+        )
+    return user._partition_groups[key]  # pylint: disable=protected-access
+
+
 def _has_access_descriptor(user, action, descriptor, course_key=None):
     """
     Check if user has access to this descriptor.
@@ -442,6 +465,38 @@ def _has_access_descriptor(user, action, descriptor, course_key=None):
     return _dispatch(checkers, action, user, descriptor)
 
 
+def _can_load_course_overview(user, course_overview):
+    """
+    The 'load' check of _has_access_descriptor, for a CourseOverview: the course's
+    visible_to_staff_only setting and (beta-adjusted) start date.
+
+    Studio doesn't set group_access on courses themselves, so unlike for descriptors
+    there is no group access check.
+    """
+    course_key = course_overview.id
+    if course_overview.visible_to_staff_only and not _has_staff_access_to_descriptor(user, course_overview, course_key):
+        return False
+
+    # If start dates are off, can always load
+    if settings.FEATURES['DISABLE_START_DATES'] and not is_masquerading_as_student(user, course_key):
+        debug("Allow: DISABLE_START_DATES")
+        return True
+
+    if course_overview.start is not None:
+        now = datetime.now(UTC())
+        effective_start = _adjust_start_date_for_beta_testers(user, course_overview, course_key=course_key)
+        if now > effective_start:
+            # after start date, everyone can see it
+            debug("Allow: now > effective start date")
+            return True
+        # otherwise, need staff access
+        return _has_staff_access_to_descriptor(user, course_overview, course_key)
+
+    # No start date, so can always load.
+    debug("Allow: no start date")
+    return True
+
+
 def _has_access_xmodule(user, action, xmodule, course_key):
     """
     Check if user has access to this xmodule.
@@ -21,6 +21,7 @@ from microsite_configuration import microsite
 from courseware.access import has_access
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module
+from openedx.core.djangoapps.course_overviews.models import CourseOverview
 from student.models import CourseEnrollment
 import branding
 
@@ -120,6 +121,8 @@ def get_opt_course_with_access(user, action, course_key):
 def course_image_url(course):
     """Try to look up the image url for the course.  If it's not found,
     log an error and return the dead link"""
+    if isinstance(course, CourseOverview):
+        return course.course_image_url
     if course.static_asset_path or modulestore().get_modulestore_type(course.id) == ModuleStoreEnum.Type.xml:
         # If we are a static course with the course_image attribute
         # set different than the default, return that path so that
@@ -181,6 +184,10 @@ def get_course_about_section(course, section_key):
     # markup. This can change without effecting this interface when we find a
     # good format for defining so many snippets of text/html.
 
+    # The course overview stores the one html section which course listings show
+    if isinstance(course, CourseOverview) and section_key == 'short_description':
+        return course.short_description
+
     # TODO: Remove number, instructors from this list
     if section_key in ['short_description', 'description', 'key_dates', 'video',
                        'course_staff_short', 'course_staff_extended',
@@ -344,7 +351,7 @@ def get_courses_by_university(user, domain=None):
 
 def get_courses(user, domain=None):
     '''
-    Returns a list of courses available, sorted by course.number
+    Returns a list of the CourseOverviews of the courses available, sorted by course.number
     '''
     courses = branding.get_visible_courses()
 
@@ -13,22 +13,30 @@ from django.test.client import RequestFactory
 import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
-from courseware.model_data import FieldDataCache
-from student.models import anonymous_id_for_user
+from courseware.model_data import FieldDataCache, ScoresClient, chunks
+from student.models import anonymous_id_for_user, anonymous_ids_for_users
 from util.module_utils import yield_dynamic_descriptor_descendents
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.edit_info import get_course_version
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
-from .models import StudentModule
+from .models import StudentModule, PersistentSubsectionGrade, persistent_grades_enabled
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import UsageKey
 
 
 log = logging.getLogger("edx.courseware")
 
+# Number of StudentModule rows read per query when computing answer distributions
+ANSWER_DISTRIBUTION_CHUNK_SIZE = 1000
+
+# Number of students whose anonymous ids are looked up together by iterate_grades_for
+ANONYMOUS_ID_CHUNK_SIZE = 1000
+
 
 def answer_distributions(course_key):
     """
@@ -59,8 +67,13 @@ def answer_distributions(course_key):
 
     This method will try to use a read-replica database if one is available.
     """
-    # dict: { module.module_state_key : (url_name, display_name) }
-    state_keys_to_problem_info = {}  # For caching, used by url_and_display_name
+    # Look up the url_name and display_name of all of the course's problems at once,
+    # rather than loading each submitted problem from the modulestore.
+    # dict: { block_id : (url_name, display_name) }
+    block_ids_to_problem_info = {
+        problem.location.block_id: (problem.url_name, problem.display_name_with_default)
+        for problem in modulestore().get_items(course_key, qualifiers={'category': 'problem'})
+    }
 
     def url_and_display_name(usage_key):
         """
@@ -68,35 +81,43 @@ def answer_distributions(course_key):
         Handle modulestore access and caching. This method ignores permissions.
 
         Raises:
-            InvalidKeyError: if the usage_key does not parse
             ItemNotFoundError: if there is no content that corresponds
                 to this usage_key.
         """
-        problem_store = modulestore()
-        if usage_key not in state_keys_to_problem_info:
-            problem = problem_store.get_item(usage_key)
-            problem_info = (problem.url_name, problem.display_name_with_default)
-            state_keys_to_problem_info[usage_key] = problem_info
-
-        return state_keys_to_problem_info[usage_key]
-
-    # Iterate through all problems submitted for this course in no particular
-    # order, and build up our answer_counts dict that we will eventually return
+        if usage_key.block_id not in block_ids_to_problem_info:
+            # Not found among the course's problems; look it up directly, caching
+            # misses as None so each missing problem is only looked up once.
+            try:
+                problem = modulestore().get_item(usage_key)
+                block_ids_to_problem_info[usage_key.block_id] = (problem.url_name, problem.display_name_with_default)
+            except ItemNotFoundError:
+                block_ids_to_problem_info[usage_key.block_id] = None
+
+        problem_info = block_ids_to_problem_info[usage_key.block_id]
+        if problem_info is None:
+            raise ItemNotFoundError(usage_key)
+        return problem_info
+
+    # Iterate through all problems submitted for this course in primary key
+    # order, and build up our answer_counts dict that we will eventually return.
+    # Only the counts are kept, so memory is bounded by the number of distinct
+    # answers rather than the number of submissions.
     answer_counts = defaultdict(lambda: defaultdict(int))
-    for module in StudentModule.all_submitted_problems_read_only(course_key):
+    for module_id, module_state_key, student_id, state in _submitted_problem_states(course_key):
         try:
-            state_dict = json.loads(module.state) if module.state else {}
+            state_dict = json.loads(state) if state else {}
             raw_answers = state_dict.get("student_answers", {})
         except ValueError:
             log.error(
                 u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
-                module.id,
+                module_id,
                 course_key,
             )
             continue
 
         try:
-            url, display_name = url_and_display_name(module.module_state_key.map_into_course(course_key))
+            usage_key = UsageKey.from_string(module_state_key).map_into_course(course_key)
+            url, display_name = url_and_display_name(usage_key)
             # Each problem part has an ID that is derived from the
             # module.module_state_key (with some suffix appended)
             for problem_part_id, raw_answer in raw_answers.items():
@@ -114,13 +135,36 @@ def answer_distributions(course_key):
                   "was later deleted from the course. This answer will be " + \
                   "omitted from the answer distribution CSV."
             log.warning(
-                msg.format(module.module_state_key, module.id, module.student_id, course_key)
+                msg.format(module_state_key, module_id, student_id, course_key)
             )
             continue
 
     return answer_counts
 
 
+def _submitted_problem_states(course_key):
+    """
+    Yield (id, module_state_key, student_id, state) for every submitted problem
+    StudentModule of the course, in primary key order.
+
+    Rows are fetched ANSWER_DISTRIBUTION_CHUNK_SIZE at a time, each chunk starting
+    after the last id of the previous one, so that no query has to skip over rows
+    already read and only one chunk is held in memory at a time. Only the columns
+    answer_distributions needs are fetched, without building model instances.
+    """
+    queryset = StudentModule.all_submitted_problems_read_only(course_key).order_by('id').values_list(
+        'id', 'module_state_key', 'student_id', 'state'
+    )
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:ANSWER_DISTRIBUTION_CHUNK_SIZE])
+        if not chunk:
+            return
+        for row in chunk:
+            yield row
+        last_id = chunk[-1][0]
+
+
 @transaction.commit_manually
 def grade(student, request, course, keep_raw_scores=False):
     """
@@ -162,6 +206,23 @@ def _grade(student, request, course, keep_raw_scores):
         course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
     )
 
+    # Fetch the stored scores of every problem that can affect the grade at once,
+    # rather than querying StudentModule for each problem
+    with manual_transaction():
+        scores_client = ScoresClient.create_for_locations(
+            course.id, student.id, _graded_locations(grading_context)
+        )
+
+    persisted_grades = {}
+    recalculated_sections = set()
+    course_version = None
+    use_persisted_grades = persistent_grades_enabled()
+    if use_persisted_grades:
+        course_version = get_course_version(course)
+        with manual_transaction():
+            persisted_grades = PersistentSubsectionGrade.grades_for_user(student, course.id, course_version)
+        recalculated_sections = _sections_requiring_recalculation(grading_context, submissions_scores)
+
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
     # passed to the grader
@@ -171,6 +232,20 @@ def _grade(student, request, course, keep_raw_scores):
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
 
+            # If we have a stored grade for this section that is still valid, use
+            # it instead of loading every problem in the section.
+            can_persist_section = (
+                use_persisted_grades and section_descriptor.location not in recalculated_sections
+            )
+            persisted_grade = persisted_grades.get(section_descriptor.location) if can_persist_section else None
+            if persisted_grade is not None and not keep_raw_scores:
+                graded_total = Score(
+                    persisted_grade.earned_graded, persisted_grade.possible_graded, True, section_name
+                )
+                if graded_total.possible > 0:
+                    format_scores.append(graded_total)
+                continue
+
             # some problems have state that is updated independently of interaction
             # with the LMS, so they need to always be scored. (E.g. foldit.,
             # combinedopenended)
@@ -188,13 +263,9 @@ def _grade(student, request, course, keep_raw_scores):
                 )
 
             if not should_grade_section:
-                with manual_transaction():
-                    should_grade_section = StudentModule.objects.filter(
-                        student=student,
-                        module_state_key__in=[
-                            descriptor.location for descriptor in section['xmoduledescriptors']
-                        ]
-                    ).exists()
+                should_grade_section = any(
+                    descriptor.location in scores_client for descriptor in section['xmoduledescriptors']
+                )
 
             # If we haven't seen a single problem in the section, we don't have
             # to grade it at all! We can assume 0%
@@ -212,7 +283,8 @@ def _grade(student, request, course, keep_raw_scores):
                 for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
 
                     (correct, total) = get_score(
-                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores
+                        course.id, student, module_descriptor, create_module,
+                        scores_cache=submissions_scores, scores_client=scores_client
                     )
                     if correct is None and total is None:
                         continue
@@ -230,9 +302,16 @@ def _grade(student, request, course, keep_raw_scores):
 
                     scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
 
-                _, graded_total = graders.aggregate_scores(scores, section_name)
+                all_total, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
+
+                if can_persist_section and not settings.GENERATE_PROFILE_SCORES:
+                    with manual_transaction():
+                        PersistentSubsectionGrade.save_grade(
+                            student, course.id, section_descriptor.location, course_version,
+                            all_total, graded_total, [tuple(score) for score in scores]
+                        )
             else:
                 graded_total = Score(0.0, 1.0, True, section_name)
 
@@ -332,6 +411,21 @@ def _progress_summary(student, request, course):
 
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
 
+    with manual_transaction():
+        scores_client = ScoresClient.create_for_locations(
+            course.id, student.id, _graded_locations(course.grading_context)
+        )
+
+    persisted_grades = {}
+    if persistent_grades_enabled():
+        with manual_transaction():
+            persisted_grades = PersistentSubsectionGrade.grades_for_user(
+                student, course.id, get_course_version(course)
+            )
+        recalculated_sections = _sections_requiring_recalculation(course.grading_context, submissions_scores)
+        for location in recalculated_sections:
+            persisted_grades.pop(location, None)
+
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
     for chapter_module in course_module.get_display_items():
@@ -350,17 +444,25 @@ def _progress_summary(student, request, course):
                 graded = section_module.graded
                 scores = []
 
-                module_creator = section_module.xmodule_runtime.get_module
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
-                    course_id = course.id
-                    (correct, total) = get_score(
-                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
-                    )
-                    if correct is None and total is None:
-                        continue
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                persisted_grade = persisted_grades.get(section_module.location)
+                if persisted_grade is not None:
+                    scores = [
+                        Score(correct, total, graded, display_name)
+                        for (correct, total, _, display_name) in persisted_grade.raw_scores
+                    ]
+                else:
+                    module_creator = section_module.xmodule_runtime.get_module
+
+                    for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
+                        course_id = course.id
+                        (correct, total) = get_score(
+                            course_id, student, module_descriptor, module_creator,
+                            scores_cache=submissions_scores, scores_client=scores_client
+                        )
+                        if correct is None and total is None:
+                            continue
+
+                        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -387,7 +489,39 @@ def _progress_summary(student, request, course):
     return chapters
 
 
-def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
+def _graded_locations(grading_context):
+    """
+    Return the locations of all scorable blocks in the graded sections of
+    `grading_context`.
+    """
+    return [
+        descriptor.location
+        for sections in grading_context['graded_sections'].itervalues()
+        for section in sections
+        for descriptor in section['xmoduledescriptors']
+    ]
+
+
+def _sections_requiring_recalculation(grading_context, submissions_scores):
+    """
+    Return the set of graded section locations whose grades can't be persisted,
+    because they contain problems that are scored outside of StudentModule:
+    problems that always recalculate their grades, or that have scores in the
+    submissions API.
+    """
+    sections = set()
+    for section_list in grading_context['graded_sections'].itervalues():
+        for section in section_list:
+            if any(
+                    descriptor.always_recalculate_grades or
+                    descriptor.location.to_deprecated_string() in submissions_scores
+                    for descriptor in section['xmoduledescriptors']
+            ):
+                sections.add(section['section_descriptor'].location)
+    return sections
+
+
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None, scores_client=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -401,6 +535,8 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
            Can return None if user doesn't have access, or if something else went wrong.
     scores_cache: A dict of location names to (earned, possible) point tuples.
            If an entry is found in this cache, it takes precedence.
+    scores_client: An optional ScoresClient holding the user's StudentModule scores.
+           If it has fetched the score of this problem, StudentModule isn't queried.
     """
     scores_cache = scores_cache or {}
 
@@ -427,22 +563,27 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
         # These are not problems, and do not have a score
         return (None, None)
 
-    try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
-        )
-    except StudentModule.DoesNotExist:
-        student_module = None
+    if scores_client is not None and scores_client.has_fetched(problem_descriptor.location):
+        stored_score = scores_client.get(problem_descriptor.location)
+    else:
+        try:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+        except StudentModule.DoesNotExist:
+            stored_score = None
+        else:
+            stored_score = ScoresClient.Score(student_module.grade, student_module.max_grade)
 
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
+    if stored_score is not None and stored_score.total is not None:
+        correct = stored_score.correct if stored_score.correct is not None else 0
+        total = stored_score.total
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
         # we need to instantiate the problem.
-        # Otherwise, the max score (cached in student_module) won't be available
+        # Otherwise, the max score (cached in StudentModule) won't be available
         problem = module_creator(problem_descriptor)
         if problem is None:
             return (None, None)
@@ -459,7 +600,9 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception(
+                "Cannot reweight a problem with zero total points. Problem: " + str(problem_descriptor.location)
+            )
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -505,25 +648,30 @@ def iterate_grades_for(course_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
-            try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course_id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    for students_chunk in chunks(students, ANONYMOUS_ID_CHUNK_SIZE):
+        # Grading looks up each student's anonymous id (for the submissions
+        # API); do that for the whole chunk at once.
+        anonymous_ids_for_users(students_chunk, course_id)
+
+        for student in students_chunk:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
+                try:
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    gradeset = grade(student, request, course)
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course_id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
@@ -0,0 +1,129 @@
+"""
+Writers of StudentModuleHistory entries.
+
+Each save of a problem's StudentModule records a StudentModuleHistory entry
+(see StudentModuleHistory.save_history), which is written by the class named by
+the STUDENT_MODULE_HISTORY_WRITER setting:
+
+  - ImmediateHistoryWriter (the default) saves each entry when it's recorded.
+  - BufferedHistoryWriter saves the entries recorded during a request with a
+    single bulk insert, after the request's transaction has been committed.
+  - CeleryHistoryWriter hands the entries recorded during a request to a
+    celery task, which saves them.
+
+The buffering writers rely on HistoryWriterMiddleware to know when a request
+starts and ends.  Outside of requests (e.g. in celery tasks and management
+commands) they save each entry when it's recorded.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.utils.importlib import import_module
+
+from courseware.models import StudentModuleHistory
+
+log = logging.getLogger(__name__)
+
+# The entries recorded during the current request, or None outside of requests.
+_buffer = threading.local()
+
+
+class HistoryWriter(object):
+    """
+    Base class of StudentModuleHistory writers.
+    """
+    # Whether entries recorded during a request are written at its end.
+    buffered = False
+
+    def record(self, entry):
+        """
+        Record the unsaved StudentModuleHistory `entry`.
+        """
+        entries = getattr(_buffer, 'entries', None)
+        if self.buffered and entries is not None:
+            entries.append(entry)
+        else:
+            self.write([entry])
+
+    def write(self, entries):
+        """
+        Write the list of unsaved StudentModuleHistory `entries`.
+        """
+        raise NotImplementedError
+
+
+class ImmediateHistoryWriter(HistoryWriter):
+    """
+    Saves each entry when it's recorded.
+    """
+    def write(self, entries):
+        for entry in entries:
+            entry.save()
+
+
+class BufferedHistoryWriter(HistoryWriter):
+    """
+    Saves the entries recorded during a request with one bulk insert at its end.
+    """
+    buffered = True
+
+    def write(self, entries):
+        StudentModuleHistory.objects.bulk_create(entries)
+
+
+class CeleryHistoryWriter(HistoryWriter):
+    """
+    Hands the entries recorded during a request to a celery task at its end.
+    """
+    buffered = True
+
+    def write(self, entries):
+        # Avoid a circular import: the task saves StudentModuleHistory entries.
+        from courseware.tasks import save_student_module_history
+
+        save_student_module_history.delay([
+            {
+                'student_module_id': entry.student_module_id,
+                'version': entry.version,
+                'created': entry.created.isoformat(),
+                'state': entry.state,
+                'grade': entry.grade,
+                'max_grade': entry.max_grade,
+            }
+            for entry in entries
+        ])
+
+
+def get_history_writer():
+    """
+    Return an instance of the HistoryWriter named by STUDENT_MODULE_HISTORY_WRITER.
+    """
+    path = getattr(settings, 'STUDENT_MODULE_HISTORY_WRITER', 'courseware.history.ImmediateHistoryWriter')
+    module_name, class_name = path.rsplit('.', 1)
+    return getattr(import_module(module_name), class_name)()
+
+
+class HistoryWriterMiddleware(object):
+    """
+    Writes the StudentModuleHistory entries buffered during a request at its end.
+
+    This must come before TransactionMiddleware, so that the entries are only
+    written once the StudentModules they refer to have been committed.
+    """
+    def process_request(self, request):  # pylint: disable=unused-argument
+        _buffer.entries = []
+
+    def process_exception(self, request, exception):  # pylint: disable=unused-argument
+        # The request's transaction is rolled back, and its entries with it.
+        _buffer.entries = None
+
+    def process_response(self, request, response):  # pylint: disable=unused-argument
+        entries = getattr(_buffer, 'entries', None)
+        _buffer.entries = None
+        if entries:
+            try:
+                get_history_writer().write(entries)
+            except Exception:  # pylint: disable=broad-except
+                log.exception('Error writing %d StudentModuleHistory entries', len(entries))
+        return response
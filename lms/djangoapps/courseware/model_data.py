@@ -2,8 +2,9 @@
 Classes to provide the LMS runtime data storage to XBlocks
 """
 
+import copy
 import json
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from itertools import chain
 from .models import (
     StudentModule,
@@ -12,7 +13,7 @@ from .models import (
     XModuleStudentInfoField
 )
 import logging
-from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.asides import AsideUsageKeyV1
 
@@ -62,6 +63,8 @@ class FieldDataCache(object):
         asides: The list of aside types to load, or None to prefetch no asides.
         '''
         self.cache = {}
+        # Maps the ids of cached StudentModules to (state, the decoded state)
+        self._user_states = {}
         self.descriptors = descriptors
         self.select_for_update = select_for_update
 
@@ -249,6 +252,24 @@ class FieldDataCache(object):
         elif scope == Scope.user_info:
             return (scope, field_object.field_name)
 
+    def get_user_state(self, student_module):
+        """
+        Return the decoded state of `student_module`, a StudentModule in this cache.
+        The state is only decoded again if it has been changed since.
+        """
+        state, decoded_state = self._user_states.get(student_module.id, (None, None))
+        if state is not student_module.state:
+            decoded_state = json.loads(student_module.state)
+            self._user_states[student_module.id] = (student_module.state, decoded_state)
+        return decoded_state
+
+    def set_user_state(self, student_module, decoded_state):
+        """
+        Set the state of `student_module` to `decoded_state`, encoded.
+        """
+        student_module.state = json.dumps(decoded_state)
+        self._user_states[student_module.id] = (student_module.state, decoded_state)
+
     def find(self, key):
         '''
         Look for a model data object using an DjangoKeyValueStore.Key object
@@ -306,6 +327,15 @@ class FieldDataCache(object):
         return field_object
 
 
+def _copy_if_mutable(value):
+    """
+    Return a copy of `value` if it's a list or dict, or else `value` itself.
+    """
+    if isinstance(value, (list, dict)):
+        return copy.deepcopy(value)
+    return value
+
+
 class DjangoKeyValueStore(KeyValueStore):
     """
     This KeyValueStore will read and write data in the following scopes to django models
@@ -343,7 +373,9 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            return json.loads(field_object.state)[key.field_name]
+            # The decoded state is kept, so don't share parts of it that the
+            # XBlock could change in place.
+            return _copy_if_mutable(self._field_data_cache.get_user_state(field_object)[key.field_name])
         else:
             return json.loads(field_object.value)
 
@@ -360,10 +392,14 @@ class DjangoKeyValueStore(KeyValueStore):
         `kv_dict`: A dictionary of dirty fields that maps
           xblock.KvsFieldData._key : value
 
+        Each changed object is encoded and saved once, however many of its
+        fields were set.  Objects whose values didn't change aren't saved.
         """
         saved_fields = []
         # field_objects maps a field_object to a list of associated fields
         field_objects = dict()
+        # user_states maps a StudentModule to its updated decoded state
+        user_states = dict()
         for field in kv_dict:
             # Check field for validity
             if field.scope not in self._allowed_scopes:
@@ -371,30 +407,38 @@ class DjangoKeyValueStore(KeyValueStore):
 
             # If the field is valid and isn't already in the dictionary, add it.
             field_object = self._field_data_cache.find_or_create(field)
-            if field_object not in field_objects.keys():
+            if field_object not in field_objects:
                 field_objects[field_object] = []
             # Update the list of associated fields
             field_objects[field_object].append(field)
 
             # Special case when scope is for the user state, because this scope saves fields in a single row
             if field.scope == Scope.user_state:
-                state = json.loads(field_object.state)
-                state[field.field_name] = kv_dict[field]
-                field_object.state = json.dumps(state)
+                if field_object not in user_states:
+                    user_states[field_object] = dict(self._field_data_cache.get_user_state(field_object))
+                user_states[field_object][field.field_name] = _copy_if_mutable(kv_dict[field])
+
+        for field_object, fields in field_objects.iteritems():
+            if fields[0].scope == Scope.user_state:
+                old_value = field_object.state
+                self._field_data_cache.set_user_state(field_object, user_states[field_object])
+                changed = field_object.state != old_value
             else:
                 # The remaining scopes save fields on different rows, so
                 # we don't have to worry about conflicts
-                field_object.value = json.dumps(kv_dict[field])
+                value = json.dumps(kv_dict[fields[0]])
+                changed = value != field_object.value
+                field_object.value = value
 
-        for field_object in field_objects:
             try:
-                # Save the field object that we made above
-                field_object.save()
+                # Save the field object that we updated above
+                if changed:
+                    field_object.save()
                 # If save is successful on this scope, add the saved fields to
                 # the list of successful saves
-                saved_fields.extend([field.field_name for field in field_objects[field_object]])
+                saved_fields.extend([field.field_name for field in fields])
             except DatabaseError:
-                log.exception('Error saving fields %r', field_objects[field_object])
+                log.exception('Error saving fields %r', fields)
                 raise KeyValueMultiSaveError(saved_fields)
 
     def delete(self, key):
@@ -406,9 +450,9 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            state = json.loads(field_object.state)
+            state = dict(self._field_data_cache.get_user_state(field_object))
             del state[key.field_name]
-            field_object.state = json.dumps(state)
+            self._field_data_cache.set_user_state(field_object, state)
             field_object.save()
         else:
             field_object.delete()
@@ -422,6 +466,77 @@ class DjangoKeyValueStore(KeyValueStore):
             return False
 
         if key.scope == Scope.user_state:
-            return key.field_name in json.loads(field_object.state)
+            return key.field_name in self._field_data_cache.get_user_state(field_object)
         else:
             return True
+
+
+class ScoresClient(object):
+    """
+    Read-only access to the scores stored in StudentModule for one user in one
+    course, fetched for many locations at once.
+
+    Use `fetch_scores` (or `create_for_locations`) to load the scores of all
+    the locations you are interested in, then `get` them one by one without
+    further queries.
+    """
+    Score = namedtuple('Score', 'correct total')
+
+    def __init__(self, course_key, user_id):
+        self.course_key = course_key
+        self.user_id = user_id
+        self._fetched_locations = set()
+        self._locations_to_scores = {}
+
+    def fetch_scores(self, locations, chunk_size=500):
+        """
+        Load the scores of `locations` (a list of UsageKeys with full course run
+        information) from StudentModule, in chunks of `chunk_size` locations.
+        """
+        locations = set(locations)
+        for chunk in chunks(locations, chunk_size):
+            scores = StudentModule.objects.filter(
+                student_id=self.user_id,
+                course_id=self.course_key,
+                module_state_key__in=chunk,
+            ).values_list('module_state_key', 'grade', 'max_grade')
+
+            # Locations stored in StudentModule don't necessarily have course run
+            # information (old mongo keys don't include runs), so add it back in.
+            for location, correct, total in scores:
+                location = UsageKey.from_string(location).map_into_course(self.course_key)
+                self._locations_to_scores[location] = self.Score(correct, total)
+
+        self._fetched_locations.update(locations)
+
+    def has_fetched(self, location):
+        """
+        Return whether the score of `location` has been fetched.
+        """
+        return location in self._fetched_locations
+
+    def __contains__(self, location):
+        """
+        Return whether the user has a StudentModule for `location`.
+        """
+        return location in self._locations_to_scores
+
+    def get(self, location):
+        """
+        Return the Score of `location`, or None if the user has no StudentModule
+        for it.
+
+        Raises ValueError if `location` wasn't part of a previous `fetch_scores`.
+        """
+        if location not in self._fetched_locations:
+            raise ValueError(u"Score for {} was not fetched".format(location))
+        return self._locations_to_scores.get(location)
+
+    @classmethod
+    def create_for_locations(cls, course_key, user_id, locations):
+        """
+        Return a ScoresClient with the scores of `locations` already fetched.
+        """
+        client = cls(course_key, user_id)
+        client.fetch_scores(locations)
+        return client
@@ -12,12 +12,18 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import json
+
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup, CourseUserGroupPartitionGroup
+from openedx.core.djangoapps.user_api.models import UserCourseTag
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField
 
 
@@ -117,18 +123,21 @@ class StudentModuleHistory(models.Model):
     @receiver(post_save, sender=StudentModule)
     def save_history(sender, instance, **kwargs):  # pylint: disable=no-self-argument, unused-argument
         """
-        Checks the instance's module_type, and creates & saves a
+        Checks the instance's module_type, and creates & records a
         StudentModuleHistory entry if the module_type is one that
-        we save.
+        we save.  See courseware.history for how entries are written.
         """
         if instance.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES:
+            # Avoid a circular import: the history writers save StudentModuleHistory entries.
+            from courseware.history import get_history_writer
+
             history_entry = StudentModuleHistory(student_module=instance,
                                                  version=None,
                                                  created=instance.modified,
                                                  state=instance.state,
                                                  grade=instance.grade,
                                                  max_grade=instance.max_grade)
-            history_entry.save()
+            get_history_writer().record(history_entry)
 
 
 class XBlockFieldBase(models.Model):
@@ -230,3 +239,206 @@ class OfflineComputedGradeLog(models.Model):
 
     def __unicode__(self):
         return "[OCGLog] %s: %s" % (self.course_id.to_deprecated_string(), self.created)  # pylint: disable=no-member
+
+
+class PersistentSubsectionGrade(models.Model):
+    """
+    The computed score of a single graded subsection (sequential) for a user.
+
+    Rows are written by `courseware.grades` as a side effect of grading and
+    are only trusted when their `course_version` matches the version of the
+    course being graded. Any change to a StudentModule score within the
+    subsection deletes the row, so it will be recomputed on the next read.
+    So does any change to which blocks the user can see: their cohort, their
+    partition groups (UserCourseTag) and library_content/randomize selections.
+    """
+    class Meta:
+        unique_together = (('user', 'course_id', 'usage_key'),)
+
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The usage key of the subsection
+    usage_key = LocationKeyField(max_length=255, db_index=True)
+
+    # Version of the course the grade was computed against
+    course_version = models.CharField(max_length=255, blank=True, default='')
+
+    # Totals over all problems in the subsection, and over graded problems only
+    earned_all = models.FloatField()
+    possible_all = models.FloatField()
+    earned_graded = models.FloatField()
+    possible_graded = models.FloatField()
+
+    # JSON list of [earned, possible, graded, display_name], one per scored problem
+    scores = models.TextField(default='[]')
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    @classmethod
+    def grades_for_user(cls, user, course_key, course_version):
+        """
+        Return a dict mapping subsection usage keys to the PersistentSubsectionGrade
+        rows for `user` in `course_key` that were computed against `course_version`.
+        """
+        return {
+            grade.usage_key.map_into_course(course_key): grade
+            for grade in cls.objects.filter(user=user, course_id=course_key, course_version=course_version)
+        }
+
+    @classmethod
+    def save_grade(cls, user, course_key, usage_key, course_version, all_total, graded_total, scores):
+        """
+        Create or update the stored grade of the subsection `usage_key`.
+
+        `all_total` and `graded_total` are the Score tuples returned by
+        `xmodule.graders.aggregate_scores`; `scores` is a list of
+        (earned, possible, graded, display_name) tuples.
+        """
+        values = {
+            'course_version': course_version,
+            'earned_all': all_total.earned,
+            'possible_all': all_total.possible,
+            'earned_graded': graded_total.earned,
+            'possible_graded': graded_total.possible,
+            'scores': json.dumps(scores),
+        }
+        grade, created = cls.objects.get_or_create(
+            user=user, course_id=course_key, usage_key=usage_key, defaults=values
+        )
+        if not created:
+            for field, value in values.iteritems():
+                setattr(grade, field, value)
+            grade.save()
+        return grade
+
+    @property
+    def raw_scores(self):
+        """
+        The stored list of (earned, possible, graded, display_name) tuples.
+        """
+        return [tuple(score) for score in json.loads(self.scores)]
+
+    def __unicode__(self):
+        return u"[PersistentSubsectionGrade] {}: {} {} = {}/{}".format(
+            self.user, self.course_id, self.usage_key, self.earned_graded, self.possible_graded
+        )
+
+
+def _get_subsection_location(usage_key):
+    """
+    Walk up the course tree from `usage_key` and return the location of the
+    enclosing subsection, or None if it cannot be found.
+    """
+    store = modulestore()
+    location = usage_key
+    # Problems live at most a handful of levels below a subsection
+    # (vertical, split_test, library_content, conditional, ...).
+    for __ in xrange(10):
+        try:
+            location = store.get_parent_location(location)
+        except ItemNotFoundError:
+            return None
+        if location is None:
+            return None
+        if location.category == 'sequential':
+            return location
+    return None
+
+
+def persistent_grades_enabled():
+    """
+    Returns whether subsection grades are read from and written to the
+    PersistentSubsectionGrade table, and so need to be invalidated.
+    """
+    return settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES', False)
+
+
+def _delete_persistent_grades(course_id, user_ids):
+    """
+    Discards all of the stored subsection grades in `course_id` of the users
+    with ids `user_ids`.
+    """
+    PersistentSubsectionGrade.objects.filter(course_id=course_id, user_id__in=list(user_ids)).delete()
+
+
+# Modules without a score whose state decides which of their children the
+# user sees, and so which problems are in the user's grade.
+CONTENT_SELECTING_MODULE_TYPES = ('library_content', 'randomize')
+
+
+@receiver(post_save, sender=StudentModule)
+@receiver(post_delete, sender=StudentModule)
+def invalidate_persistent_subsection_grade(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discards the stored grade of the subsection containing `instance` when
+    its score or its selection of children changes (or the module is deleted,
+    e.g. on a state reset). If the subsection can't be determined, all of the
+    user's stored grades for the course are discarded.
+    """
+    if not persistent_grades_enabled():
+        return
+    if (
+            kwargs.get('signal') is post_save and
+            instance.grade is None and instance.max_grade is None and
+            instance.module_type not in CONTENT_SELECTING_MODULE_TYPES
+    ):
+        return
+
+    grades = PersistentSubsectionGrade.objects.filter(user_id=instance.student_id, course_id=instance.course_id)
+    if not grades.exists():
+        return
+
+    subsection = _get_subsection_location(instance.module_state_key.map_into_course(instance.course_id))
+    if subsection is not None:
+        grades = grades.filter(usage_key=subsection)
+    grades.delete()
+
+
+@receiver(post_save, sender=UserCourseTag)
+@receiver(post_delete, sender=UserCourseTag)
+def invalidate_persistent_grades_for_course_tag(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discards the user's stored grades for the course when one of their course
+    tags changes, since the tags hold their random partition groups.
+    """
+    if persistent_grades_enabled():
+        _delete_persistent_grades(instance.course_id, [instance.user_id])
+
+
+@receiver(m2m_changed, sender=CourseUserGroup.users.through)
+def invalidate_persistent_grades_for_cohort_users(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discards the stored grades of users who are added to or removed from a
+    cohort, since the cohort decides their content groups.
+    """
+    action = kwargs['action']
+    if not persistent_grades_enabled() or action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    pk_set = kwargs['pk_set']
+    if kwargs['reverse']:
+        # `instance` is a user, and `pk_set` the ids of the groups.
+        if action == 'pre_clear':
+            groups = instance.course_groups.all()
+        else:
+            groups = CourseUserGroup.objects.filter(pk__in=pk_set)
+        for course_id in set(groups.values_list('course_id', flat=True)):
+            _delete_persistent_grades(course_id, [instance.id])
+    else:
+        # `instance` is a group, and `pk_set` the ids of the users.
+        user_ids = instance.users.values_list('id', flat=True) if action == 'pre_clear' else pk_set
+        _delete_persistent_grades(instance.course_id, user_ids)
+
+
+@receiver(post_save, sender=CourseUserGroupPartitionGroup)
+@receiver(post_delete, sender=CourseUserGroupPartitionGroup)
+def invalidate_persistent_grades_for_cohort_group(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discards the stored grades of every member of a cohort whose content group
+    changes.
+    """
+    if persistent_grades_enabled():
+        cohort = instance.course_user_group
+        _delete_persistent_grades(cohort.course_id, cohort.users.values_list('id', flat=True))
@@ -0,0 +1,26 @@
+"""
+Celery tasks of the courseware app.
+"""
+from celery import task
+from dateutil.parser import parse as parse_date
+
+from courseware.models import StudentModuleHistory
+
+
+@task()  # pylint: disable=not-callable
+def save_student_module_history(entries):
+    """
+    Save StudentModuleHistory entries handed over by CeleryHistoryWriter, each
+    a dict of the entry's fields with `created` as an ISO 8601 string.
+    """
+    StudentModuleHistory.objects.bulk_create([
+        StudentModuleHistory(
+            student_module_id=entry['student_module_id'],
+            version=entry['version'],
+            created=parse_date(entry['created']),
+            state=entry['state'],
+            grade=entry['grade'],
+            max_grade=entry['max_grade'],
+        )
+        for entry in entries
+    ])
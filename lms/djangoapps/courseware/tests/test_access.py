@@ -17,6 +17,7 @@ from xmodule.course_module import (
 )
 from xmodule.modulestore.tests.factories import CourseFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from openedx.core.djangoapps.course_overviews.models import CourseOverview
 
 from util.milestones_helpers import (
     set_prerequisite_courses,
@@ -253,6 +254,23 @@ class AccessTestCase(LoginEnrollmentTestCase, ModuleStoreTestCase):
         self.assertTrue(access._has_access_course_desc(staff, 'see_in_catalog', course))
         self.assertTrue(access._has_access_course_desc(staff, 'see_about_page', course))
 
+    @patch.dict("django.conf.settings.FEATURES", {'ACCESS_REQUIRE_STAFF_FOR_COURSE': True})
+    def test_see_exists_course_overview(self):
+        """
+        Tests that only public courses are seen by non-staff when ACCESS_REQUIRE_STAFF_FOR_COURSE
+        is on, for overviews as well as descriptors
+        """
+        public_course = CourseFactory.create(ispublic=True)
+        private_course = CourseFactory.create()
+        for course in (public_course, private_course):
+            staff = StaffFactory.create(course_key=course.id)
+            for course_or_overview in (course, CourseOverview.get_from_id(course.id)):
+                self.assertEqual(
+                    access._has_access_course_desc(self.student, 'see_exists', course_or_overview),
+                    course is public_course
+                )
+                self.assertTrue(access._has_access_course_desc(staff, 'see_exists', course_or_overview))
+
     @patch.dict("django.conf.settings.FEATURES", {'ENABLE_PREREQUISITE_COURSES': True, 'MILESTONES_APP': True})
     def test_access_on_course_with_pre_requisites(self):
         """
@@ -1,15 +1,22 @@
 """
 Test grade calculation.
 """
+from django.conf import settings
 from django.http import Http404
+from django.test.client import RequestFactory
 from django.test.utils import override_settings
 from mock import patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 from courseware.grades import grade, iterate_grades_for
+from courseware.models import PersistentSubsectionGrade
+from courseware.tests.factories import StudentModuleFactory
+from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
+from openedx.core.djangoapps.user_api.tests.factories import UserCourseTagFactory
+from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MOCK_MODULESTORE
 from student.tests.factories import UserFactory
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
@@ -121,3 +128,98 @@ class TestGradeIteration(ModuleStoreTestCase):
                 students_to_errors[student] = err_msg
 
         return students_to_gradesets, students_to_errors
+
+
+@patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_SUBSECTION_GRADES': True})
+class TestPersistentSubsectionGrades(ModuleStoreTestCase):
+    """
+    Test that subsection grades are stored, reused and invalidated.
+    """
+    def setUp(self):
+        super(TestPersistentSubsectionGrades, self).setUp()
+        course = CourseFactory.create()
+        chapter = ItemFactory.create(parent=course, category='chapter')
+        self.sequence = ItemFactory.create(parent=chapter, category='sequential', graded=True, format='Homework')
+        self.vertical = ItemFactory.create(parent=self.sequence, category='vertical')
+        self.problem = ItemFactory.create(parent=self.vertical, category='problem')
+        self.course = modulestore().get_course(course.id)
+
+        self.student = UserFactory.create()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+        self.student_module = StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=self.problem.location,
+            grade=1,
+            max_grade=1,
+        )
+
+    def _persisted_grades(self):
+        """Return the stored grades of the student's subsections."""
+        return PersistentSubsectionGrade.objects.filter(user=self.student, course_id=self.course.id)
+
+    def test_grade_is_persisted(self):
+        grade(self.student, self.request, self.course)
+        persisted = self._persisted_grades().get(usage_key=self.sequence.location)
+        self.assertEqual((persisted.earned_graded, persisted.possible_graded), (1, 1))
+        self.assertEqual(len(persisted.raw_scores), 1)
+
+    def test_persisted_grade_is_reused(self):
+        first_summary = grade(self.student, self.request, self.course)
+        with patch('courseware.grades.get_score') as mock_get_score:
+            second_summary = grade(self.student, self.request, self.course)
+        self.assertFalse(mock_get_score.called)
+        self.assertEqual(first_summary['percent'], second_summary['percent'])
+
+    def test_score_change_invalidates_grade(self):
+        grade(self.student, self.request, self.course)
+        self.student_module.grade = 0
+        self.student_module.save()
+        self.assertFalse(self._persisted_grades().exists())
+
+        summary = grade(self.student, self.request, self.course)
+        self.assertEqual(summary['percent'], 0.0)
+        persisted = self._persisted_grades().get(usage_key=self.sequence.location)
+        self.assertEqual(persisted.earned_graded, 0)
+
+    def test_course_version_change_ignores_grade(self):
+        grade(self.student, self.request, self.course)
+        with patch('courseware.grades.get_course_version', return_value=u'another version'):
+            with patch('courseware.grades.get_score', return_value=(0, 1)) as mock_get_score:
+                grade(self.student, self.request, self.course)
+        self.assertTrue(mock_get_score.called)
+
+    def test_cohort_change_invalidates_grade(self):
+        grade(self.student, self.request, self.course)
+        CohortFactory.create(course_id=self.course.id, users=[self.student])
+        self.assertFalse(self._persisted_grades().exists())
+
+    def test_partition_group_change_invalidates_grade(self):
+        grade(self.student, self.request, self.course)
+        UserCourseTagFactory.create(
+            user=self.student, course_id=self.course.id, key='xblock.partition_service.partition_0', value='1'
+        )
+        self.assertFalse(self._persisted_grades().exists())
+
+    def test_content_selection_invalidates_grade(self):
+        randomize = ItemFactory.create(parent=self.vertical, category='randomize')
+        grade(self.student, self.request, self.course)
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=randomize.location,
+            module_type='randomize',
+            state='{"choice": 0}',
+        )
+        self.assertFalse(self._persisted_grades().exists())
+
+    def test_no_invalidation_when_disabled(self):
+        grade(self.student, self.request, self.course)
+        with patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_SUBSECTION_GRADES': False}):
+            with patch('courseware.models._get_subsection_location') as mock_get_subsection_location:
+                self.student_module.grade = 0
+                self.student_module.save()
+        self.assertFalse(mock_get_subsection_location.called)
+        self.assertTrue(self._persisted_grades().exists())
@@ -4,6 +4,7 @@ access control rules.
 """
 
 import ddt
+from mock import patch
 from stevedore.extension import Extension, ExtensionManager
 
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
@@ -405,6 +406,18 @@ class GroupAccessTestCase(ModuleStoreTestCase):
         self.check_access(self.gray_worm, block_accessed, False)
         self.ensure_staff_access(block_accessed)
 
+    def test_user_group_looked_up_once(self):
+        """
+        Test that a user's group in a partition is only looked up once, however
+        many blocks are checked.
+        """
+        self.set_group_access(self.chapter_location, {self.animal_partition.id: [self.cat_group.id]})
+        scheme = self.animal_partition.scheme
+        with patch.object(scheme, 'get_group_for_user', wraps=scheme.get_group_for_user) as mock_get_group:
+            for block_location in (self.chapter_location, self.section_location, self.vertical_location):
+                self.check_access(self.red_cat, block_location, True)
+        self.assertEqual(mock_get_group.call_count, 1)
+
     def test_group_access_short_circuits(self):
         """
         Test that the group_access check short-circuits if there are no user_partitions defined
@@ -0,0 +1,78 @@
+"""
+Tests of the StudentModuleHistory writers.
+"""
+import json
+
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from mock import patch
+
+from courseware.history import HistoryWriterMiddleware
+from courseware.models import StudentModuleHistory
+from courseware.tasks import save_student_module_history
+from courseware.tests.factories import StudentModuleFactory
+
+
+class HistoryWriterTestCase(TestCase):
+    """
+    Tests of the StudentModuleHistory writers.
+    """
+    def setUp(self):
+        super(HistoryWriterTestCase, self).setUp()
+        self.request = RequestFactory().get('/')
+        self.middleware = HistoryWriterMiddleware()
+        # Don't leave a request's buffer behind if a test fails.
+        self.addCleanup(self.middleware.process_exception, self.request, None)
+
+    def save_problem(self):
+        """
+        Save a StudentModule of a problem, which records a history entry.
+        """
+        return StudentModuleFactory.create(module_type='problem', state=json.dumps({'attempts': 1}))
+
+    def test_immediate(self):
+        self.middleware.process_request(self.request)
+        student_module = self.save_problem()
+        self.assertEqual(StudentModuleHistory.objects.filter(student_module=student_module).count(), 1)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITER='courseware.history.BufferedHistoryWriter')
+    def test_buffered(self):
+        self.middleware.process_request(self.request)
+        student_modules = [self.save_problem() for __ in range(3)]
+        self.assertFalse(StudentModuleHistory.objects.exists())
+
+        with self.assertNumQueries(1):
+            self.middleware.process_response(self.request, HttpResponse())
+        for student_module in student_modules:
+            entry = StudentModuleHistory.objects.get(student_module=student_module)
+            self.assertEqual(entry.state, student_module.state)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITER='courseware.history.BufferedHistoryWriter')
+    def test_buffered_outside_request(self):
+        student_module = self.save_problem()
+        self.assertEqual(StudentModuleHistory.objects.filter(student_module=student_module).count(), 1)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITER='courseware.history.BufferedHistoryWriter')
+    def test_buffered_exception(self):
+        self.middleware.process_request(self.request)
+        self.save_problem()
+        self.middleware.process_exception(self.request, Exception())
+        self.middleware.process_response(self.request, HttpResponse())
+        self.assertFalse(StudentModuleHistory.objects.exists())
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITER='courseware.history.CeleryHistoryWriter')
+    def test_celery(self):
+        self.middleware.process_request(self.request)
+        student_module = self.save_problem()
+        with patch('courseware.tasks.save_student_module_history.delay') as mock_delay:
+            self.middleware.process_response(self.request, HttpResponse())
+        self.assertFalse(StudentModuleHistory.objects.exists())
+
+        # Run the task as celery would.
+        entries, = mock_delay.call_args[0]
+        save_student_module_history(json.loads(json.dumps(entries)))
+        entry = StudentModuleHistory.objects.get(student_module=student_module)
+        self.assertEqual(entry.state, student_module.state)
+        self.assertEqual(entry.created, student_module.modified)
@@ -6,7 +6,7 @@ from mock import Mock, patch
 from functools import partial
 
 from courseware.model_data import DjangoKeyValueStore
-from courseware.model_data import InvalidScopeError, FieldDataCache
+from courseware.model_data import InvalidScopeError, FieldDataCache, ScoresClient
 from courseware.models import StudentModule
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
@@ -149,6 +149,27 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         "Test that `has` returns False for missing fields in StudentModule"
         self.assertFalse(self.kvs.has(user_state_key('not_a_field')))
 
+    def test_state_decoded_once(self):
+        "Test that reading several fields of a StudentModule only decodes its state once"
+        with patch('courseware.model_data.json.loads', wraps=json.loads) as mock_loads:
+            self.kvs.get(user_state_key('a_field'))
+            self.kvs.get(user_state_key('b_field'))
+            self.kvs.has(user_state_key('not_a_field'))
+        self.assertEquals(1, mock_loads.call_count)
+
+    def test_set_unchanged_field(self):
+        "Test that setting a field to its current value doesn't save the StudentModule"
+        with self.assertNumQueries(0):
+            self.kvs.set(user_state_key('a_field'), 'a_value')
+
+    def test_changing_value_in_place(self):
+        "Test that changing a value that was set or read doesn't change the stored state"
+        value = ['a_value']
+        self.kvs.set(user_state_key('list_field'), value)
+        value.append('b_value')
+        self.kvs.get(user_state_key('list_field')).append('c_value')
+        self.assertEquals(['a_value'], self.kvs.get(user_state_key('list_field')))
+
     def construct_kv_dict(self):
         """Construct a kv_dict that can be passed to set_many"""
         key1 = user_state_key('field_a')
@@ -343,3 +364,39 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+class TestScoresClient(TestCase):
+    """
+    Tests of ScoresClient
+    """
+    def setUp(self):
+        super(TestScoresClient, self).setUp()
+        self.user = UserFactory.create(username='user')
+        StudentModuleFactory.create(
+            student=self.user, module_state_key=location('graded'), grade=1, max_grade=2
+        )
+        StudentModuleFactory.create(student=self.user, module_state_key=location('ungraded'))
+
+    def test_fetch_scores_in_one_query(self):
+        locations = [location('graded'), location('ungraded'), location('unseen')]
+        with self.assertNumQueries(1):
+            client = ScoresClient.create_for_locations(course_id, self.user.id, locations)
+
+        self.assertEqual(client.get(location('graded')), ScoresClient.Score(1, 2))
+        self.assertEqual(client.get(location('ungraded')), ScoresClient.Score(None, None))
+        self.assertIsNone(client.get(location('unseen')))
+        self.assertIn(location('ungraded'), client)
+        self.assertNotIn(location('unseen'), client)
+
+    def test_fetch_scores_in_chunks(self):
+        client = ScoresClient(course_id, self.user.id)
+        with self.assertNumQueries(2):
+            client.fetch_scores([location('graded'), location('ungraded')], chunk_size=1)
+        self.assertEqual(client.get(location('graded')), ScoresClient.Score(1, 2))
+
+    def test_get_unfetched_location(self):
+        client = ScoresClient.create_for_locations(course_id, self.user.id, [location('graded')])
+        self.assertFalse(client.has_fetched(location('ungraded')))
+        with self.assertRaises(ValueError):
+            client.get(location('ungraded'))
@@ -972,6 +972,32 @@ class TestAnswerDistributions(TestSubmittingProblems):
             }
         )
 
+    @patch.object(grades, 'ANSWER_DISTRIBUTION_CHUNK_SIZE', 2)
+    def test_chunked_reads(self):
+        # Submissions spread over several chunks should all be counted, and the
+        # problems' names should come from one get_items rather than get_item calls.
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+        self.submit_question_answer('p2', {'2_1': u'Incorrect'})
+        self.submit_question_answer('p3', {'2_1': u'Correct'})
+
+        with patch.object(grades.modulestore(), 'get_item') as mock_get_item:
+            distributions = grades.answer_distributions(self.course.id)
+        self.assertFalse(mock_get_item.called)
+        self.assertEqual(
+            distributions,
+            {
+                ('p1', 'p1', '{}_2_1'.format(self.p1_html_id)): {
+                    'Correct': 1
+                },
+                ('p2', 'p2', '{}_2_1'.format(self.p2_html_id)): {
+                    'Incorrect': 1
+                },
+                ('p3', 'p3', '{}_2_1'.format(self.p3_html_id)): {
+                    'Correct': 1
+                }
+            }
+        )
+
     def test_other_data_types(self):
         # We'll submit one problem, and then muck with the student_answers
         # dict inside its state to try different data types (str, int, float,
@@ -619,6 +619,24 @@ class CategoryMapTestCase(ModuleStoreTestCase):
             ["Topic_A", "Topic_B", "Topic_C", "discussion1", "discussion2", "discussion3"]
         )
 
+    def test_discussion_modules_cached(self):
+        self.create_discussion("Chapter 1", "Discussion 1")
+        utils.get_discussion_id_map(self.course)
+        with mock.patch('django_comment_client.utils.modulestore') as mock_modulestore:
+            id_map = utils.get_discussion_id_map(self.course)
+            utils.get_discussion_category_map(self.course)
+        self.assertFalse(mock_modulestore.called)
+        self.assertEqual(id_map.keys(), ["discussion1"])
+
+    def test_discussion_modules_cache_cleared_on_publish(self):
+        self.create_discussion("Chapter 1", "Discussion 1")
+        utils.get_discussion_id_map(self.course)
+        self.create_discussion("Chapter 2", "Discussion")
+        self.assertItemsEqual(
+            utils.get_discussion_id_map(self.course).keys(),
+            ["discussion1", "discussion2"]
+        )
+
 
 class JsonResponseTestCase(TestCase, UnicodeTestMixin):
     def _test_unicode_data(self, text):
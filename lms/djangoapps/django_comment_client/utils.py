@@ -1,17 +1,18 @@
 import json
 import pytz
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import logging
 from datetime import datetime
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
 from django.http import HttpResponse
 from django.utils import simplejson
 from django.utils.timezone import UTC
 
-from django_comment_common.models import Role, FORUM_ROLE_STUDENT
+from django_comment_common.models import Role, FORUM_ROLE_STUDENT, discussion_modules_cache_key
 from django_comment_client.permissions import check_permissions_by_view, cached_has_permission
 
 from edxmako import lookup_template
@@ -25,6 +26,10 @@ from xmodule.modulestore.django import modulestore
 
 log = logging.getLogger(__name__)
 
+# Seconds to cache the inline discussion modules of a course.  Publishing the
+# course clears them sooner.
+DISCUSSION_MODULES_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 def extract(dic, keys):
     return {k: dic.get(k) for k in keys}
@@ -59,7 +64,27 @@ def has_forum_access(uname, course_id, rolename):
     return role.users.filter(username=uname).exists()
 
 
+# The fields of an inline discussion module used to build the discussion maps.
+DiscussionModuleInfo = namedtuple(
+    'DiscussionModuleInfo',
+    ['location', 'discussion_id', 'discussion_category', 'discussion_target', 'sort_key', 'start']
+)
+
+
 def _get_discussion_modules(course):
+    """
+    Return the DiscussionModuleInfo of every inline discussion module in `course`.
+
+    Finding them loads every discussion module in the course, so they're cached
+    per version of the course.  The cache is also cleared when the course is
+    published, since old Mongo courses don't have a version.
+    """
+    cache_key = discussion_modules_cache_key(course.id)
+    course_version = unicode(getattr(course, 'course_version', None))
+    cached = cache.get(cache_key)
+    if cached is not None and cached[0] == course_version:
+        return cached[1]
+
     all_modules = modulestore().get_items(course.id, qualifiers={'category': 'discussion'})
 
     def has_required_keys(module):
@@ -69,7 +94,19 @@ def _get_discussion_modules(course):
                 return False
         return True
 
-    return filter(has_required_keys, all_modules)
+    modules = [
+        DiscussionModuleInfo(
+            location=module.location,
+            discussion_id=module.discussion_id,
+            discussion_category=module.discussion_category,
+            discussion_target=module.discussion_target,
+            sort_key=module.sort_key,
+            start=module.start,
+        )
+        for module in all_modules if has_required_keys(module)
+    ]
+    cache.set(cache_key, (course_version, modules), DISCUSSION_MODULES_CACHE_TIMEOUT)
+    return modules
 
 
 def get_discussion_id_map(course):
@@ -14,11 +14,13 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 """
 from cStringIO import StringIO
 from gzip import GzipFile
+from itertools import count
 from uuid import uuid4
 import csv
 import json
 import hashlib
 import os.path
+import tempfile
 import urllib
 
 from boto.s3.connection import S3Connection
@@ -193,9 +195,8 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. `store_rows` writes the rows out as it iterates over them, so
+    they can be generated lazily without holding the whole report in memory.
     """
     @classmethod
     def from_config(cls):
@@ -231,6 +232,9 @@ class S3ReportStore(ReportStore):
     conventions on where files are stored to know what to display. Clients using
     this class can name the final file whatever they want.
     """
+    # S3 requires every part of a multipart upload but the last to be at least 5MB
+    MULTIPART_CHUNK_SIZE = 5 * 1024 * 1024
+
     def __init__(self, bucket_name, root_path):
         self.root_path = root_path
 
@@ -308,19 +312,49 @@ class S3ReportStore(ReportStore):
     def store_rows(self, course_id, filename, rows):
         """
         Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        strings), store them as a gzip'd csv file.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
-        """
-        output_buffer = StringIO()
-        gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        gzip_file.close()
 
-        self.store(course_id, filename, output_buffer)
+        The compressed data is sent as the rows are written, in parts of at
+        least `MULTIPART_CHUNK_SIZE` bytes, using an S3 multipart upload. The
+        file only becomes visible once the upload is complete, and the upload
+        is cancelled if writing the rows fails.
+        """
+        key = self.key_for(course_id, filename)
+        multipart_upload = self.bucket.initiate_multipart_upload(
+            key.key,
+            headers={
+                "Content-Encoding": "gzip",
+                "Content-Type": "text/csv",
+            }
+        )
+        part_numbers = count(1)
+
+        def upload_part(output_buffer):
+            """Upload the contents of `output_buffer` as the next part, then empty it."""
+            output_buffer.seek(0)
+            multipart_upload.upload_part_from_file(output_buffer, next(part_numbers))
+            output_buffer.seek(0)
+            output_buffer.truncate()
+
+        try:
+            output_buffer = StringIO()
+            gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
+            csvwriter = csv.writer(gzip_file)
+            for row in self._get_utf8_encoded_rows(rows):
+                csvwriter.writerow(row)
+                if output_buffer.tell() >= self.MULTIPART_CHUNK_SIZE:
+                    upload_part(output_buffer)
+            gzip_file.close()
+            # S3 allows the last part to be smaller than the others
+            upload_part(output_buffer)
+        except Exception:
+            multipart_upload.cancel_upload()
+            raise
+
+        multipart_upload.complete_upload()
 
     def links_for(self, course_id):
         """
@@ -344,6 +378,10 @@ class LocalFSReportStore(ReportStore):
     This lets us do the cheap thing locally for debugging without having to open
     up a separate URL that would only be used to send files in dev.
     """
+    # Directory under root_path holding the reports being written; no course
+    # directory starts with a dot.
+    TEMP_DIRECTORY_NAME = '.partial'
+
     def __init__(self, root_path):
         """
         Initialize with root_path where we're going to store our files. We
@@ -390,12 +428,33 @@ class LocalFSReportStore(ReportStore):
         """
         Given a course_id, filename, and rows (each row is an iterable of strings),
         write this data out.
+
+        The rows are appended to a temporary file as they are generated, which
+        then replaces the report, so a partly written report is never visible.
+        The temporary file is kept outside of the course's directory, whose
+        files are all listed as reports.
         """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        full_path = self.path_to(course_id, filename)
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.mkdir(directory)
 
-        self.store(course_id, filename, output_buffer)
+        temp_directory = os.path.join(self.root_path, self.TEMP_DIRECTORY_NAME)
+        if not os.path.exists(temp_directory):
+            try:
+                os.mkdir(temp_directory)
+            except OSError:
+                # created by another task in the meantime
+                if not os.path.isdir(temp_directory):
+                    raise
+        handle, temp_path = tempfile.mkstemp(dir=temp_directory)
+        try:
+            with os.fdopen(handle, "wb") as f:
+                csv.writer(f).writerows(self._get_utf8_encoded_rows(rows))
+        except Exception:
+            os.remove(temp_path)
+            raise
+        os.rename(temp_path, full_path)
 
     def links_for(self, course_id):
         """
@@ -408,10 +467,17 @@ class LocalFSReportStore(ReportStore):
         course_dir = self.path_to(course_id, '')
         if not os.path.exists(course_dir):
             return []
-        files = [(filename, os.path.join(course_dir, filename)) for filename in os.listdir(course_dir)]
-        files.sort(key=lambda (filename, full_path): os.path.getmtime(full_path), reverse=True)
+        files = []
+        for filename in os.listdir(course_dir):
+            full_path = os.path.join(course_dir, filename)
+            try:
+                files.append((os.path.getmtime(full_path), filename, full_path))
+            except OSError:
+                # removed or replaced since the directory was listed
+                continue
+        files.sort(reverse=True)
 
         return [
             (filename, ("file://" + urllib.quote(full_path)))
-            for filename, full_path in files
+            for __, filename, full_path in files
         ]
@@ -31,6 +31,7 @@ from instructor_task.tasks_helper import (
     reset_attempts_module_state,
     delete_problem_module_state,
     upload_grades_csv,
+    grade_report_shard,
     upload_students_csv,
     cohort_students_and_upload
 )
@@ -140,10 +141,19 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('graded')
-    task_fn = partial(upload_grades_csv, xmodule_instance_args)
+    task_fn = partial(upload_grades_csv, xmodule_instance_args, shard_task=calculate_grades_csv_shard)
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_shard(entry_id, shard_number, student_ids, action_name, start_time, subtask_status_dict):
+    """
+    Grade one range of students for a grade report that `calculate_grades_csv`
+    has split into subtasks.  The last subtask to finish merges the report.
+    """
+    return grade_report_shard(entry_id, shard_number, student_ids, action_name, start_time, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_students_features_csv(entry_id, xmodule_instance_args):
     """
@@ -4,14 +4,20 @@ running state of a course.
 
 """
 import json
+from collections import defaultdict
+from cStringIO import StringIO
 from datetime import datetime
+from functools import partial
+from itertools import count
 from time import time
 import unicodecsv
 
 from celery import Task, current_task
 from celery.utils.log import get_task_logger
 from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
 import dogstats_wrapper as dog_stats_api
@@ -20,6 +26,7 @@ from pytz import UTC
 from track.views import task_track
 from util.file import course_filename_prefix_generator, UniversalNewlineIterator
 from xmodule.modulestore.django import modulestore
+from xmodule.partitions.partitions import NoSuchUserPartitionGroupError
 from xmodule.split_test_module import get_split_user_partitions
 
 from courseware.courses import get_course_by_id
@@ -30,10 +37,16 @@ from courseware.module_render import get_module_for_descriptor_internal
 from instructor_analytics.basic import enrolled_students_features
 from instructor_analytics.csvs import format_dictlist
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
-from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
-from openedx.core.djangoapps.course_groups.cohorts import get_cohort
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    complete_instructor_task,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
 from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort
+from openedx.core.djangoapps.user_api.models import UserCourseTag
 from student.models import CourseEnrollment
 
 
@@ -532,14 +545,19 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
     )
 
 
-def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+def upload_grades_csv(_xmodule_instance_args, entry_id, course_id, _task_input, action_name, shard_task=None):
     """
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
     be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
+    `ReportStore.from_config()`) and calling `link_for()` on it. Files only
+    become visible in the ReportStore once they have been completely written,
+    so any files that are visible in ReportStore will be complete ones.
+
+    If `shard_task` is provided and the course has more enrolled students than
+    settings.GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK, the work is instead split
+    into subtasks over ranges of students (see `grade_report_shard`), and this
+    task only queues them.
 
     As we start to add more CSV downloads, it will probably be worthwhile to
     make a more general CSVDoc class instead of building out the rows like we
@@ -547,22 +565,96 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     """
     start_time = time()
     start_date = datetime.now(UTC)
-    status_interval = 100
     enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
-    task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
+    num_enrolled = enrolled_students.count()
+
+    students_per_subtask = settings.GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK
+    if shard_task is not None and students_per_subtask and num_enrolled > students_per_subtask:
+        return _queue_grade_report_shards(
+            entry_id, action_name, enrolled_students, students_per_subtask, shard_task, start_time
+        )
 
+    task_progress = TaskProgress(action_name, num_enrolled, start_time)
     course = get_course_by_id(course_id)
+    err_rows = [["id", "username", "error_msg"]]
+
+    # Students are graded as their rows are written out to the ReportStore, so
+    # the report is never held in memory as a whole.
+    upload_csv_to_report_store(
+        _grade_report_rows(course, enrolled_students, task_progress, err_rows), 'grade_report', course_id, start_date
+    )
+
+    current_step = {'step': 'Uploading CSVs'}
+    task_progress.update_task_state(extra_meta=current_step)
+
+    # If there are any error rows (don't count the header), write them out as well
+    if len(err_rows) > 1:
+        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+
+    # One last update before we close out...
+    return task_progress.update_task_state(extra_meta=current_step)
+
+
+def _course_cohort_names(course_id):
+    """
+    Return a dict mapping the id of each user in a cohort of `course_id` to the
+    name of their cohort.
+    """
+    memberships = CourseUserGroup.users.through.objects.filter(
+        courseusergroup__course_id=course_id,
+        courseusergroup__group_type=CourseUserGroup.COHORT,
+    )
+    return dict(memberships.values_list('user', 'courseusergroup__name'))
+
+
+def _course_experiment_group_names(course_id, experiment_partitions):
+    """
+    Return a dict mapping the id of each user assigned to a group of one of
+    `experiment_partitions` to a dict of {partition id: group name}.  Groups
+    which no longer exist in their partition are left out.
+    """
+    partitions_by_key = {
+        partition.scheme.key_for_partition(partition): partition for partition in experiment_partitions
+    }
+    group_names = defaultdict(dict)
+    if not partitions_by_key:
+        return group_names
+
+    tags = UserCourseTag.objects.filter(
+        course_id=course_id,
+        key__in=partitions_by_key.keys(),
+    ).values_list('user', 'key', 'value')
+    for user_id, key, value in tags:
+        partition = partitions_by_key[key]
+        try:
+            group_names[user_id][partition.id] = partition.get_group(int(value)).name
+        except (ValueError, NoSuchUserPartitionGroupError):
+            continue
+    return group_names
+
+
+def _grade_report_rows(course, students, task_progress, err_rows, status_interval=100):
+    """
+    Grade `students` in `course`, yielding the rows of the grade report,
+    starting with its header row.  No rows are yielded if no student could be
+    graded.  A row is appended to `err_rows` for each student who couldn't be
+    graded.  Counts are recorded on `task_progress`, and its task state is
+    updated every `status_interval` students.
+
+    The cohorts and experiment groups of all students are looked up up front,
+    with one query each.
+    """
+    course_id = course.id
     cohorts_header = ['Cohort Name'] if course.is_cohorted else []
+    cohort_names = _course_cohort_names(course_id) if course.is_cohorted else {}
 
     experiment_partitions = get_split_user_partitions(course.user_partitions)
     group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
+    experiment_group_names = _course_experiment_group_names(course_id, experiment_partitions)
 
-    # Loop over all our students and build our CSV lists in memory
     header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
     current_step = {'step': 'Calculating Grades'}
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    for student, gradeset, err_msg in iterate_grades_for(course_id, students):
         # Periodically update task status (this is a cache write)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
@@ -573,9 +665,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.succeeded += 1
             if not header:
                 header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
-                    ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
-                )
+                yield ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
 
             percents = {
                 section['label']: section.get('percent', 0.0)
@@ -585,13 +675,12 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
 
             cohorts_group_name = []
             if course.is_cohorted:
-                group = get_cohort(student, course_id, assign=False)
-                cohorts_group_name.append(group.name if group else '')
+                cohorts_group_name.append(cohort_names.get(student.id, ''))
 
-            group_configs_group_names = []
-            for partition in experiment_partitions:
-                group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
-                group_configs_group_names.append(group.name if group else '')
+            student_group_names = experiment_group_names.get(student.id, {})
+            group_configs_group_names = [
+                student_group_names.get(partition.id, '') for partition in experiment_partitions
+            ]
 
             # Not everybody has the same gradable items. If the item is not
             # found in the user's gradeset, just assume it's a 0. The aggregated
@@ -600,7 +689,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             # possible for a student to have a 0.0 show up in their row but
             # still have 100% for the course.
             row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
+            yield (
                 [student.id, student.email, student.username, gradeset['percent']] +
                 row_percents + cohorts_group_name + group_configs_group_names
             )
@@ -609,19 +698,192 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.failed += 1
             err_rows.append([student.id, student.username, err_msg])
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    current_step = {'step': 'Uploading CSVs'}
-    task_progress.update_task_state(extra_meta=current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+def _queue_grade_report_shards(entry_id, action_name, students, students_per_subtask, shard_task, start_time):
+    """
+    Queue `shard_task` subtasks that each grade a range of at most
+    `students_per_subtask` of `students`, ordered by id.  The subtask that
+    completes last merges the partial CSVs into the final report.
 
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+    Returns the task progress as stored in the InstructorTask entry.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
 
-    # One last update before we close out...
-    return task_progress.update_task_state(extra_meta=current_step)
+    # As with bulk email, a parent task that gets requeued after losing its
+    # broker connection must not queue a second set of subtasks.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued grade report subtasks", entry.task_id)
+        return json.loads(entry.task_output)
+
+    shard_numbers = count()
+
+    def _create_shard_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade a given range of students."""
+        return shard_task.subtask(
+            (
+                entry_id,
+                next(shard_numbers),
+                [student['pk'] for student in student_list],
+                action_name,
+                start_time,
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_shard_subtask,
+        students.order_by('id'),
+        [],
+        students_per_subtask,
+    )
+
+
+def _grade_report_shard_path(task_id, shard_number, csv_name):
+    """
+    Return the DefaultStorage path of a partial grade report CSV.
+    """
+    return u"grade_report_shards/{task_id}/{shard_number:05d}_{csv_name}.csv".format(
+        task_id=task_id,
+        shard_number=shard_number,
+        csv_name=csv_name,
+    )
+
+
+def _store_grade_report_shard(storage, path, rows):
+    """
+    Write `rows` as a CSV to `path` in `storage`, replacing any earlier copy
+    left by a retried subtask.
+    """
+    output_buffer = StringIO()
+    unicodecsv.writer(output_buffer, encoding='utf-8').writerows(rows)
+    if storage.exists(path):
+        storage.delete(path)
+    storage.save(path, ContentFile(output_buffer.getvalue()))
+
+
+def _merged_grade_report_rows(storage, paths):
+    """
+    Yield the rows of the partial CSVs at `paths`, in order, keeping only the
+    first header row.
+    """
+    header_written = False
+    for path in paths:
+        with storage.open(path) as shard_file:
+            reader = unicodecsv.reader(shard_file, encoding='utf-8')
+            header = next(reader)
+            if not header_written:
+                header_written = True
+                yield header
+            for row in reader:
+                yield row
+
+
+def _merge_grade_report_shards(entry, start_time):
+    """
+    Combine the partial CSVs written by the grade report subtasks of `entry`
+    into the final grade report (and error report), then remove them.
+    """
+    storage = DefaultStorage()
+    num_shards = json.loads(entry.subtasks)['total']
+    start_date = datetime.fromtimestamp(start_time, UTC)
+
+    for csv_name in ('grade_report', 'grade_report_err'):
+        paths = [
+            _grade_report_shard_path(entry.task_id, shard_number, csv_name)
+            for shard_number in range(num_shards)
+        ]
+        paths = [path for path in paths if storage.exists(path)]
+        # A grade report is always written, even if empty; the error report
+        # only if some student could not be graded.
+        if paths or csv_name == 'grade_report':
+            upload_csv_to_report_store(
+                _merged_grade_report_rows(storage, paths), csv_name, entry.course_id, start_date
+            )
+        for path in paths:
+            storage.delete(path)
+
+    TASK_LOG.info(u"Task %s: merged %d grade report shards", entry.task_id, num_shards)
+
+
+def _store_failed_grade_report_shard(entry, shard_number, student_ids, exception):
+    """
+    Replace whatever partial CSVs a failed grade report subtask left with an
+    error report row for each of its students, so that none of them is missing
+    from both the grade report and the error report.
+    """
+    err_msg = u"Grade report subtask failed: {}".format(exception)
+    try:
+        storage = DefaultStorage()
+        grade_report_path = _grade_report_shard_path(entry.task_id, shard_number, 'grade_report')
+        if storage.exists(grade_report_path):
+            storage.delete(grade_report_path)
+        usernames = dict(User.objects.filter(id__in=student_ids).values_list('id', 'username'))
+        err_rows = [["id", "username", "error_msg"]]
+        err_rows.extend(
+            [student_id, usernames.get(student_id, ''), err_msg] for student_id in sorted(student_ids)
+        )
+        _store_grade_report_shard(
+            storage, _grade_report_shard_path(entry.task_id, shard_number, 'grade_report_err'), err_rows
+        )
+    except Exception:  # pylint: disable=broad-except
+        TASK_LOG.exception(u"Could not write the error report of failed grade report shard %d", shard_number)
+
+
+def grade_report_shard(entry_id, shard_number, student_ids, action_name, start_time, subtask_status_dict):
+    """
+    Grade one range of students for a sharded grade report.
+
+    The rows are written to a partial CSV in DefaultStorage, and the counts
+    are accumulated into the parent InstructorTask through
+    `update_subtask_status`.  The subtask that completes last merges all
+    partial CSVs and uploads the report to the `ReportStore`.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    TASK_LOG.info(
+        u"Grading shard %d (%d students) as subtask %s for instructor task %d",
+        shard_number, len(student_ids), current_task_id, entry_id
+    )
+
+    # Raises if this subtask isn't known to the entry or has already run.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    try:
+        course = get_course_by_id(entry.course_id)
+        task_progress = TaskProgress(action_name, len(student_ids), time())
+        students = User.objects.filter(id__in=student_ids).order_by('id')
+        err_rows = [["id", "username", "error_msg"]]
+        rows = list(_grade_report_rows(course, students, task_progress, err_rows))
+
+        storage = DefaultStorage()
+        if rows:
+            _store_grade_report_shard(
+                storage, _grade_report_shard_path(entry.task_id, shard_number, 'grade_report'), rows
+            )
+        if len(err_rows) > 1:
+            _store_grade_report_shard(
+                storage, _grade_report_shard_path(entry.task_id, shard_number, 'grade_report_err'), err_rows
+            )
+    except Exception as exception:
+        TASK_LOG.exception(u"Grade report subtask %s of instructor task %d failed", current_task_id, entry_id)
+        # Since we don't know how far the shard got, count all of its students as
+        # failed, and list them all in the error report.
+        _store_failed_grade_report_shard(entry, shard_number, student_ids, exception)
+        subtask_status.increment(failed=len(student_ids), state=FAILURE)
+        if update_subtask_status(entry_id, current_task_id, subtask_status, complete_task=False):
+            complete_instructor_task(entry_id, partial(_merge_grade_report_shards, entry, start_time))
+        raise
+
+    subtask_status.increment(succeeded=task_progress.succeeded, failed=task_progress.failed, state=SUCCESS)
+    # The report is only done, and the task only a SUCCESS, once the last subtask has merged it.
+    if update_subtask_status(entry_id, current_task_id, subtask_status, complete_task=False):
+        complete_instructor_task(entry_id, partial(_merge_grade_report_shards, entry, start_time))
+    return subtask_status.to_dict()
 
 
 def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
@@ -1,9 +1,12 @@
+# -*- coding: utf-8 -*-
 """
 Tests for instructor_task/models.py.
 """
 
 from cStringIO import StringIO
+from gzip import GzipFile
 import mock
+import os
 import time
 from datetime import datetime
 from unittest import TestCase
@@ -30,10 +33,41 @@ class MockKey(object):
         return "http://fake-edx-s3.edx.org/"
 
 
+class MockMultiPartUpload(object):
+    """
+    Mocking a boto S3 MultiPartUpload object.
+    """
+    def __init__(self, bucket, key_name):
+        self.bucket = bucket
+        self.key_name = key_name
+        self.parts = []
+
+    def upload_part_from_file(self, fp, part_num):
+        """ Expected method on a MultiPartUpload object. """
+        self.parts.append((part_num, fp.read()))
+
+    def complete_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        key = MockKey(self.bucket)
+        key.key = self.key_name
+        self.bucket.store_key(key)
+
+    def cancel_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        self.parts = []
+
+
 class MockBucket(object):
     """ Mocking a boto S3 Bucket object. """
     def __init__(self, _name):
         self.keys = []
+        self.multipart_uploads = []
+
+    def initiate_multipart_upload(self, key_name, headers):  # pylint: disable=unused-argument
+        """ Expected method on a Bucket object. """
+        multipart_upload = MockMultiPartUpload(self, key_name)
+        self.multipart_uploads.append(multipart_upload)
+        return multipart_upload
 
     def store_key(self, key):
         """ Not a Bucket method, created just to store the keys in the Bucket for testing purposes. """
@@ -84,6 +118,16 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_store_rows(self):
+        """
+        Test that ReportStore.store_rows() stores rows given by a generator.
+        """
+        report_store = self.create_report_store()
+        rows = ([u'row {}'.format(i), u'ṽäĺüé'] for i in range(100))
+        report_store.store_rows(self.course_id, 'report.csv', rows)
+
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     """
@@ -93,6 +137,44 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config()
 
+    def test_store_rows_contents(self):
+        """
+        Test that the rows are written out as a CSV, replacing any earlier report.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', [['old']])
+        report_store.store_rows(self.course_id, 'report.csv', iter([['a', 1], ['b', 2]]))
+
+        with open(report_store.path_to(self.course_id, 'report.csv')) as report_file:
+            self.assertEqual(report_file.read(), 'a,1\r\nb,2\r\n')
+
+    def test_partial_report_not_listed(self):
+        """
+        Test that a report being written isn't listed until it is complete.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'old_report.csv', [['old']])
+
+        def rows():
+            """ Yield a row, and check the links once it is written out. """
+            yield ['a']
+            self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['old_report.csv'])
+            yield ['b']
+
+        report_store.store_rows(self.course_id, 'report.csv', rows())
+        self.assertEqual(
+            sorted(link[0] for link in report_store.links_for(self.course_id)), ['old_report.csv', 'report.csv']
+        )
+
+    def test_links_for_file_removed_while_listed(self):
+        """
+        Test that files removed or replaced while the links are gathered are left out.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', [['a']])
+        with mock.patch('instructor_task.models.os.path.getmtime', side_effect=OSError):
+            self.assertEqual(report_store.links_for(self.course_id), [])
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
@@ -105,3 +187,35 @@ class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     def create_report_store(self):
         """ Create and return a S3ReportStore. """
         return S3ReportStore.from_config()
+
+    def test_store_rows_in_parts(self):
+        """
+        Test that large reports are uploaded in several parts as the rows are written.
+        """
+        report_store = self.create_report_store()
+        rows = ([os.urandom(16).encode('hex')] for __ in range(1000))
+        with mock.patch.object(S3ReportStore, 'MULTIPART_CHUNK_SIZE', 1024):
+            report_store.store_rows(self.course_id, 'report.csv', rows)
+
+        multipart_upload = report_store.bucket.multipart_uploads[0]
+        self.assertGreater(len(multipart_upload.parts), 1)
+        self.assertEqual(
+            [part_num for part_num, __ in multipart_upload.parts],
+            range(1, len(multipart_upload.parts) + 1)
+        )
+        compressed = ''.join(data for __, data in multipart_upload.parts)
+        self.assertEqual(len(GzipFile(fileobj=StringIO(compressed)).read().splitlines()), 1000)
+
+    def test_store_rows_failure(self):
+        """
+        Test that the upload is cancelled, and no report stored, if generating the rows fails.
+        """
+        def failing_rows():
+            """ Yield a row, then fail. """
+            yield ['a']
+            raise ValueError()
+
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', failing_rows())
+        self.assertEqual(report_store.links_for(self.course_id), [])
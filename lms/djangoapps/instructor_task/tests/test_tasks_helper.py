@@ -7,9 +7,15 @@ Tests that CSV grade report generation works with unicode emails.
 
 """
 import ddt
+import json
 from mock import Mock, patch
 import tempfile
 import unicodecsv
+from uuid import uuid4
+
+from celery.states import SUCCESS, FAILURE
+from django.core.files.storage import DefaultStorage
+from django.test.utils import override_settings
 
 from xmodule.modulestore.tests.factories import CourseFactory
 from student.tests.factories import UserFactory
@@ -20,8 +26,11 @@ from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitio
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 import openedx.core.djangoapps.user_api.api.course_tag as course_tag_api
 from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
-from instructor_task.models import ReportStore
+from instructor_task.models import InstructorTask, ReportStore
+from instructor_task import tasks_helper
+from instructor_task.tasks import calculate_grades_csv_shard
 from instructor_task.tasks_helper import cohort_students_and_upload, upload_grades_csv, upload_students_csv
+from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase, TestReportMixin
 
 
@@ -257,6 +266,108 @@ class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
         result = upload_grades_csv(None, None, self.course.id, None, 'graded')
         self.assertDictContainsSubset({'attempted': 1, 'succeeded': 1, 'failed': 0}, result)
 
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_sharded_grade_report(self, _mock_current_task):
+        """
+        Test that a grade report split into subtasks is merged into a single
+        report once the last subtask completes.
+        """
+        students = [self.create_student('student{}'.format(i), 'student{}@example.com'.format(i)) for i in range(5)]
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course', task_id=str(uuid4()))
+
+        with override_settings(GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK=2):
+            upload_grades_csv(None, entry.id, self.course.id, None, 'graded', shard_task=calculate_grades_csv_shard)
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.subtasks)['total'], 3)
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 5, 'failed': 0}, json.loads(entry.task_output))
+
+        # A single report holding every student, in order, and no partial reports left behind
+        report_store = ReportStore.from_config()
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        with open(report_store.path_to(self.course.id, links[0][0])) as csv_file:
+            self.assertEqual(
+                [row['id'] for row in unicodecsv.DictReader(csv_file)],
+                [unicode(student.id) for student in students]
+            )
+        self.assertEqual(DefaultStorage().listdir(u'grade_report_shards/{}'.format(entry.task_id)), ([], []))
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_sharded_grade_report_shard_failure(self, _mock_current_task):
+        """
+        Test that the students of a grade report subtask that fails are all
+        listed in the error report.
+        """
+        students = [self.create_student('student{}'.format(i), 'student{}@example.com'.format(i)) for i in range(5)]
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course', task_id=str(uuid4()))
+
+        grade_report_rows = tasks_helper._grade_report_rows  # pylint: disable=protected-access
+
+        def _fail_second_shard(course, shard_students, *args, **kwargs):
+            """Grade the students, except those of the shard holding the third student."""
+            for row in grade_report_rows(course, shard_students, *args, **kwargs):
+                if students[2] in shard_students:
+                    raise ValueError('grading failed')
+                yield row
+
+        with override_settings(GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK=2):
+            with patch('instructor_task.tasks_helper._grade_report_rows', side_effect=_fail_second_shard):
+                upload_grades_csv(
+                    None, entry.id, self.course.id, None, 'graded', shard_task=calculate_grades_csv_shard
+                )
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 3, 'failed': 2}, json.loads(entry.task_output))
+
+        report_store = ReportStore.from_config()
+        reports = {}
+        for filename, __ in report_store.links_for(self.course.id):
+            with open(report_store.path_to(self.course.id, filename)) as csv_file:
+                report_name = 'grade_report_err' if 'grade_report_err' in filename else 'grade_report'
+                reports[report_name] = list(unicodecsv.DictReader(csv_file))
+        self.assertEqual(
+            [row['id'] for row in reports['grade_report']],
+            [unicode(student.id) for student in students[0:2] + students[4:]]
+        )
+        self.assertEqual(
+            [(row['id'], row['username']) for row in reports['grade_report_err']],
+            [(unicode(student.id), student.username) for student in students[2:4]]
+        )
+        self.assertIn('grading failed', reports['grade_report_err'][0]['error_msg'])
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_sharded_grade_report_merge_failure(self, _mock_current_task):
+        """
+        Test that a grade report whose subtasks can't be merged is marked as a
+        failure rather than a success.
+        """
+        for i in range(3):
+            self.create_student('student{}'.format(i), 'student{}@example.com'.format(i))
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course', task_id=str(uuid4()))
+
+        with override_settings(GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK=2):
+            with patch('instructor_task.tasks_helper.upload_csv_to_report_store', side_effect=IOError('disk full')):
+                upload_grades_csv(
+                    None, entry.id, self.course.id, None, 'graded', shard_task=calculate_grades_csv_shard
+                )
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertDictContainsSubset({'exception': 'IOError', 'message': 'disk full'}, json.loads(entry.task_output))
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_small_course_not_sharded(self, _mock_current_task):
+        """
+        Test that courses with fewer students than a subtask grades are
+        graded in a single task.
+        """
+        self.create_student('student', 'student@example.com')
+        with override_settings(GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK=2):
+            result = upload_grades_csv(None, None, self.course.id, None, 'graded', shard_task=Mock())
+        self.assertDictContainsSubset({'attempted': 1, 'succeeded': 1, 'failed': 0}, result)
+
 
 @ddt.ddt
 class TestStudentReport(TestReportMixin, InstructorTaskCourseTestCase):
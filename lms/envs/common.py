@@ -335,6 +335,12 @@ FEATURES = {
 
     # Courseware search feature
     'ENABLE_COURSEWARE_SEARCH': False,
+
+    # Store computed subsection grades, so that the progress page and grade
+    # reports don't have to re-score every problem in the course. Stored grades
+    # aren't invalidated while this is off, so empty the
+    # courseware_persistentsubsectiongrade table before turning it back on.
+    'ENABLE_PERSISTENT_SUBSECTION_GRADES': False,
 }
 
 # Ignore static asset files on import which match this pattern
@@ -612,6 +618,14 @@ XBLOCK_SELECT_FUNCTION = prefer_xmodules
 
 MODULESTORE_BRANCH = 'published-only'
 CONTENTSTORE = None
+
+# Local disk cache for course assets too large for memcached.  Each server
+# keeps its own copies; no ROOT_PATH disables it.
+STATIC_CONTENT_DISK_CACHE = {
+    'ROOT_PATH': None,
+    'MAX_BYTES': 2 * 1024 * 1024 * 1024,
+}
+
 DOC_STORE_CONFIG = {
     'host': 'localhost',
     'db': 'xmodule',
@@ -634,6 +648,9 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Sizes of the in-process caches of (immutable) course structures and definitions
+                        'structure_cache_max_bytes': 64 * 1024 * 1024,
+                        'definition_cache_max_bytes': 16 * 1024 * 1024,
                     }
                 },
                 {
@@ -644,6 +661,8 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Keep each course's parent locations alongside its metadata inheritance tree
+                        'cache_parent_locations': True,
                     }
                 },
                 {
@@ -672,6 +691,12 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # How many long-lived sandbox processes to keep for running problem code.
+    # 0 starts a new sandbox for every execution.
+    'warm_pool_size': 0,
+    # How many executions a pooled sandbox process runs before it's replaced.
+    'warm_pool_max_runs': 100,
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -729,6 +754,9 @@ if not EDX_PLATFORM_REVISION:
 STATIC_URL = '/static/'
 STATIC_ROOT = ENV_ROOT / "staticfiles"
 
+# Number of rewritten /static/ urls of course content that static_replace remembers
+STATIC_URL_CACHE_MAX_ENTRIES = 10000
+
 STATICFILES_DIRS = [
     COMMON_ROOT / "static",
     PROJECT_ROOT / "static",
@@ -1005,6 +1033,9 @@ MIDDLEWARE_CLASSES = (
     # Detects user-requested locale from 'accept-language' header in http request
     'django.middleware.locale.LocaleMiddleware',
 
+    # Must come before TransactionMiddleware, to write history after it commits
+    'courseware.history.HistoryWriterMiddleware',
+
     'django.middleware.transaction.TransactionMiddleware',
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 
@@ -1607,6 +1638,9 @@ INSTALLED_APPS = (
     # Course action state
     'course_action_state',
 
+    # Denormalized course summaries for course listings
+    'openedx.core.djangoapps.course_overviews',
+
     # Additional problem types
     'edx_jsme',    # Molecular Structure
 
@@ -1657,8 +1691,9 @@ VERIFY_STUDENT = {
 
 ### This enables the Metrics tab for the Instructor dashboard ###########
 FEATURES['CLASS_DASHBOARD'] = False
-if FEATURES.get('CLASS_DASHBOARD'):
-    INSTALLED_APPS += ('class_dashboard',)
+# Installed whether or not the tab is enabled (which is often decided in a later
+# settings file), so that its tables are always created.
+INSTALLED_APPS += ('class_dashboard',)
 
 ######################## CAS authentication ###########################
 
@@ -1698,12 +1733,21 @@ CERT_NAME_LONG = "Certificate of Achievement"
 ###################### Grade Downloads ######################
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
+# Grade reports for courses with more enrolled students than this are split
+# into subtasks grading this many students each.  Partial reports are kept in
+# DefaultStorage, which must be shared by all workers.  None disables splitting.
+GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK = None
+
 GRADES_DOWNLOAD = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-grades',
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+###################### Student Module History ######################
+# The class that writes StudentModuleHistory entries; see courseware.history
+STUDENT_MODULE_HISTORY_WRITER = 'courseware.history.ImmediateHistoryWriter'
+
 ######################## PROGRESS SUCCESS BUTTON ##############################
 # The following fields are available in the URL: {course_id} {student_id}
 PROGRESS_SUCCESS_BUTTON_URL = 'http://<domain>/<path>/{course_id}'
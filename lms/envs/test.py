@@ -95,6 +95,10 @@ TEST_ROOT = path("test_root")
 # Want static files in the same dir for running on jenkins.
 STATIC_ROOT = TEST_ROOT / "staticfiles"
 
+# Tests mock out staticfiles and the modulestore, so don't remember rewritten static urls.
+# static_replace's own tests turn this on to cover the memo.
+STATIC_URL_CACHE_MAX_ENTRIES = 0
+
 STATUS_MESSAGE_PATH = TEST_ROOT / "status_message.json"
 
 COURSES_ROOT = TEST_ROOT / "data"
@@ -144,6 +148,11 @@ update_module_store_settings(
     MODULESTORE,
     module_store_options={
         'fs_root': TEST_ROOT / "data",
+        # Don't let cached structures or parent locations hide the mongo queries that tests count.
+        # The caches are covered with these on by test_split_document_cache and test_mongo_parent_index.
+        'structure_cache_max_bytes': 0,
+        'definition_cache_max_bytes': 0,
+        'cache_parent_locations': False,
     },
     xml_store_options={
         'data_dir': mkdtemp(dir=TEST_ROOT),  # never inadvertently load all the XML courses
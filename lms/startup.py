@@ -39,6 +39,9 @@ def run():
     if settings.FEATURES.get('ENABLE_THIRD_PARTY_AUTH', False):
         enable_third_party_auth()
 
+    if settings.CODE_JAIL.get('warm_pool_size'):
+        enable_sandbox_pool()
+
     # Initialize Segment.io analytics module. Flushes first time a message is received and
     # every 50 messages thereafter, or if 10 seconds have passed since last flush
     if settings.FEATURES.get('SEGMENT_IO_LMS') and hasattr(settings, 'SEGMENT_IO_LMS_KEY'):
@@ -65,6 +68,15 @@ def add_mimetypes():
     mimetypes.add_type('application/font-woff', '.woff')
 
 
+def enable_sandbox_pool():
+    """
+    Run capa problems' sandboxed code in a pool of long-lived sandbox processes.
+    """
+    from capa.safe_exec import configure_sandbox_pool
+
+    configure_sandbox_pool(settings.CODE_JAIL['warm_pool_size'], settings.CODE_JAIL.get('warm_pool_max_runs', 100))
+
+
 def enable_theme():
     """
     Enable the settings for a custom theme, whose files should be stored
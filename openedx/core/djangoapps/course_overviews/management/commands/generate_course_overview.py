@@ -0,0 +1,49 @@
+"""
+Command to (re)generate the CourseOverview of courses, e.g. to refresh them after the
+way they are made has changed.  The migrations of the table create the overviews of the
+courses which existed when they ran.
+"""
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from openedx.core.djangoapps.course_overviews.models import CourseOverview
+from xmodule.modulestore.django import modulestore
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms generate_course_overview --all --settings=aws
+        $ ./manage.py lms generate_course_overview 'edX/DemoX/Demo_Course' --settings=aws
+    """
+    args = '<course_id course_id ...>'
+    help = 'Generates and stores the course overview for one or more courses.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--all',
+                    action='store_true',
+                    default=False,
+                    help='Generate the course overview for all courses.'),
+    )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            course_keys = [course.id for course in modulestore().get_courses()]
+        else:
+            if len(args) < 1:
+                raise CommandError('At least one course or --all must be specified.')
+            try:
+                course_keys = [CourseKey.from_string(arg) for arg in args]
+            except InvalidKeyError:
+                raise CommandError('Invalid key specified.')
+
+        log.info('Generating course overviews for %d courses.', len(course_keys))
+        for course_key in course_keys:
+            if CourseOverview.load_from_module_store(course_key) is None:
+                log.warning(u'Course %s does not exist or failed to load.', course_key)
@@ -0,0 +1,322 @@
+"""
+Declaration of CourseOverview model
+
+If you make changes to this model, be sure to create an appropriate migration
+file and check it in at the same time as your model changes. To do that,
+
+1. Go to the edx-platform dir
+2. ./manage.py lms schemamigration course_overviews --auto description_of_your_change
+3. It adds the migration file to edx-platform/openedx/core/djangoapps/course_overviews/migrations/
+"""
+import json
+import logging
+
+from django.db import models, IntegrityError
+from django.dispatch import receiver
+from django.utils.translation import ugettext
+
+from opaque_keys.edx.locator import CourseLocator
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from static_replace import replace_static_urls
+from util.date_utils import strftime_localized
+from xmodule import course_metadata_utils
+from xmodule.course_module import CourseDescriptor
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore, SignalHandler
+from xmodule.modulestore.exceptions import ItemNotFoundError
+from xmodule_django.models import CourseKeyField, UsageKeyField
+
+log = logging.getLogger(__name__)
+
+
+class CourseOverview(models.Model):
+    """
+    A denormalized summary of a course's settings, for the pages which list courses
+    (the student dashboard and the course catalog) and so shouldn't load each course
+    from the modulestore.
+
+    Provides the subset of CourseDescriptor's attributes and methods those pages use.
+    Rows are created when a course is first looked up and refreshed whenever the course
+    is published.
+    """
+    # Course identification
+    id = CourseKeyField(db_index=True, primary_key=True, max_length=255)  # pylint: disable=invalid-name
+    location = UsageKeyField(max_length=255)
+    display_name = models.TextField(null=True)
+    display_name_with_default = models.TextField()
+    display_number_with_default = models.TextField()
+    display_org_with_default = models.TextField()
+
+    # Start/end dates
+    start = models.DateTimeField(null=True)
+    end = models.DateTimeField(null=True)
+    advertised_start = models.TextField(null=True)
+    announcement = models.DateTimeField(null=True)
+    is_new = models.NullBooleanField()
+
+    # URLs and catalog content
+    course_image_url = models.TextField()
+    short_description = models.TextField(null=True)
+    end_of_course_survey_url = models.TextField(null=True)
+
+    # Certification data
+    certificates_display_behavior = models.TextField(null=True)
+    certificates_show_before_end = models.BooleanField()
+    cert_name_short = models.TextField()
+    cert_name_long = models.TextField()
+    lowest_passing_grade = models.FloatField(null=True)
+
+    # Access parameters
+    days_early_for_beta = models.FloatField(null=True)
+    mobile_available = models.BooleanField()
+    visible_to_staff_only = models.BooleanField()
+    _pre_requisite_courses_json = models.TextField()  # JSON representation of list of CourseKey strings
+    enrollment_start = models.DateTimeField(null=True)
+    enrollment_end = models.DateTimeField(null=True)
+    enrollment_domain = models.TextField(null=True)
+    invitation_only = models.BooleanField(default=False)
+    catalog_visibility = models.TextField(null=True)
+    ispublic = models.NullBooleanField()
+
+    @classmethod
+    def _create_from_course(cls, course):
+        """
+        Return an unsaved CourseOverview of `course`, a CourseDescriptor.
+        """
+        # Avoid a circular import: courseware.courses imports this module.
+        from courseware.courses import course_image_url
+
+        return cls(
+            id=course.id,
+            location=course.location,
+            display_name=course.display_name,
+            display_name_with_default=course.display_name_with_default,
+            display_number_with_default=course.display_number_with_default,
+            display_org_with_default=course.display_org_with_default,
+
+            start=course.start,
+            end=course.end,
+            advertised_start=course.advertised_start,
+            announcement=course.announcement,
+            is_new=_is_new_flag(course.is_new),
+
+            course_image_url=course_image_url(course),
+            short_description=_short_description(course),
+            end_of_course_survey_url=course.end_of_course_survey_url,
+
+            certificates_display_behavior=course.certificates_display_behavior,
+            certificates_show_before_end=course.certificates_show_before_end,
+            cert_name_short=course.cert_name_short,
+            cert_name_long=course.cert_name_long,
+            lowest_passing_grade=course.lowest_passing_grade,
+
+            days_early_for_beta=course.days_early_for_beta,
+            mobile_available=course.mobile_available,
+            visible_to_staff_only=course.visible_to_staff_only,
+            _pre_requisite_courses_json=json.dumps(course.pre_requisite_courses),
+            enrollment_start=course.enrollment_start,
+            enrollment_end=course.enrollment_end,
+            enrollment_domain=course.enrollment_domain,
+            invitation_only=course.invitation_only,
+            catalog_visibility=course.catalog_visibility,
+            ispublic=course.ispublic,
+        )
+
+    @classmethod
+    def load_from_module_store(cls, course_id):
+        """
+        Load the course with `course_id` from the modulestore and save its overview,
+        replacing any existing one.  Returns the new CourseOverview, or None if there is
+        no such course or it failed to load.
+        """
+        store = modulestore()
+        with store.bulk_operations(course_id):
+            course = store.get_course(course_id)
+            if not isinstance(course, CourseDescriptor):
+                return None
+            overview = cls._create_from_course(course)
+
+        try:
+            # id is the primary key, so this replaces any existing overview
+            overview.save()
+        except IntegrityError:
+            # Another thread has already created this course's overview, from
+            # the same course, so continue
+            pass
+        return overview
+
+    @classmethod
+    def get_from_id(cls, course_id):
+        """
+        Return the CourseOverview of the course with `course_id`, loading the course from
+        the modulestore if it doesn't have one yet.  Returns None if there is no such
+        course or it failed to load.
+        """
+        try:
+            return cls.objects.get(id=course_id)
+        except cls.DoesNotExist:
+            return cls.load_from_module_store(course_id)
+
+    @classmethod
+    def get_all_courses(cls):
+        """
+        Return the CourseOverviews of all courses.  The overviews of courses which existed
+        when this table was created are made by its migrations, and those of newer courses
+        when they're published.  XML courses are never published, so the overviews of any
+        added since then are made here.
+        """
+        overviews = list(cls.objects.all())
+        overview_ids = set(overview.id for overview in overviews)
+        for course_key in _xml_course_keys():
+            if course_key not in overview_ids:
+                overview = cls.load_from_module_store(course_key)
+                if overview is not None:
+                    overviews.append(overview)
+        return overviews
+
+    @property
+    def number(self):
+        """
+        The course number from the course key, e.g. "CS101".
+        """
+        return self.location.course
+
+    @property
+    def org(self):
+        """
+        The org from the course key.
+        """
+        return self.location.org
+
+    @property
+    def pre_requisite_courses(self):
+        """
+        The list of the course keys (as strings) of the courses which are prerequisites of this one.
+        """
+        return json.loads(self._pre_requisite_courses_json)
+
+    def has_started(self):
+        """
+        Returns whether the course has started.
+        """
+        return course_metadata_utils.has_course_started(self.start)
+
+    def has_ended(self):
+        """
+        Returns whether the course has ended.
+        """
+        return course_metadata_utils.has_course_ended(self.end)
+
+    def may_certify(self):
+        """
+        Returns whether it is acceptable to show the student a certificate download link.
+        """
+        return course_metadata_utils.may_certify_for_course(
+            self.certificates_display_behavior,
+            self.certificates_show_before_end,
+            self.has_ended()
+        )
+
+    @property
+    def start_date_is_still_default(self):
+        """
+        Checks if the start date set for the course is still default, i.e. .start has not been modified,
+        and .advertised_start has not been set.
+        """
+        return course_metadata_utils.course_start_date_is_default(self.start, self.advertised_start)
+
+    def start_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the desired text corresponding the course's start date and time in UTC.  Prefers .advertised_start,
+        then falls back to .start
+        """
+        return course_metadata_utils.course_start_datetime_text(
+            self.start, self.advertised_start, format_string, ugettext, strftime_localized
+        )
+
+    def end_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the end date or date_time for the course formatted as a string.
+        """
+        return course_metadata_utils.course_end_datetime_text(self.end, format_string, strftime_localized)
+
+    @property
+    def is_newish(self):
+        """
+        Returns if the course has been flagged as new. If there is no flag, return a heuristic
+        value considering the announcement and the start dates.
+        """
+        return course_metadata_utils.course_is_newish(
+            self.is_new, self.start, self.advertised_start, self.announcement
+        )
+
+    @property
+    def sorting_score(self):
+        """
+        Returns a number that can be used to sort the courses according to how "new" they are.
+        The lower the number the "newer" the course.
+        """
+        return course_metadata_utils.course_sorting_score(self.start, self.advertised_start, self.announcement)
+
+    def __unicode__(self):
+        return unicode(self.id)
+
+
+def _is_new_flag(is_new):
+    """
+    Normalize a course's is_new setting, which XML courses may give as a string, to a
+    boolean or None.
+    """
+    if isinstance(is_new, basestring):
+        return is_new.lower() in ['true', 'yes', 'y']
+    return None if is_new is None else bool(is_new)
+
+
+def _xml_course_keys():
+    """
+    Return the keys of the courses in the XML modulestore, which keeps them all in memory.
+    """
+    store = modulestore()
+    if hasattr(store, '_get_modulestore_by_type'):
+        store = store._get_modulestore_by_type(ModuleStoreEnum.Type.xml)  # pylint: disable=protected-access
+    if store is None or store.get_modulestore_type() != ModuleStoreEnum.Type.xml:
+        return []
+    return [course.id for course in store.get_courses()]
+
+
+def _short_description(course):
+    """
+    Return the html of the short_description about section of `course`, with its static
+    urls replaced, or None if the course doesn't have one.
+    """
+    try:
+        about = modulestore().get_item(course.location.replace(category='about', name='short_description'))
+    except ItemNotFoundError:
+        return None
+    return replace_static_urls(
+        about.data,
+        data_directory=getattr(course, 'data_dir', None),
+        course_id=course.id,
+        static_asset_path=course.static_asset_path,
+    )
+
+
+@receiver(SignalHandler.course_published)
+def _listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Queue a refresh of the overview of a course whenever it's published, so that
+    loading the course doesn't hold up the request which published it.
+    """
+    # Avoid a circular import: the task module imports this one.
+    from .tasks import update_course_overview
+
+    if isinstance(course_key, (CourseLocator, SlashSeparatedCourseKey)):
+        update_course_overview.delay(unicode(course_key))
+
+
+@receiver(SignalHandler.course_deleted)
+def _listen_for_course_delete(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Delete the overview of a course when it's deleted.
+    """
+    CourseOverview.objects.filter(id=course_key).delete()
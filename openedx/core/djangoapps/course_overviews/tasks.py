@@ -0,0 +1,16 @@
+"""
+Celery tasks which keep course overviews up to date.
+"""
+from celery import task
+
+from opaque_keys.edx.keys import CourseKey
+
+from .models import CourseOverview
+
+
+@task()  # pylint: disable=not-callable
+def update_course_overview(course_id):
+    """
+    Reload the overview of a course from the modulestore, queued when the course is published.
+    """
+    CourseOverview.load_from_module_store(CourseKey.from_string(course_id))
@@ -0,0 +1,142 @@
+"""
+Tests for the CourseOverview model and the signals which keep it up to date.
+"""
+import datetime
+
+import ddt
+from django.utils.timezone import UTC
+from mock import patch
+
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase, TEST_DATA_MIXED_TOY_MODULESTORE
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, check_mongo_calls
+
+from ..models import CourseOverview
+
+
+@ddt.ddt
+class CourseOverviewTestCase(ModuleStoreTestCase):
+    """
+    Tests of CourseOverview.
+    """
+    # Attributes and methods a CourseOverview must agree with its CourseDescriptor on.
+    COURSE_ATTRIBUTES = (
+        'id', 'location', 'display_name', 'display_name_with_default', 'display_number_with_default',
+        'display_org_with_default', 'number', 'org', 'start', 'end', 'advertised_start', 'announcement',
+        'start_date_is_still_default', 'is_newish', 'end_of_course_survey_url', 'certificates_display_behavior',
+        'certificates_show_before_end', 'cert_name_short', 'cert_name_long', 'lowest_passing_grade',
+        'days_early_for_beta', 'mobile_available', 'visible_to_staff_only', 'pre_requisite_courses',
+        'enrollment_start', 'enrollment_end', 'enrollment_domain', 'invitation_only', 'catalog_visibility',
+        'ispublic',
+    )
+    COURSE_METHODS = ('has_started', 'has_ended', 'may_certify', 'start_datetime_text', 'end_datetime_text')
+
+    def check_overview_of_course(self, course):
+        """
+        Check that the CourseOverview of `course` summarizes it.
+        """
+        overview = CourseOverview.get_from_id(course.id)
+        for attribute in self.COURSE_ATTRIBUTES:
+            self.assertEqual(getattr(course, attribute), getattr(overview, attribute), attribute)
+        for method in self.COURSE_METHODS:
+            self.assertEqual(getattr(course, method)(), getattr(overview, method)(), method)
+        self.assertAlmostEqual(course.sorting_score, overview.sorting_score)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_course_overview(self, modulestore_type):
+        now = datetime.datetime.now(UTC()).replace(microsecond=0)
+        course = CourseFactory.create(
+            display_name='Test Course',
+            start=now - datetime.timedelta(days=30),
+            end=now + datetime.timedelta(days=30),
+            advertised_start='Spring 2015',
+            certificates_show_before_end=True,
+            mobile_available=True,
+            invitation_only=True,
+            ispublic=True,
+            pre_requisite_courses=['course-v1:edX+PRE+2015'],
+            default_store=modulestore_type,
+        )
+        self.check_overview_of_course(course)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_course_overview_defaults(self, modulestore_type):
+        course = CourseFactory.create(default_store=modulestore_type)
+        self.check_overview_of_course(course)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_short_description(self, modulestore_type):
+        course = CourseFactory.create(default_store=modulestore_type)
+        ItemFactory.create(
+            parent_location=course.location,
+            category='about',
+            display_name='short_description',
+            data='A short description',
+        )
+        CourseOverview.objects.filter(id=course.id).delete()
+        self.assertEqual(CourseOverview.get_from_id(course.id).short_description, 'A short description')
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_refreshed_on_publish(self, modulestore_type):
+        course = CourseFactory.create(display_name='Before', default_store=modulestore_type)
+        self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'Before')
+
+        course.display_name = 'After'
+        course = self.update_course(course, self.user.id)
+        self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'After')
+
+        # inside a bulk operation, the overview is only refreshed at the end
+        with self.store.bulk_operations(course.id):
+            course.display_name = 'Bulk'
+            course = self.update_course(course, self.user.id)
+            self.assertEqual(CourseOverview.objects.get(id=course.id).display_name, 'After')
+        self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'Bulk')
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_refresh_queued_on_publish(self, modulestore_type):
+        course = CourseFactory.create(display_name='Before', default_store=modulestore_type)
+        self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'Before')
+
+        course.display_name = 'After'
+        with patch('openedx.core.djangoapps.course_overviews.tasks.update_course_overview.delay') as mock_delay:
+            course = self.update_course(course, self.user.id)
+        mock_delay.assert_called_with(unicode(course.id))
+        # the publishing request doesn't load the course itself
+        self.assertEqual(CourseOverview.objects.get(id=course.id).display_name, 'Before')
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_deleted_course(self, modulestore_type):
+        course = CourseFactory.create(default_store=modulestore_type)
+        self.assertIsNotNone(CourseOverview.get_from_id(course.id))
+
+        self.store.delete_course(course.id, self.user.id)
+        self.assertFalse(CourseOverview.objects.filter(id=course.id).exists())
+        self.assertIsNone(CourseOverview.get_from_id(course.id))
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_no_modulestore_reads(self, modulestore_type):
+        course = CourseFactory.create(default_store=modulestore_type)
+        CourseOverview.objects.filter(id=course.id).delete()
+
+        CourseOverview.get_from_id(course.id)
+        with check_mongo_calls(0):
+            CourseOverview.get_from_id(course.id)
+
+
+class XMLCourseOverviewTestCase(ModuleStoreTestCase):
+    """
+    Tests of the CourseOverviews of XML courses, which are never published.
+    """
+    MODULESTORE = TEST_DATA_MIXED_TOY_MODULESTORE
+
+    def test_listed_without_overview(self):
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        self.assertFalse(CourseOverview.objects.filter(id=course_key).exists())
+
+        self.assertIn(course_key, [overview.id for overview in CourseOverview.get_all_courses()])
+        self.assertTrue(CourseOverview.objects.filter(id=course_key).exists())
+
+        # from then on the course is listed from its overview
+        with patch.object(CourseOverview, 'load_from_module_store', side_effect=AssertionError):
+            self.assertIn(course_key, [overview.id for overview in CourseOverview.get_all_courses()])